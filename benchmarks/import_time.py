@@ -0,0 +1,103 @@
+"""
+Import time regression benchmark.
+
+Each case is timed in fresh interpreters, so the measurement is a cold
+start (apart from the OS file cache).  A case fails if its median time
+exceeds its budget, or if it imports a module that it should not, e.g.
+matplotlib for a headless job.  The exit status is the number of
+failed cases.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 9 --scale 2 --json out.json
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+
+
+CASES = [
+    {
+        'name': 'import pinkfish',
+        'code': 'import pinkfish as pf',
+        'budget': 0.05,
+        'forbidden': ['pandas', 'matplotlib', 'seaborn', 'yfinance']
+    },
+    {
+        'name': 'headless backtest',
+        'code': 'import pinkfish as pf\n'
+                'pf.fetch_timeseries, pf.SMA, pf.CROSSOVER, pf.calendar\n'
+                'pf.TradeLog, pf.DailyBal, pf.Portfolio, pf.stats',
+        'budget': 0.75,
+        'forbidden': ['matplotlib', 'seaborn', 'yfinance']
+    },
+    {
+        'name': 'plotting',
+        'code': 'import pinkfish as pf\n'
+                'pf.plot_equity_curve',
+        'budget': 1.5,
+        'forbidden': ['yfinance']
+    }
+]
+"""
+list of dict : The benchmark cases.  'budget' is in seconds.
+"""
+
+_TEMPLATE = """
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(repr((elapsed, sorted(m for m in {forbidden!r} if m in sys.modules))))
+"""
+
+
+def time_case(case, repeat):
+    """
+    Return the times and forbidden modules of `repeat` runs of `case`.
+    """
+    program = _TEMPLATE.format(code=case['code'], forbidden=case['forbidden'])
+    times = []
+    imported = set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', program], check=True,
+                             capture_output=True, text=True).stdout
+        elapsed, modules = ast.literal_eval(out.strip().splitlines()[-1])
+        times.append(elapsed)
+        imported.update(modules)
+    return times, sorted(imported)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters per case (default 5)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply every budget, e.g. for a slow machine (default 1)')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    for case in CASES:
+        times, imported = time_case(case, args.repeat)
+        median = statistics.median(times)
+        budget = case['budget'] * args.scale
+        ok = median <= budget and not imported
+        results.append({'name': case['name'], 'median': median, 'min': min(times),
+                        'budget': budget, 'forbidden_imported': imported, 'ok': ok})
+        print(f"{'ok  ' if ok else 'FAIL'} {case['name']:<20} median {median*1000:7.1f} ms"
+              f"  budget {budget*1000:7.1f} ms"
+              + (f"  imported {', '.join(imported)}" if imported else ''))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+    return sum(not r['ok'] for r in results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,429 @@
+"""
+Benchmark suite for the pinkfish hot paths.
+
+Runs offline on deterministic synthetic OHLCV data, so results from
+different versions of pinkfish, or different machines, are comparable.
+Only the public API is used, and a benchmark of an API that a version
+doesn't have is skipped, so a baseline can be recorded on an older
+version.  Each benchmark is timed for every size on its axes, i.e. the
+number of bars and/or the number of symbols.  For large numbers of
+symbols, fewer bars are used.  Setup, e.g. generating data or running
+the strategy whose logs are timed, is not included.
+
+Run from the repository root, with pinkfish importable, e.g. after
+`pip install -e .`.
+
+Usage:
+    python benchmarks/suite.py --json before.json
+    python benchmarks/suite.py --json after.json --compare before.json
+    python benchmarks/suite.py --full --only portfolio
+"""
+
+import argparse
+import datetime
+import importlib.metadata
+import inspect
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import pinkfish as pf
+import pinkfish.pfcalendar as pfcalendar
+
+
+QUICK_BARS = [1000, 10000]
+QUICK_SYMBOLS = [1, 10, 100]
+FULL_BARS = [1000, 10000, 30000]
+FULL_SYMBOLS = [1, 10, 100, 1000, 5000]
+
+START = datetime.datetime(1900, 1, 1)
+CAPITAL = 10000
+
+MAX_CELLS = 2e7
+"""
+float : The symbol axis benchmarks use at most this many bars * symbols
+of data, i.e. fewer bars for large numbers of symbols.
+"""
+
+MAX_PORTFOLIO_WORK = 5e6
+"""
+float : The portfolio rebalance uses fewer bars for large numbers of
+symbols, so that its estimated work, symbols**2 * rebalances, is at
+most this, since `adjust_percents()` is quadratic in the number of
+symbols.  It always uses at least `MIN_PORTFOLIO_BARS`.
+"""
+
+MIN_PORTFOLIO_BARS = 42
+"""
+int : The minimum bars of the portfolio rebalance, i.e. two months, so
+that there is at least one rebalance.
+"""
+
+
+########################################################################
+# SYNTHETIC DATA
+
+def synthetic_ohlcv(bars, seed=0):
+    """
+    Return a deterministic random walk with 'open', 'high', 'low',
+    'close', 'adj_close', and 'volume' columns on business days.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(START, periods=bars, name='date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, bars)))
+    open_ = close * (1 + rng.normal(0, 0.003, bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, bars)))
+    volume = rng.integers(100000, 1000000, bars)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'adj_close': close, 'volume': volume}, index=index)
+
+
+def synthetic_closes(bars, symbols, seed=0):
+    """
+    Return a deterministic portfolio timeseries with a 'SYM_close'
+    column per symbol and the calendar columns.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(START, periods=bars, name='date')
+    names = [f'S{i:04d}' for i in range(symbols)]
+    r = rng.normal(0.0003, 0.012, (bars, symbols))
+    close = 100 * np.exp(np.cumsum(r, axis=0))
+    ts = pd.DataFrame(close, index=index, columns=[f'{s}_close' for s in names])
+    return pfcalendar.calendar(ts), names
+
+
+def write_symbol_cache(dir_path, bars):
+    """
+    Write a symbol in the format of the symbol cache and return it.
+    """
+    symbol = f'SYN{bars}'
+    ts = synthetic_ohlcv(bars)
+    ts = ts.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low',
+                            'close': 'Close', 'adj_close': 'Adj Close',
+                            'volume': 'Volume'})
+    ts.index.name = 'Date'
+    ts.to_csv(Path(dir_path) / f'{symbol}.csv')
+    return symbol
+
+
+########################################################################
+# BENCHMARKS - each returns a function to time
+
+def _trading_ts(bars):
+    """
+    Return a synthetic timeseries with the double-7s indicators.
+    """
+    ts = synthetic_ohlcv(bars)
+    ts['regime'] = pf.CROSSOVER(ts, timeperiod_fast=1, timeperiod_slow=200)
+    ts['period_high'] = ts['close'].rolling(7).max()
+    ts['period_low'] = ts['close'].rolling(7).min()
+    return ts
+
+
+def _bar_loop(ts):
+    """
+    Run a double-7s style bar loop and return the tlog and dbal objects.
+    """
+    pf.TradeLog.cash = CAPITAL
+    pf.TradeLog.margin = pf.Margin.CASH
+    tlog = pf.TradeLog('SYN')
+    dbal = pf.DailyBal()
+    last = len(ts) - 1
+    for i, row in enumerate(ts.itertuples()):
+        date = row.Index.to_pydatetime()
+        close = row.close
+        if tlog.shares > 0:
+            if close == row.period_high or i == last:
+                tlog.sell(date, close)
+        elif row.regime > 0 and close == row.period_low:
+            tlog.buy(date, close)
+        dbal.append(date, close)
+    return tlog, dbal
+
+
+def bench_fetch_timeseries(ctx, bars):
+    symbol = write_symbol_cache(ctx['cache_dir'], bars)
+    # An absolute dir_name replaces the configured base dir.
+    return lambda: pf.fetch_timeseries(symbol, dir_name=ctx['cache_dir'])
+
+
+def bench_select_tradeperiod(ctx, bars):
+    ts = synthetic_ohlcv(bars)
+    start, end = ts.index[bars // 4], ts.index[-1]
+    return lambda: pf.select_tradeperiod(ts, start, end, use_adj=True)
+
+
+def bench_calendar(ctx, bars):
+    ts = synthetic_ohlcv(bars)
+
+    def run():
+        # Time the computation, not a lookup in the calendar cache of
+        # the versions that have one.
+        cache = getattr(pfcalendar, '_calendar_cache', None)
+        if cache is not None:
+            cache.clear()
+        pf.calendar(ts.copy(deep=False))
+    return run
+
+
+def bench_sma(ctx, bars):
+    ts = synthetic_ohlcv(bars)
+    return lambda: pf.SMA(ts, timeperiod=200)
+
+
+def bench_crossover(ctx, bars):
+    ts = synthetic_ohlcv(bars)
+    return lambda: pf.CROSSOVER(ts, timeperiod_fast=50, timeperiod_slow=200)
+
+
+def bench_momentum(ctx, bars):
+    ts = synthetic_ohlcv(bars)
+    return lambda: pf.MOMENTUM(ts, lookback=6, time_frame='monthly')
+
+
+def bench_bar_loop(ctx, bars):
+    ts = _trading_ts(bars)
+    return lambda: _bar_loop(ts)
+
+
+def bench_dailybal_get_log(ctx, bars):
+    tlog, dbal = _bar_loop(_trading_ts(bars))
+    tlog = tlog.get_log()
+    return lambda: dbal.get_log(tlog)
+
+
+def bench_stats(ctx, bars):
+    ts = _trading_ts(bars)
+    tlog, dbal = _bar_loop(ts)
+    tlog = tlog.get_log()
+    dbal = dbal.get_log(tlog)
+    return lambda: pf.stats(ts, tlog, dbal, CAPITAL)
+
+
+def bench_portfolio_rebalance(ctx, bars, symbols):
+    ts, names = synthetic_closes(bars, symbols)
+    weights = {symbol: 1 / symbols for symbol in names}
+
+    def run():
+        pf.TradeLog.cash = CAPITAL
+        pf.TradeLog.margin = pf.Margin.CASH
+        portfolio = pf.Portfolio()
+        portfolio.symbols = names
+        portfolio.init_trade_logs(ts)
+        for row in ts.itertuples():
+            if row.first_dotm:
+                portfolio.adjust_percents(row, weights)
+            portfolio.record_daily_balance(row)
+    return run
+
+
+def bench_technical_indicator(ctx, bars, symbols):
+    ts, names = synthetic_closes(bars, symbols)
+
+    @pf.technical_indicator(names, 'sma200', 'close')
+    def _sma(ts, input_column=None):
+        return pf.SMA(ts, timeperiod=200, price=input_column)
+    return lambda: _sma(ts)
+
+
+def bench_technical_indicator_batched(ctx, bars, symbols):
+    ts, names = synthetic_closes(bars, symbols)
+
+    @pf.technical_indicator(names, 'sma200', 'close', batch=True)
+    def _sma(ts, input_column=None):
+        return pf.SMA(ts, timeperiod=200, price=input_column)
+    return lambda: _sma(ts)
+
+
+def bench_volatility_matrix(ctx, bars, symbols):
+    ts, names = synthetic_closes(bars, symbols)
+    return lambda: pf.volatility_matrix(ts, names, lookback=20)
+
+
+BENCHMARKS = [
+    ('fetch_timeseries', bench_fetch_timeseries, ['bars'], ['fetch_timeseries']),
+    ('select_tradeperiod', bench_select_tradeperiod, ['bars'], ['select_tradeperiod']),
+    ('calendar', bench_calendar, ['bars'], ['calendar']),
+    ('SMA', bench_sma, ['bars'], ['SMA']),
+    ('CROSSOVER', bench_crossover, ['bars'], ['CROSSOVER']),
+    ('MOMENTUM', bench_momentum, ['bars'], ['MOMENTUM']),
+    ('bar_loop', bench_bar_loop, ['bars'], ['CROSSOVER', 'TradeLog', 'DailyBal']),
+    ('DailyBal.get_log', bench_dailybal_get_log, ['bars'],
+     ['CROSSOVER', 'TradeLog', 'DailyBal']),
+    ('stats', bench_stats, ['bars'], ['CROSSOVER', 'TradeLog', 'DailyBal', 'stats']),
+    ('technical_indicator', bench_technical_indicator, ['bars', 'symbols'],
+     ['technical_indicator', 'SMA']),
+    ('technical_indicator_batched', bench_technical_indicator_batched,
+     ['bars', 'symbols'], ['technical_indicator(batch)', 'SMA']),
+    ('volatility_matrix', bench_volatility_matrix, ['bars', 'symbols'],
+     ['volatility_matrix']),
+    ('portfolio_rebalance', bench_portfolio_rebalance, ['bars', 'symbols'],
+     ['Portfolio', 'TradeLog'])
+]
+"""
+list of tuple : (name, function, axes, required API) of each benchmark.
+The required API is the pinkfish attributes that the benchmark uses,
+e.g. 'volatility_matrix', or an attribute and one of its parameters,
+e.g. 'technical_indicator(batch)'.
+"""
+
+
+########################################################################
+# RUNNER
+
+def _missing_api(required):
+    """
+    Return the first required API that this version of pinkfish doesn't
+    have, or None.
+    """
+    for api in required:
+        name, _, param = api.rstrip(')').partition('(')
+        if not hasattr(pf, name):
+            return api
+        if param and param not in inspect.signature(getattr(pf, name)).parameters:
+            return api
+    return None
+
+
+def _sizes(name, params):
+    """
+    Return the sizes to run a benchmark with: `params`, with fewer bars
+    for large numbers of symbols.
+    """
+    if 'symbols' not in params:
+        return params
+    symbols = params['symbols']
+    bars = min(params['bars'], int(MAX_CELLS // symbols))
+    if name == 'portfolio_rebalance':
+        bars = min(bars, max(MIN_PORTFOLIO_BARS,
+                             int(MAX_PORTFOLIO_WORK * 21 / symbols**2)))
+    return dict(params, bars=bars)
+
+
+def time_function(func, repeat, min_time):
+    """
+    Return the times of calling `func` `repeat` times.  Stop early once
+    a call takes longer than `min_time` seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if times[-1] > min_time:
+            break
+    return times
+
+
+def run(bars, symbols, only=None, repeat=5, min_time=1.0):
+    """
+    Run the benchmarks and return a list of results.
+    """
+    results = []
+    ctx = {'cache_dir': tempfile.mkdtemp(prefix='pinkfish-bench-')}
+    try:
+        for name, bench, axes, required in BENCHMARKS:
+            if only and not any(o.lower() in name.lower() for o in only):
+                continue
+            missing = _missing_api(required)
+            grid = [{'bars': b} for b in bars]
+            if 'symbols' in axes:
+                grid = [{'bars': b, 'symbols': s} for b in bars for s in symbols]
+            timed = {}
+            for params in grid:
+                result = {'name': name, 'params': params}
+                sizes = _sizes(name, params)
+                if sizes != params:
+                    result['sizes'] = sizes
+                key = tuple(sizes.items())
+                if missing:
+                    result['skipped'] = f'pinkfish has no {missing}'
+                elif key in timed:
+                    result['skipped'] = f'same sizes as {timed[key]}'
+                else:
+                    timed[key] = ' '.join(f'{k}={v}' for k, v in params.items())
+                    times = time_function(bench(ctx, **sizes), repeat, min_time)
+                    result.update({'min': min(times), 'median': statistics.median(times),
+                                   'times': times})
+                results.append(result)
+                _print_result(result)
+    finally:
+        shutil.rmtree(ctx['cache_dir'], ignore_errors=True)
+    return results
+
+
+def _key(result):
+    return result['name'], tuple(sorted(result['params'].items()))
+
+
+def _print_result(result, baseline=None):
+    params = ' '.join(f'{k}={v}' for k, v in result['params'].items())
+    line = f"{result['name']:<28} {params:<24}"
+    if 'sizes' in result:
+        line += f" (bars={result['sizes']['bars']})"
+    if 'skipped' in result:
+        print(f'{line} skipped ({result["skipped"]})')
+        return
+    line += f" min {result['min']*1000:10.2f} ms"
+    if baseline and 'min' in baseline:
+        line += f"  {baseline['min'] / result['min']:6.2f}x vs baseline"
+    print(line)
+
+
+def _metadata():
+    try:
+        version = importlib.metadata.version('pinkfish')
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return {
+        'pinkfish': version,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--full', action='store_true',
+                        help=f'use bars {FULL_BARS} and symbols {FULL_SYMBOLS}')
+    parser.add_argument('--bars', type=lambda s: [int(x) for x in s.split(',')],
+                        help='comma separated bar counts')
+    parser.add_argument('--symbols', type=lambda s: [int(x) for x in s.split(',')],
+                        help='comma separated symbol counts')
+    parser.add_argument('--only', nargs='+', help='run benchmarks whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=5, help='calls per size (default 5)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='print the speedup relative to this results file')
+    args = parser.parse_args(argv)
+
+    bars = args.bars or (FULL_BARS if args.full else QUICK_BARS)
+    symbols = args.symbols or (FULL_SYMBOLS if args.full else QUICK_SYMBOLS)
+    results = run(bars, symbols, args.only, args.repeat)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {_key(r): r for r in json.load(f)['results']}
+        print(f'\ncompared to {args.compare}:')
+        for result in results:
+            _print_result(result, baseline.get(_key(result)))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'metadata': _metadata(), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
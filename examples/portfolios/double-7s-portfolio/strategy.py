@@ -126,28 +126,28 @@ class Strategy:
                     use_adj=self.options['use_adj'])
         
         # Technical indicator functions.
-        @pf.technical_indicator(self.symbols, 'regime', 'close')
+        @pf.technical_indicator(self.symbols, 'regime', 'close', batch=True)
         def _crossover(ts, input_column=None):
             """ Technical indicator: 200 sma regime filter for each symbol. """
             return pf.CROSSOVER(ts, timeperiod_fast=1, timeperiod_slow=200,
                                 price=input_column, prevday=False)
 
-        @pf.technical_indicator(self.symbols, 'vola', 'close') 
+        @pf.technical_indicator(self.symbols, 'vola', 'close', batch=True)
         def _volatility(ts, input_column=None):
             """ Technical indicator: volatility. """
             return pf.VOLATILITY(ts, price=input_column)
 
         period = self.options['period']
 
-        @pf.technical_indicator(self.symbols, 'period_high'+str(period), 'close')
+        @pf.technical_indicator(self.symbols, 'period_high'+str(period), 'close', batch=True)
         def _period_high(ts, input_column=None):
             """ Technical indicator: X day high. """ 
-            return pd.Series(ts[input_column]).rolling(period).max()
+            return pf.PERIOD_HIGH(ts, timeperiod=period, price=input_column)
 
-        @pf.technical_indicator(self.symbols, 'period_low'+str(period), 'close')
+        @pf.technical_indicator(self.symbols, 'period_low'+str(period), 'close', batch=True)
         def _period_low(ts, input_column=None):
             """ Technical indicator: X day low. """
-            return pd.Series(ts[input_column]).rolling(period).min()
+            return pf.PERIOD_LOW(ts, timeperiod=period, price=input_column)
 
         # Add technical indicators.
         self.ts = _crossover(self.ts)
@@ -143,7 +143,7 @@ class Strategy:
         # Add technical indicator Momenteum for all symbols in portfolio.
         lookbacks = range(3, 18+1)
         for lookback in lookbacks:
-            @pf.technical_indicator(self.symbols.values(), 'mom'+str(lookback), 'close')
+            @pf.technical_indicator(self.symbols.values(), 'mom'+str(lookback), 'close', batch=True)
             def _momentum(ts, input_column=None):
                 return pf.MOMENTUM(ts, lookback=lookback, time_frame='monthly',
                                    price=input_column, prevday=False)
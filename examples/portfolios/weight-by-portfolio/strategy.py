@@ -152,33 +152,33 @@ class Strategy:
         self.ts = pf.calendar(self.ts)
 
         # Technical indicator functions.
-        @pf.technical_indicator(self.symbols, 'regime', 'close')
+        @pf.technical_indicator(self.symbols, 'regime', 'close', batch=True)
         def _crossover(ts, input_column=None):
             """ Technical indicator: 200 sma regime filter for each symbol. """
             return pf.CROSSOVER(ts, timeperiod_fast=1, timeperiod_slow=200,
                                 price=input_column, prevday=False)
 
-        @pf.technical_indicator(self.symbols, 'sharpe', 'close')
+        @pf.technical_indicator(self.symbols, 'sharpe', 'close', batch=True)
         def _sharpe_ratio(ts, input_column=None):
             """ Technical indicator: Sharpe Ratio (3 yr annualized). """
             return pf.ANNUALIZED_SHARPE_RATIO(ts, lookback=3, price=input_column)
 
-        @pf.technical_indicator(self.symbols, 'ret', 'close')
+        @pf.technical_indicator(self.symbols, 'ret', 'close', batch=True)
         def _annual_return(ts, input_column=None):
             """ Technical indicator: Return (1 yr annualized). """
             return pf.ANNUALIZED_RETURNS(ts, lookback=1, price=input_column)        
 
-        @pf.technical_indicator(self.symbols, 'sd', 'close')
+        @pf.technical_indicator(self.symbols, 'sd', 'close', batch=True)
         def _std_dev(ts, input_column=None):
             """ Technical indicator: Standard Deviation (3 yr annualized). """
             return pf.ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3, price=input_column)
 
-        @pf.technical_indicator(self.symbols, 'vola', 'close')
+        @pf.technical_indicator(self.symbols, 'vola', 'close', batch=True)
         def _volatility(ts, input_column=None):
             """ Technical indicator: volatility (20 day annualized). """
             return pf.VOLATILITY(ts, lookback=20, downside=False, price=input_column)
 
-        @pf.technical_indicator(self.symbols, 'ds_vola', 'close')
+        @pf.technical_indicator(self.symbols, 'ds_vola', 'close', batch=True)
         def _downside_volatility(ts, input_column=None):
             """ Technical indicator: downside volatility (20 day annualized). """
             return pf.VOLATILITY(ts, lookback=20, downside=True, price=input_column)
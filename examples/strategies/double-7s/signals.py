@@ -178,7 +178,7 @@ def build_pretty_table(df, period_high, period_low):
     pt.update_col_header_style(
         format_function=lambda x: x.upper(), text_align='right')
     pt.update_row_header_style(
-        format_function=lambda x: pd.to_datetime(str(x)).strftime('%Y/%m/%d'),
+        format_function=lambda x: pd.Timestamp(x).strftime('%Y/%m/%d'),
         text_align='right')
 
     text_cols = {'pattern', 'action', 'position', 'buy_ok', 'entry_date',
@@ -230,12 +230,11 @@ def build_pretty_table(df, period_high, period_low):
 def save_html(pt, path):
     """Write the formatted table to an HTML file."""
     path = Path(path)
-    html = pt._repr_html_()
-    path.write_text(
-        f'<!DOCTYPE html><html><head><meta charset="utf-8">'
-        f'<title>Double-7s Signals</title></head>'
-        f'<body>{html}</body></html>',
-        encoding='utf-8')
+    with path.open('w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8">'
+                '<title>Double-7s Signals</title></head><body>')
+        pt.to_html(f)
+        f.write('</body></html>')
     return path
 
 
@@ -100,8 +100,8 @@ class Strategy:
         self.ts['sma'] = pf.SMA(self.ts, timeperiod=self.options['sma'])
 
         # Add technical indicator: X day high, and X day low.
-        self.ts['period_high'] = pd.Series(self.ts.close).rolling(self.options['period']).max()
-        self.ts['period_low']  = pd.Series(self.ts.close).rolling(self.options['period']).min()
+        self.ts['period_high'] = pf.PERIOD_HIGH(self.ts, timeperiod=self.options['period'])
+        self.ts['period_low']  = pf.PERIOD_LOW(self.ts, timeperiod=self.options['period'])
         
         # Finalize timeseries.
         self.ts, self.start = pf.finalize_timeseries(self.ts, self.start, dropna=True, drop_columns=['open', 'high', 'low'])
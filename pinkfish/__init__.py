@@ -1,87 +1,208 @@
-from .fetch import (
-    fetch_timeseries,
-    select_tradeperiod,
-    finalize_timeseries,
-    remove_cache_symbols,
-    update_cache_symbols,
-    get_symbol_metadata,
-    get_quote
-)
+"""
+pinkfish: a backtester and spreadsheet library for security analysis.
 
-from .trade import (
-    Direction,
-    Margin,
-    TradeLog,
-    TradeState,
-    DailyBal
-)
+The public API is loaded lazily.  A submodule, and the packages it
+depends on, e.g. matplotlib or yfinance, is imported the first time
+one of its names is used, e.g. `pf.SMA`, so a headless job that never
+plots or downloads doesn't pay for them.  The `pf.X` API is unchanged.
+See benchmarks/import_time.py.
+"""
 
-from .pfstatistics import (
-    ALPHA_BEGIN,
-    SP500_BEGIN,
-    get_trading_days,
-    currency_metrics,
-    stats,
-    currency,
-    summary,
-    optimizer_summary
-)
+import importlib
 
-from .plot import (
-    plot_equity_curve,
-    plot_equity_curves,
-    plot_trades,
-    plot_bar_graph,
-    optimizer_plot_bar_graph
+from .stock_market_calendar import (
+    stock_market_calendar
 )
 
-from .benchmark import (
-    Benchmark
-)
+_LAZY_ATTRIBUTES = {
+    'fetch': [
+        'fetch_timeseries',
+        'select_tradeperiod',
+        'finalize_timeseries',
+        'remove_cache_symbols',
+        'update_cache_symbols',
+        'get_symbol_metadata',
+        'get_quote',
+        'memoize_timeseries'
+    ],
+    'trade': [
+        'Direction',
+        'Margin',
+        'TradeLog',
+        'TradeState',
+        'DailyBal'
+    ],
+    'pfstatistics': [
+        'ALPHA_BEGIN',
+        'SP500_BEGIN',
+        'get_trading_days',
+        'currency_metrics',
+        'stats',
+        'stats_matrix',
+        'currency',
+        'summary',
+        'optimizer_summary'
+    ],
+    'plot': [
+        'plot_equity_curve',
+        'plot_equity_curves',
+        'plot_trades',
+        'plot_bar_graph',
+        'optimizer_plot_bar_graph',
+        'draw_equity_curve',
+        'draw_trades',
+        'draw_bar_graph'
+    ],
+    'downsampling': [
+        'downsample',
+        'aggregate_markers'
+    ],
+    'results': [
+        'Run',
+        'save_run',
+        'load_run',
+        'read_manifest'
+    ],
+    'catalog': [
+        'RunCatalog'
+    ],
+    'render': [
+        'CHARTS',
+        'Chart',
+        'headless_figure',
+        'render_chart',
+        'render_report',
+        'render_reports'
+    ],
+    'benchmark': [
+        'Benchmark'
+    ],
+    'portfolio': [
+        'Portfolio',
+        'technical_indicator'
+    ],
+    'indicator': [
+        'SMA',
+        'EMA',
+        'PERIOD_HIGH',
+        'PERIOD_LOW',
+        'SMA_GRID',
+        'STDDEV_GRID',
+        'PERIOD_HIGH_GRID',
+        'PERIOD_LOW_GRID',
+        'CROSSOVER',
+        'MOMENTUM',
+        'VOLATILITY',
+        'VOLATILITY_METRIC_FLOOR',
+        'inverse_volatility_weight',
+        'ANNUALIZED_RETURNS',
+        'ANNUALIZED_STANDARD_DEVIATION',
+        'ANNUALIZED_SHARPE_RATIO',
+        'MAX_DRAWDOWN',
+        'MAX_RUNUP'
+    ],
+    'indicator_cache': [
+        'IndicatorCache',
+        'cache_indicators',
+        'cached_indicator',
+        'seed_indicator'
+    ],
+    'risk': [
+        'volatility_matrix',
+        'covariance_matrix',
+        'inverse_volatility_weights',
+        'risk_parity_weights',
+        'volatility_target_weights'
+    ],
+    'pipeline': [
+        'Feature',
+        'add_features'
+    ],
+    'profiling': [
+        'Profiler',
+        'profile',
+        'phase',
+        'profiled',
+        'count_hot_loop',
+        'counter_report',
+        'sample_stacks',
+        'StackSampler'
+    ],
+    'streaming': [
+        'SMAStream',
+        'EMAStream',
+        'PeriodHighStream',
+        'PeriodLowStream',
+        'CrossOverStream',
+        'MomentumStream',
+        'VolatilityStream',
+        'save_checkpoint',
+        'load_checkpoint'
+    ],
+    'optimizer': [
+        'sweep',
+        'WalkForward'
+    ],
+    'pfcalendar': [
+        'calendar',
+        'calendar_frame'
+    ],
+    'analysis': [
+        'prettier_graphs',
+        'draw_prettier_graphs',
+        'volatility_graphs',
+        'kelly_criterion'
+    ],
+    'utility': [
+        'ROOT',
+        'import_strategy',
+        'print_full',
+        'read_config',
+        'is_last_row',
+        'get_previous_row',
+        'sort_dict',
+        'set_dict_values',
+        'find_nan_rows',
+        'set_compact_dtypes',
+        'get_compact_dtypes',
+        'compact_dtypes',
+        'to_compact_dtypes'
+    ]
+}
+"""
+dict : The public names of each submodule, imported on first use.
+"""
 
-from .portfolio import (
-    Portfolio,
-    technical_indicator
-)
+_ATTRIBUTE_MODULES = {name: module for module, names in _LAZY_ATTRIBUTES.items()
+                      for name in names}
 
-from .indicator import (
-    SMA,
-    EMA,
-    CROSSOVER,
-    MOMENTUM,
-    VOLATILITY,
-    VOLATILITY_METRIC_FLOOR,
-    inverse_volatility_weight,
-    ANNUALIZED_RETURNS,
-    ANNUALIZED_STANDARD_DEVIATION,
-    ANNUALIZED_SHARPE_RATIO
-)
+_SUBMODULES = [
+    'analysis', 'benchmark', 'catalog', 'downsampling', 'fetch', 'indicator', 'indicator_cache',
+    'itable', 'optimizer', 'pfcalendar', 'pfstatistics', 'pipeline',
+    'plot', 'portfolio', 'profiling', 'render', 'results', 'risk', 'signals', 'stock_market_calendar',
+    'streaming', 'trade', 'utility'
+]
 
-from .pfcalendar import (
-    calendar
-)
+__all__ = ['stock_market_calendar', *_ATTRIBUTE_MODULES, 'DEBUG', 'DBG']
 
-from .stock_market_calendar import (
-    stock_market_calendar
-)
 
-from .analysis import (
-    prettier_graphs,
-    volatility_graphs,
-    kelly_criterion
-)
+def __getattr__(name):
+    """
+    Import the submodule that defines `name` on first use.
+    """
+    module = _ATTRIBUTE_MODULES.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(f'.{module}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_SUBMODULES))
 
-from .utility import (
-    ROOT,
-    import_strategy,
-    print_full,
-    read_config,
-    is_last_row,
-    get_previous_row,
-    sort_dict,
-    set_dict_values,
-    find_nan_rows
-)
 
 DEBUG = False
 """
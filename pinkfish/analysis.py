@@ -102,6 +102,41 @@ def prettier_graphs(dbal, benchmark_dbal, dbal_label='Strategy',
     >>> prettier_graphs(dbal['close'], benchmark_dbal['close'],
                         points_to_plot=5000)
     """
+    # Make new figure and set the size.
+    fig = plt.figure(figsize=(12, 8))
+    draw_prettier_graphs(fig, dbal, benchmark_dbal, dbal_label,
+                         benchmark_label, points_to_plot)
+
+
+def draw_prettier_graphs(fig, dbal, benchmark_dbal, dbal_label='Strategy',
+                         benchmark_label='Benchmark', points_to_plot=None):
+    """
+    Draw the 3 subplots of `prettier_graphs()` on a figure.
+
+    Unlike `prettier_graphs()`, this doesn't use the pyplot current
+    figure, so it is safe to call on a headless figure in a thread or
+    worker process.  See `pinkfish.render`.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to draw on, e.g. of figsize (12, 8).
+    dbal : pd.Series
+        Strategy daily closing balance indexed by date.
+    benchmark_dbal : pd.Series
+        Benchmark daily closing balance indexed by date.
+    dbal_label : str, optional
+        Label to use in graph for strategy (default is 'Strategy').
+    benchmark_label : str, optional
+        Label to use in graph for benchmark (default is 'Benchmark').
+    points_to_plot : int, optional
+        Define how many points (trading days) we intend to plot
+        (default is None, which implies plot all points or days).
+
+    Returns
+    -------
+    None
+    """
     if points_to_plot is None:
         points_to_plot = 0
 
@@ -127,9 +162,6 @@ def prettier_graphs(dbal, benchmark_dbal, dbal_label='Strategy',
     # before.  Slice the data, cut points we don't intend to plot.
     plot_data = data[-points_to_plot:]
 
-    # Make new figure and set the size.
-    fig = plt.figure(figsize=(12, 8))
-
     # The first subplot, planning for 3 plots high, 1 plot wide,
     # this being the first.
     ax = fig.add_subplot(311)
@@ -0,0 +1,471 @@
+"""
+A file-backed catalog of strategy runs.
+
+The catalog is a directory with an SQLite database of run metadata and
+statistics, and the data of each run saved with `save_run()`.  Runs
+can be filtered by strategy, symbol, options, and dates, and filtered
+and ranked on any statistic with SQL, without loading any run data.
+The daily balances of the selected runs are then loaded, memory
+mapped, one run at a time.
+
+The database has a `runs` table with one row per run.  Its columns are
+the metadata columns 'id', 'name', 'strategy', 'symbols', 'capital',
+'run_start', 'run_end', 'options', 'created', and 'path', and one
+column per statistic, e.g. 'sharpe_ratio', added when a run with a new
+statistic is first stored.  'symbols' and 'options' are JSON, so
+options can be used in SQL with `json_extract(options, '$.period')`.
+"""
+
+import datetime
+import json
+from pathlib import Path
+import shutil
+import sqlite3
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import pinkfish.results as results
+
+
+DATABASE = 'catalog.sqlite'
+
+METADATA_COLUMNS = ('id', 'name', 'strategy', 'symbols', 'capital', 'run_start',
+                    'run_end', 'options', 'created', 'path')
+"""
+tuple of str : The metadata columns of the runs table.
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    strategy TEXT,
+    symbols TEXT,
+    capital REAL,
+    run_start TEXT,
+    run_end TEXT,
+    options TEXT,
+    created TEXT,
+    path TEXT
+);
+CREATE TABLE IF NOT EXISTS run_symbols (
+    run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    symbol TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs(strategy);
+CREATE INDEX IF NOT EXISTS runs_run_start ON runs(run_start);
+CREATE INDEX IF NOT EXISTS run_symbols_symbol ON run_symbols(symbol, run_id);
+"""
+
+
+def _quote(name):
+    """
+    Return `name` quoted as an SQL identifier.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    """
+    Return `value` as a type that SQLite stores.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return json.dumps(results._to_json(value))
+
+
+class RunCatalog:
+    """
+    A catalog of strategy runs in a directory.
+    """
+
+    def __init__(self, dir_name, timeout=30):
+        """
+        Open a catalog, creating it if it doesn't exist.
+
+        Several processes, e.g. the workers of a parameter sweep, can
+        add runs to the same catalog.
+
+        Parameters
+        ----------
+        dir_name : str or Path
+            The catalog directory.
+        timeout : float, optional
+            The seconds to wait for another process to release the
+            database (default is 30).
+
+        Attributes
+        ----------
+        dir_name : Path
+            The catalog directory.
+
+        Examples
+        --------
+        >>> with pf.RunCatalog('runs') as catalog:
+        ...     catalog.add(s, name='double-7s-SPY-period-7')
+        """
+        self.dir_name = Path(dir_name)
+        (self.dir_name / 'runs').mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.dir_name / DATABASE, timeout=timeout)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def close(self):
+        """
+        Close the database.
+        """
+        self._conn.close()
+
+    def columns(self):
+        """
+        Return the columns of the runs table.
+
+        Returns
+        -------
+        list of str
+            The metadata columns followed by the statistic columns.
+        """
+        return [row[1] for row in self._conn.execute('PRAGMA table_info(runs)')]
+
+    ####################################################################
+    # ADD AND REMOVE
+
+    def _add_stat_columns(self, names):
+        """
+        Add a column for each statistic that doesn't have one.
+        """
+        existing = set(self.columns())
+        for name in names:
+            if name in existing:
+                continue
+            try:
+                self._conn.execute(f'ALTER TABLE runs ADD COLUMN {_quote(name)}')
+            except sqlite3.OperationalError as e:
+                # Another process may have added it since columns().
+                if 'duplicate column name' not in str(e):
+                    raise
+
+    def add(self, run, name=None, frames=results.FRAMES):
+        """
+        Add a run to the catalog.
+
+        The run data is saved with `save_run()` and the metadata and
+        statistics are stored in one transaction, so a failed add
+        leaves no trace.  Ids are never reused, and each run is saved
+        to a new directory, so concurrent adds and removes can't touch
+        each other's data.
+
+        Parameters
+        ----------
+        run : object
+            The strategy, or a `Run`, with a `stats` attribute.
+        name : str, optional
+            A unique name for the run (default is None).
+        frames : tuple of str, optional
+            The dataframes to save (default is `results.FRAMES`).
+
+        Returns
+        -------
+        int
+            The id of the run.
+
+        Raises
+        ------
+        ValueError
+            If a statistic has the name of a metadata column.
+        sqlite3.IntegrityError
+            If a run with the same name exists.
+        """
+        manifest = results._manifest(run)
+        # The raw statistics, since the manifest has tagged the dates.
+        stats = getattr(run, 'stats', None)
+        stats = {} if stats is None else {str(k): v for k, v in stats.items()}
+        conflicts = set(stats) & set(METADATA_COLUMNS)
+        if conflicts:
+            raise ValueError(f'statistics with reserved names: {sorted(conflicts)}')
+
+        path = f'runs/{uuid.uuid4().hex}'
+        try:
+            with self._conn:
+                self._add_stat_columns(stats)
+                values = {
+                    'name': name,
+                    'strategy': manifest['strategy'],
+                    'symbols': json.dumps(manifest['symbols']),
+                    'capital': _sql_value(getattr(run, 'capital', None)),
+                    'run_start': _sql_value(getattr(run, 'start', None)),
+                    'run_end': _sql_value(getattr(run, 'end', None)),
+                    'options': json.dumps(manifest['options']),
+                    'created': _sql_value(datetime.datetime.now().replace(microsecond=0)),
+                    'path': path
+                }
+                values.update({k: _sql_value(v) for k, v in stats.items()})
+                sql = (f'INSERT INTO runs ({", ".join(_quote(k) for k in values)}) '
+                       f'VALUES ({", ".join("?" * len(values))})')
+                run_id = self._conn.execute(sql, list(values.values())).lastrowid
+                self._conn.executemany('INSERT INTO run_symbols VALUES (?, ?)',
+                                       [(run_id, s) for s in manifest['symbols']])
+                results.save_run(run, self.dir_name / path, frames=frames)
+        except BaseException:
+            # Don't leave the data of a run that wasn't added.
+            shutil.rmtree(self.dir_name / path, ignore_errors=True)
+            raise
+        return run_id
+
+    def remove(self, run_id):
+        """
+        Remove a run and its data from the catalog.
+
+        Parameters
+        ----------
+        run_id : int
+            The id of the run.
+
+        Returns
+        -------
+        None
+        """
+        path = self._path(run_id)
+        with self._conn:
+            self._conn.execute('DELETE FROM runs WHERE id = ?', (run_id,))
+        shutil.rmtree(path, ignore_errors=True)
+
+    ####################################################################
+    # QUERY
+
+    def query(self, where=None, params=(), strategy=None, symbol=None,
+              options=None, start=None, end=None, columns=None,
+              order_by=None, limit=None):
+        """
+        Return the runs that match all the given filters.
+
+        Parameters
+        ----------
+        where : str, optional
+            An SQL condition on the columns of the runs table, e.g.
+            'sharpe_ratio > 1 AND max_closed_out_drawdown > -30'
+            (default is None).
+        params : tuple, optional
+            The values of the '?' placeholders in `where`
+            (default is ()).
+        strategy : str, optional
+            The strategy class, e.g. 'strategy.Strategy'
+            (default is None).
+        symbol : str, optional
+            A symbol of the run (default is None).
+        options : dict, optional
+            Option values the run must have, e.g. {'period': 7}
+            (default is None).
+        start : datetime.datetime, optional
+            The earliest run start date (default is None).
+        end : datetime.datetime, optional
+            The latest run end date (default is None).
+        columns : list of str, optional
+            The columns to return (default is None, which implies
+            all the columns).
+        order_by : str, optional
+            An SQL ORDER BY expression, e.g. 'sharpe_ratio DESC'
+            (default is None, which implies the order of ids).
+        limit : int, optional
+            The maximum number of runs to return (default is None).
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per run, indexed by run id.
+
+        Examples
+        --------
+        >>> catalog.query(symbol='SPY', options={'period': 7},
+        ...               where='annual_return_rate > ?', params=(5,),
+        ...               order_by='sharpe_ratio DESC', limit=10)
+        """
+        conditions = []
+        params = list(params)
+        if where:
+            conditions.append(f'({where})')
+        if strategy is not None:
+            conditions.append('strategy = ?')
+            params.append(strategy)
+        if symbol is not None:
+            conditions.append('id IN (SELECT run_id FROM run_symbols WHERE symbol = ?)')
+            params.append(symbol)
+        for key, value in (options or {}).items():
+            conditions.append('json_extract(options, ?) = ?')
+            params.extend([f'$."{key}"', _sql_value(value)])
+        if start is not None:
+            conditions.append('run_start >= ?')
+            params.append(_sql_value(start))
+        if end is not None:
+            conditions.append('run_end <= ?')
+            params.append(_sql_value(end))
+
+        select = '*'
+        if columns is not None:
+            columns = ['id'] + [c for c in columns if c != 'id']
+            select = ', '.join(_quote(c) for c in columns)
+        sql = f'SELECT {select} FROM runs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {order_by or "id"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return pd.read_sql_query(sql, self._conn, params=params, index_col='id')
+
+    def top(self, metric, k=10, ascending=False, **filters):
+        """
+        Return the k best runs by a statistic.
+
+        Runs without a value for the statistic are ranked last.
+
+        Parameters
+        ----------
+        metric : str
+            The statistic, e.g. 'sharpe_ratio'.
+        k : int, optional
+            The number of runs (default is 10).
+        ascending : bool, optional
+            True if lower values are better, e.g. for 'annual_std'
+            (default is False).
+        **filters
+            The filters of `query()`, e.g. symbol='SPY'.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per run, indexed by run id, best first.
+
+        Examples
+        --------
+        >>> best = catalog.top('sharpe_ratio', k=5, strategy='strategy.Strategy')
+        >>> curves = catalog.equity_curves(best.index)
+        """
+        order = 'ASC' if ascending else 'DESC'
+        order_by = f'{_quote(metric)} IS NULL, {_quote(metric)} {order}'
+        return self.query(order_by=order_by, limit=k, **filters)
+
+    def summary(self, run_ids, metrics):
+        """
+        Return a summary of runs vs metrics.
+
+        Like `optimizer_summary()`, but read from the catalog.
+
+        Parameters
+        ----------
+        run_ids : list of int
+            The ids of the runs.
+        metrics : tuple of str
+            The metrics to be used in the summary.
+
+        Returns
+        -------
+        pd.DataFrame
+            Summary of metrics (rows) vs runs (columns).
+        """
+        run_ids = [int(run_id) for run_id in run_ids]
+        where = f'id IN ({", ".join("?" * len(run_ids))})'
+        df = self.query(where=where, params=run_ids, columns=list(metrics))
+        return df.reindex(run_ids).transpose()
+
+    ####################################################################
+    # LOAD
+
+    def _path(self, run_id):
+        row = self._conn.execute('SELECT path FROM runs WHERE id = ?', (int(run_id),)).fetchone()
+        if row is None:
+            raise KeyError(f'no run with id {run_id}')
+        return self.dir_name / row[0]
+
+    def load(self, run_id, frames=None, mmap=False):
+        """
+        Load a run.
+
+        Parameters
+        ----------
+        run_id : int
+            The id of the run.
+        frames : list of str, optional
+            The dataframes to load (default is None, which implies all
+            the saved dataframes).
+        mmap : bool, optional
+            True to memory map the arrays (default is False).
+
+        Returns
+        -------
+        Run
+            The run.
+
+        Raises
+        ------
+        KeyError
+            If there is no run with this id.
+        """
+        return results.load_run(self._path(run_id), frames=frames, mmap=mmap)
+
+    def iter_runs(self, run_ids, frames=None, mmap=True):
+        """
+        Load runs one at a time.
+
+        Parameters
+        ----------
+        run_ids : list of int
+            The ids of the runs, e.g. the index of `query()`.
+        frames : list of str, optional
+            The dataframes to load (default is None, which implies all
+            the saved dataframes).
+        mmap : bool, optional
+            True to memory map the arrays (default is True).
+
+        Yields
+        ------
+        tuple of (int, Run)
+            The id and the run.
+        """
+        for run_id in run_ids:
+            yield run_id, self.load(run_id, frames=frames, mmap=mmap)
+
+    def equity_curves(self, run_ids, field='close', mmap=True):
+        """
+        Return the daily balance of runs, one column per run.
+
+        Only the daily balance of the given runs is read.
+
+        Parameters
+        ----------
+        run_ids : list of int
+            The ids of the runs, e.g. the index of `top()`.
+        field : str, optional
+            The daily balance column (default is 'close').
+        mmap : bool, optional
+            True to memory map the arrays (default is True).
+
+        Returns
+        -------
+        pd.DataFrame
+            The equity curves, indexed by the union of the dates, with
+            one column per run id.
+        """
+        curves = {run_id: run.dbal[field]
+                  for run_id, run in self.iter_runs(run_ids, frames=['dbal'], mmap=mmap)}
+        if not curves:
+            return pd.DataFrame()
+        return pd.concat(curves, axis=1)
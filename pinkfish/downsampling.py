@@ -0,0 +1,242 @@
+"""
+Downsampling for plots.
+
+A chart can't show more points than it has pixels, but matplotlib
+still draws every point it is given, so plotting a century of daily
+closes, or minute data, is slow and produces huge vector files.
+`downsample()` reduces a series to a few points per pixel column
+while keeping its shape: with method='minmax' the first, last, lowest,
+and highest point of every column are kept, so peaks and drawdowns
+are drawn exactly; with method='lttb' (Largest-Triangle-Three-Buckets)
+one visually significant point per column is kept.
+
+Downsampled positions are cached, keyed by a fingerprint of the
+series, so plotting the same series at the same width again doesn't
+recompute them.
+
+`aggregate_markers()` merges trade markers that would overlap on the
+chart into one marker per marker width, with the number of trades it
+represents.
+"""
+
+from collections import OrderedDict
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+DOWNSAMPLE_METHODS = ('minmax', 'lttb')
+"""
+tuple of str : The downsampling methods.
+"""
+
+_DOWNSAMPLE_CACHE_SIZE = 64
+_downsample_cache = OrderedDict()
+"""
+OrderedDict : The positions of the most recently downsampled series,
+keyed by a fingerprint of the series, the method, and the width.
+"""
+
+
+########################################################################
+# DOWNSAMPLING
+
+def _series_key(s, method, width):
+    """
+    Return a fingerprint of a series and the downsampling parameters.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{method}{width}{len(s)}'.encode())
+    for values in (s.index.to_numpy(), s.to_numpy()):
+        if values.dtype == object:
+            values = pd.util.hash_array(values)
+        h.update(str(values.dtype).encode())
+        h.update(np.ascontiguousarray(values).view(np.uint8))
+    return h.hexdigest()
+
+
+def minmax_positions(y, width):
+    """
+    Return the positions of the first, last, min, and max of `width`
+    equal buckets of `y`.
+
+    NaNs are only selected for a bucket without any number.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        The values.
+    width : int
+        The number of buckets, e.g. the width of the plot in pixels.
+
+    Returns
+    -------
+    np.ndarray
+        The sorted positions, at most 4 per bucket.
+    """
+    n = len(y)
+    if n <= 4 * width:
+        return np.arange(n)
+    size = -(-n // width)
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    low = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    high = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    positions = np.concatenate([starts, starts + low, starts + high,
+                                np.minimum(starts + size, n) - 1])
+    return np.unique(np.minimum(positions, n - 1))
+
+
+def lttb_positions(x, y, width):
+    """
+    Return the positions of `width` points of `y` selected with the
+    Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last point are always kept.  Each of the other
+    points is the point of its bucket that forms the largest triangle
+    with the previously selected point and the mean of the next bucket.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values, ascending.
+    y : np.ndarray
+        The y values, without NaNs.
+    width : int
+        The number of points to keep, at least 3.
+
+    Returns
+    -------
+    np.ndarray
+        The sorted positions.
+    """
+    n = len(y)
+    if n <= width or width < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, width - 1).astype(int)
+    positions = np.empty(width, dtype=int)
+    positions[0] = 0
+    positions[-1] = n - 1
+    a = 0
+    for i in range(width - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[hi:edges[i + 2]].mean()
+            next_y = y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(area.argmax())
+        positions[i + 1] = a
+    return positions
+
+
+def downsample(s, width, method='minmax'):
+    """
+    Downsample a series for a plot `width` pixels wide.
+
+    The buckets are equal numbers of points, which for daily or
+    minute bars is close to equal widths on the x axis.
+
+    Parameters
+    ----------
+    s : pd.Series
+        The series, e.g. the daily balance 'close', indexed by date.
+    width : int
+        The width of the plot in pixels.
+    method : str, optional {'minmax', 'lttb'}
+        The downsampling method (default is 'minmax').  'minmax'
+        keeps up to 4 points per pixel, including the extremes, so the
+        plot looks the same as the full series.  'lttb' keeps 1 point
+        per pixel and ignores NaNs.
+
+    Returns
+    -------
+    pd.Series
+        The selected points of `s`, or `s` if it is not longer than
+        the result would be.
+
+    Raises
+    ------
+    ValueError
+        If the method is invalid.
+
+    Examples
+    --------
+    >>> axes.plot(pf.downsample(dbal['close'], width=800))
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f'invalid method "{method}"')
+    width = int(width)
+    if len(s) <= width:
+        return s
+
+    key = _series_key(s, method, width)
+    if key in _downsample_cache:
+        _downsample_cache.move_to_end(key)
+        return s.iloc[_downsample_cache[key]]
+
+    y = s.to_numpy(dtype=float)
+    if method == 'minmax':
+        positions = minmax_positions(y, width)
+    else:
+        valid = np.flatnonzero(~np.isnan(y))
+        x = np.arange(len(y), dtype=float)
+        if isinstance(s.index, pd.DatetimeIndex):
+            x = s.index.asi8.astype(float)
+        positions = valid[lttb_positions(x[valid], y[valid], width)]
+
+    _downsample_cache[key] = positions
+    if len(_downsample_cache) > _DOWNSAMPLE_CACHE_SIZE:
+        _downsample_cache.popitem(last=False)
+    return s.iloc[positions]
+
+
+########################################################################
+# TRADE MARKERS
+
+def aggregate_markers(s, start, end, buckets):
+    """
+    Merge the points of `s` that fall in the same of `buckets` equal
+    intervals between `start` and `end`.
+
+    Each interval is represented by its first point, so the marker is
+    drawn on the curve, with the number of points merged into it.
+
+    Parameters
+    ----------
+    s : pd.Series
+        The marker values, e.g. the close on the dates of the buys,
+        indexed by ascending date.
+    start, end : datetime.datetime
+        The limits of the x axis.
+    buckets : int
+        The number of intervals, e.g. the plot width divided by the
+        marker width.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per interval with a marker, indexed by the date of
+        its first point, with columns 'value' and 'count'.
+
+    Examples
+    --------
+    >>> markers = pf.aggregate_markers(buy['close'], dbal.index[0],
+    ...                                dbal.index[-1], buckets=50)
+    """
+    if len(s) == 0:
+        return pd.DataFrame({'value': s, 'count': np.zeros(0, dtype=int)})
+    t = pd.DatetimeIndex(s.index).as_unit('ns').asi8
+    start, end = pd.Timestamp(start).value, pd.Timestamp(end).value
+    span = max(end - start, 1)
+    bucket = ((t - start) / span * buckets).astype(int)
+    bucket = np.clip(bucket, 0, buckets - 1)
+    _, first, count = np.unique(bucket, return_index=True, return_counts=True)
+    return pd.DataFrame({'value': s.to_numpy()[first], 'count': count},
+                        index=s.index[first])
@@ -2,13 +2,13 @@
 Fetch time series data.
 """
 
+from contextlib import contextmanager
 import datetime
 from pathlib import Path
 import sys
 import warnings
 
 import pandas as pd
-import yfinance as yf
 
 from pinkfish.pfstatistics import (
     select_trading_days
@@ -16,12 +16,77 @@ from pinkfish.pfstatistics import (
 from pinkfish.stock_market_calendar import (
     stock_market_calendar
 )
+from pinkfish.profiling import profiled
 import pinkfish.utility as utility
 
 
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close']
+"""
+list of str : The price columns of a timeseries.  These, and the
+'SYM_price' columns of a portfolio timeseries, e.g. 'SPY_close', are
+kept as float64 when compact dtypes are selected.
+"""
+
+
+def _is_price_column(column):
+    """
+    Return True if `column` is a price column of a symbol or portfolio
+    timeseries, e.g. 'close' or 'SPY_close'.
+    """
+    column = str(column)
+    return any(column == price or column.endswith('_' + price)
+               for price in PRICE_COLUMNS)
+
+_timeseries_memo = None
+"""
+dict : In-memory timeseries keyed by cache file path, or None when
+memoization is disabled.  See `memoize_timeseries()`.
+"""
+
+
 ########################################################################
 # TIMESERIES (fetch, select, finalize)
 
+@contextmanager
+def memoize_timeseries(memo=None):
+    """
+    Read each cached timeseries from disk only once.
+
+    Within this context, `fetch_timeseries()` keeps every timeseries
+    it reads from the symbol cache in memory and returns a copy of it
+    on subsequent calls.  This is useful when a strategy is run many
+    times on the same data, e.g. in an optimization.  Nested contexts
+    share the outermost memo.
+
+    Parameters
+    ----------
+    memo : dict, optional
+        An existing memo to use, e.g. one that was populated in
+        another process (default is None, which implies that a new
+        memo is created).
+
+    Yields
+    ------
+    dict
+        The memo, keyed by cache file path.
+
+    Examples
+    --------
+    >>> with pf.memoize_timeseries():
+    ...     for period in range(2, 15):
+    ...         s = strategy.Strategy(symbol, capital, start, end, options)
+    ...         s.run()
+    """
+    global _timeseries_memo
+    prev_memo = _timeseries_memo
+    if prev_memo is None:
+        _timeseries_memo = {} if memo is None else memo
+    try:
+        yield _timeseries_memo
+    finally:
+        _timeseries_memo = prev_memo
+
+
 def _get_cache_dir(dir_name):
     """
     Get the data dir path.
@@ -73,12 +138,14 @@ def _adj_column_names(ts):
     return ts
 
 
+@profiled('fetch')
 def fetch_timeseries(symbol, dir_name='symbol-cache', use_cache=True, from_year=None):
     """
     Read time series data.
 
     Use cached version if it exists and use_cache is True, otherwise
-    retrive, cache, then read.
+    retrive, cache, then read.  If compact dtypes are selected with
+    `set_compact_dtypes()`, volume is returned as int32.
 
     Parameters
     ----------
@@ -111,8 +178,11 @@ def fetch_timeseries(symbol, dir_name='symbol-cache', use_cache=True, from_year=
     timeseries_cache = _get_cache_dir(dir_name) / f'{symbol}.csv'
 
     if timeseries_cache.is_file() and use_cache:
-        pass
+        if _timeseries_memo is not None and timeseries_cache in _timeseries_memo:
+            return _compact(_timeseries_memo[timeseries_cache].copy())
     else:
+        # yfinance is slow to import, so only import it to download.
+        import yfinance as yf
         try:
             ts = yf.download(symbol, start=datetime.datetime(from_year, 1, 1),
             		         progress=False, auto_adjust=False, multi_level_index=False)
@@ -133,6 +203,19 @@ def fetch_timeseries(symbol, dir_name='symbol-cache', use_cache=True, from_year=
 
     # Remove rows that have duplicated index.
     ts = ts[~ts.index.duplicated(keep='first')]
+
+    if _timeseries_memo is not None:
+        _timeseries_memo[timeseries_cache] = ts
+        ts = ts.copy()
+    return _compact(ts)
+
+
+def _compact(ts):
+    """
+    Convert volume to int32 if compact dtypes are selected.
+    """
+    if utility.COMPACT_DTYPES:
+        utility.to_compact_dtypes(ts, int32=['volume'])
     return ts
 
 
@@ -157,6 +240,7 @@ def _adj_prices(ts):
     return ts
 
 
+@profiled('fetch')
 def select_tradeperiod(ts, start, end, use_adj=False,
                        use_continuous_calendar=False,
                        force_stock_market_calendar=False,
@@ -167,6 +251,7 @@ def select_tradeperiod(ts, start, end, use_adj=False,
     First, remove rows that have zero values in price columns. Then,
     select a time slice of the data to trade from ts.  Back date a year
     to allow time for long term indicators, e.g. 200sma is become valid.
+    `ts` isn't modified.
 
     Parameters
     ----------
@@ -213,8 +298,9 @@ def select_tradeperiod(ts, start, end, use_adj=False,
     if use_adj:
         columns.append('adj_close')
 
-    # Replace 0 value columns with NaN.
-    ts[columns] = ts[ts[columns] > 0][columns]
+    # Replace 0 value columns with NaN.  Assign to a new frame so
+    # that the caller's timeseries isn't modified.
+    ts = ts.assign(**{column: ts[column].where(ts[column] > 0) for column in columns})
 
     if use_continuous_calendar:
         force_stock_market_calendar = False
@@ -228,7 +314,7 @@ def select_tradeperiod(ts, start, end, use_adj=False,
         index = pd.to_datetime(stock_market_calendar)
         ts = ts.reindex(index=index)
 
-    ts.dropna(subset=check_fields, inplace=True)
+    ts = ts.dropna(subset=check_fields)
 
     if use_adj:
         _adj_prices(ts)
@@ -242,12 +328,15 @@ def select_tradeperiod(ts, start, end, use_adj=False,
     return ts
 
 
+@profiled('fetch')
 def finalize_timeseries(ts, start, dropna=False, drop_columns=None):
     """
     Finalize timeseries.
 
     Drop all rows that have nan column values.  Set timeseries to begin
-    at start.
+    at start.  `ts` isn't modified.  If float32 indicators are selected
+    with `set_compact_dtypes()`, convert the indicator columns to
+    float32.
 
     Parameters
     ----------
@@ -270,13 +359,16 @@ def finalize_timeseries(ts, start, dropna=False, drop_columns=None):
         The timeseries of a symbol.
     """
     if drop_columns:
-        ts.drop(columns=drop_columns, inplace=True)
+        ts = ts.drop(columns=drop_columns)
     if dropna:
-        ts.dropna(inplace=True)
+        ts = ts.dropna()
     elif ts.isnull().values.any():
         warnings.warn("NaN value(s) detected in timeseries")
     ts = ts[start:]
     start = ts.index[0]
+    if utility.COMPACT_FLOAT32:
+        columns = [column for column in ts.columns if not _is_price_column(column)]
+        utility.to_compact_dtypes(ts, float32=columns)
     return ts, start
 
 
@@ -471,6 +563,8 @@ def get_quote(symbols):
         A dictionary where keys are stock symbols and values are the latest stock prices.
         If a quote cannot be fetched, the value will be None.
     """
+    import yfinance as yf
+
     d = {}
     for symbol in symbols:
         ticker = yf.Ticker(symbol)
@@ -9,7 +9,9 @@ import math
 import numpy as np
 import pandas as pd
 
+from pinkfish.indicator_cache import cached_indicator, seed_indicator
 import pinkfish.pfstatistics as pfstatistics
+from pinkfish.profiling import profiled
 
 
 class IndicatorError(Exception):
@@ -19,9 +21,39 @@ class IndicatorError(Exception):
     pass
 
 
+def _price(ts, price):
+    """
+    Return the `price` data of `ts`.
+
+    `ts` is a dataframe with a `price` column, a series of price data,
+    or, with `price` None, a dataframe with one column of price data
+    per symbol.  The last two are returned as is.  `price` may also be
+    a list of columns, e.g. ['SPY_close', 'TLT_close'], which returns
+    a dataframe with one column per symbol.  Every indicator that uses
+    this function can compute all the symbols of a portfolio in one
+    call.
+
+    Raises
+    ------
+    KeyError
+        If `ts` is a dataframe without a `price` column.
+    """
+    if isinstance(ts, pd.DataFrame) and price is not None:
+        return ts[price]
+    return ts
+
+
+def _full_window(s, window):
+    """
+    Return True where the trailing `window` values of `s` are not NaN.
+    """
+    return s.notna().astype(int).rolling(window).sum() == window
+
+
 ########################################################################
 # SMA
 
+@cached_indicator
 def SMA(ts, timeperiod=30, price='close'):
     """
     This indicator computes a simple moving average.
@@ -29,30 +61,34 @@ def SMA(ts, timeperiod=30, price='close'):
     Can be used in place of talib SMA.
 
     ts : pd.DateFrame or pd.Series
-        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
-        a series of price data.
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     timeperiod: int, optional
         The timeperiod for the moving average (default is 30).
     price : str, optional {'open', 'high', 'low', 'close'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
         Not used if `ts` is a series.
 
     Returns
     -------
-    pd.Series
-        Series that contains the simple moving average.
+    pd.Series or pd.DataFrame
+        Series that contains the simple moving average, or a dataframe
+        with one column per symbol.
 
     Examples
     --------
     >>> ts['sma50'] = pf.SMA(ts, timeperiod=50)
     """
-    s = ts[price] if isinstance(ts, pd.DataFrame) else ts
+    s = _price(ts, price)
     return s.rolling(timeperiod).mean()
 
 
 ########################################################################
 # EMA
 
+@cached_indicator
 def EMA(ts, timeperiod=30, price='close'):
     """
     This indicator computes an exponential moving average.
@@ -60,27 +96,348 @@ def EMA(ts, timeperiod=30, price='close'):
     Can be used in place of talib EMA.
 
     ts : pd.DateFrame or pd.Series
-        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
-        a series of price data.
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     timeperiod: int, optional
         The timeperiod for the moving average (default is 30).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
         Not used if `ts` is a series.
 
     Returns
     -------
-    pd.Series
-        Series that contains the simple moving average.
+    pd.Series or pd.DataFrame
+        Series that contains the exponential moving average, or a dataframe
+        with one column per symbol.
 
     Examples
     --------
     >>> ts['ema50'] = pf.EMA(ts, timeperiod=50)
     """
-    s = ts[price] if isinstance(ts, pd.DataFrame) else ts
+    s = _price(ts, price)
     return s.ewm(span=timeperiod, min_periods=timeperiod, adjust=False).mean()
 
 
+########################################################################
+# PERIOD_HIGH
+
+@cached_indicator
+def PERIOD_HIGH(ts, timeperiod=20, price='close', prevday=False):
+    """
+    This indicator computes the highest price over a period.
+
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
+    timeperiod: int, optional
+        The number of days in the period (default is 20).
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
+    prevday : bool, optional
+        True will shift the series forward.  It gives you the
+        previous day's high (default is False).
+
+    Returns
+    -------
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling period high, or a dataframe
+        with one column per symbol.
+
+    Examples
+    --------
+    >>> ts['period_high7'] = pf.PERIOD_HIGH(ts, timeperiod=7)
+    """
+    s = _price(ts, price).rolling(timeperiod).max()
+    if prevday:
+        s = s.shift()
+    return s
+
+
+########################################################################
+# PERIOD_LOW
+
+@cached_indicator
+def PERIOD_LOW(ts, timeperiod=20, price='close', prevday=False):
+    """
+    This indicator computes the lowest price over a period.
+
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
+    timeperiod: int, optional
+        The number of days in the period (default is 20).
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
+    prevday : bool, optional
+        True will shift the series forward.  It gives you the
+        previous day's low (default is False).
+
+    Returns
+    -------
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling period low, or a dataframe
+        with one column per symbol.
+
+    Examples
+    --------
+    >>> ts['period_low7'] = pf.PERIOD_LOW(ts, timeperiod=7)
+    """
+    s = _price(ts, price).rolling(timeperiod).min()
+    if prevday:
+        s = s.shift()
+    return s
+
+
+########################################################################
+# GRID INDICATORS - one call, many timeperiods
+
+def _grid_input(ts, timeperiods, price):
+    """
+    Return the price series, its values, and the list of timeperiods.
+    """
+    timeperiods = [int(timeperiod) for timeperiod in timeperiods]
+    if not timeperiods or min(timeperiods) < 1:
+        raise ValueError('timeperiods must be positive')
+    s = _price(ts, price)
+    return s, s.to_numpy(dtype=float), timeperiods
+
+
+def _rolling_sums(x, timeperiods, power):
+    """
+    Return the rolling sums of (`x` - shift)**power for every
+    timeperiod, and the shift.
+
+    To limit the loss of precision, the values are shifted by the
+    first valid value, and the cumulative sum is done in extended
+    precision where the platform has it.  Sums of windows that contain
+    NaN are NaN.
+    """
+    valid = ~np.isnan(x)
+    shift = x[valid][0] if valid.any() else 0
+    y = np.where(valid, x - shift, 0).astype(np.longdouble)**power
+    cum = np.concatenate(([0], np.cumsum(y)))
+    count = np.concatenate(([0], np.cumsum(valid)))
+
+    out = np.full((len(x), len(timeperiods)), np.nan, dtype=cum.dtype)
+    for j, w in enumerate(timeperiods):
+        if w <= len(x):
+            out[w-1:, j] = np.where(count[w:] - count[:-w] == w, cum[w:] - cum[:-w], np.nan)
+    return out, shift
+
+
+def _rolling_extreme_grid(x, timeperiods, op):
+    """
+    Return the rolling max (op=np.maximum) or min (op=np.minimum) of
+    `x` for every timeperiod, using a sparse table.
+
+    Level k of the table is the extreme of every 2**k values, and is
+    built from level k-1.  The extreme of a window of w values is
+    the extreme of the two overlapping 2**k blocks that cover it,
+    where 2**k <= w < 2**(k+1).  As with pandas, windows that contain
+    NaN are NaN.
+    """
+    n = len(x)
+    table = [x]
+    while 2**len(table) <= min(max(timeperiods), n):
+        half = 2**(len(table) - 1)
+        table.append(op(table[-1][:-half], table[-1][half:]))
+
+    out = np.full((n, len(timeperiods)), np.nan)
+    for j, w in enumerate(timeperiods):
+        if w <= n:
+            k = w.bit_length() - 1
+            out[w-1:, j] = op(table[k][:n-w+1], table[k][w-2**k:])
+    return out
+
+
+@profiled('indicators')
+def SMA_GRID(ts, timeperiods, price='close'):
+    """
+    Compute the simple moving average for many timeperiods at once.
+
+    The moving averages share one cumulative sum, so each additional
+    timeperiod costs one vectorized subtraction.  The values agree
+    with `SMA()` to floating point precision.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
+        a series of price data.
+    timeperiods : list of int
+        The timeperiods for the moving averages.
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close').
+        Not used if `ts` is a series.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with one column of moving averages per timeperiod.
+
+    Raises
+    ------
+    ValueError
+        If a timeperiod is not positive.
+
+    Examples
+    --------
+    >>> smas = pf.SMA_GRID(ts, timeperiods=range(20, 210, 10))
+    >>> ts['sma50'] = smas[50]
+    """
+    s, x, timeperiods = _grid_input(ts, timeperiods, price)
+    sums, shift = _rolling_sums(x, timeperiods, power=1)
+    means = (sums / timeperiods + shift).astype(float)
+    return pd.DataFrame(means, index=s.index, columns=timeperiods)
+
+
+@profiled('indicators')
+def STDDEV_GRID(ts, timeperiods, price='close'):
+    """
+    Compute the rolling standard deviation for many timeperiods at once.
+
+    The sample standard deviation (ddof=1), as with pandas
+    `rolling().std()`, is computed from cumulative sums of the values
+    and their squares.  The subtraction of the sums loses precision
+    when a window is nearly constant relative to the price level, e.g.
+    a 2 day std of 1e-4 on a price of 100 is accurate to about 1e-6
+    relative.  Typical windows agree with pandas to 1e-10 or better.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
+        a series of price data.
+    timeperiods : list of int
+        The timeperiods for the standard deviations.
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close').
+        Not used if `ts` is a series.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with one column of standard deviations per timeperiod.
+
+    Raises
+    ------
+    ValueError
+        If a timeperiod is not positive.
+
+    Examples
+    --------
+    >>> stds = pf.STDDEV_GRID(ts, timeperiods=[10, 20, 50])
+    """
+    s, x, timeperiods = _grid_input(ts, timeperiods, price)
+    s1, _ = _rolling_sums(x, timeperiods, power=1)
+    s2, _ = _rolling_sums(x, timeperiods, power=2)
+    w = np.array(timeperiods, dtype=s1.dtype)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = ((s2 - s1*s1/w) / (w - 1)).astype(float)
+    var[:, w == 1] = np.nan
+    return pd.DataFrame(np.sqrt(np.maximum(var, 0)), index=s.index, columns=timeperiods)
+
+
+@profiled('indicators')
+def PERIOD_HIGH_GRID(ts, timeperiods, price='close'):
+    """
+    Compute the period high for many timeperiods at once.
+
+    All timeperiods share one sparse table of block maximums, so the
+    cost is O(N log W) to build and O(N) per timeperiod.  The values
+    are identical to `PERIOD_HIGH()`.  Within `cache_indicators()`,
+    the result of `PERIOD_HIGH()` for each timeperiod is also cached,
+    so a sweep over the timeperiod computes no rolling highs.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
+        a series of price data.
+    timeperiods : list of int
+        The number of days in each period.
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close').
+        Not used if `ts` is a series.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with one column of period highs per timeperiod.
+
+    Raises
+    ------
+    ValueError
+        If a timeperiod is not positive.
+
+    Examples
+    --------
+    >>> with pf.cache_indicators():
+    ...     pf.PERIOD_HIGH_GRID(ts, timeperiods=range(2, 15))
+    ...     strategies = pf.sweep(strategy.Strategy, symbol, capital,
+    ...                           start, end, options,
+    ...                           {'period': range(2, 15)})
+    """
+    s, x, timeperiods = _grid_input(ts, timeperiods, price)
+    df = pd.DataFrame(_rolling_extreme_grid(x, timeperiods, np.maximum),
+                      index=s.index, columns=timeperiods)
+    for timeperiod in timeperiods:
+        seed_indicator(PERIOD_HIGH, df[timeperiod].rename(s.name),
+                       ts, timeperiod=timeperiod, price=price)
+    return df
+
+
+@profiled('indicators')
+def PERIOD_LOW_GRID(ts, timeperiods, price='close'):
+    """
+    Compute the period low for many timeperiods at once.
+
+    See `PERIOD_HIGH_GRID()`.  The values are identical to
+    `PERIOD_LOW()`.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume' or
+        a series of price data.
+    timeperiods : list of int
+        The number of days in each period.
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close').
+        Not used if `ts` is a series.
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with one column of period lows per timeperiod.
+
+    Raises
+    ------
+    ValueError
+        If a timeperiod is not positive.
+
+    Examples
+    --------
+    >>> lows = pf.PERIOD_LOW_GRID(ts, timeperiods=range(2, 15))
+    >>> ts['period_low7'] = lows[7]
+    """
+    s, x, timeperiods = _grid_input(ts, timeperiods, price)
+    df = pd.DataFrame(_rolling_extreme_grid(x, timeperiods, np.minimum),
+                      index=s.index, columns=timeperiods)
+    for timeperiod in timeperiods:
+        seed_indicator(PERIOD_LOW, df[timeperiod].rename(s.name),
+                       ts, timeperiod=timeperiod, price=price)
+    return df
+
+
 ########################################################################
 # CROSSOVER
 
@@ -91,62 +448,54 @@ class TradeCrossOverError(IndicatorError):
     pass
 
 
-class _CrossOver:
-    """
-    This is a helper class to implement the CROSSOVER function.
-
-     The class provides the apply callback for pd.DataFrame.apply()
-     in CROSSOVER.  It also keeps track of _r, explained below.
-
-    _r indicates regime direction and duration, i.e. 50 means a bull
-       market that has persisted for 50 days, whereas -20 means a bear
-       market that has persisted for 20 days.
-    _r is incremented(decremented) each day a bull(bear) market persists
-    _r remains unchanged when fast_ma within band of slow_ma
-    _r indicates the number of trading days a trend has persisted
-    _r is nan, then sma_slow is nan
-    _r > 0, then bull market, fast_ma > slow_ma
-    _r < 0, then bear market, fast_ma < slow_ma
-    _r == 0, no trend established yet
-    """
-    def __init__(self):
-        """
-        Initialize instance variables.
-
-        Attributes
-        ----------
-        _r : int
-            Indicates regime direction and duration.
-        """
-        self._r = 0
-
-    def apply(self, row, band=0):
-        """
-        Implements the regime change logic.
-
-        Parameters
-        ----------
-        row : pd.Series
-            A row of data from the dataframe.
-        band : int {0-100}
-            Percent band (default is 0, which is no band).
-
-        Returns
-        -------
-        _r : int
-            Indicates regime direction and duration.
-        """
-        if pd.isnull(row['__sma_slow__']):
-            self._r = np.nan
-        elif row['__sma_fast__'] > row['__sma_slow__']*(1+band/100):
-            self._r = self._r + 1 if self._r > 0 else 1
-        elif row['__sma_fast__'] < row['__sma_slow__']*(1-band/100):
-            self._r = self._r -1 if self._r < 0 else -1
-        else:
-            pass
-        return self._r
+def _regime(fast, slow, band=0):
+    """
+    Compute the regime indicator from a fast and slow moving average.
+
+    `fast` and `slow` are arrays of the same shape, 1d or 2d with one
+    symbol per column.  The regime, r, on each bar is:
+
+    r is nan, when slow is nan
+    r is incremented(decremented) each day a bull(bear) market persists
+    r remains unchanged when fast is within the band of slow, or nan
+    r == 0, no trend established yet
 
+    Rather than stepping through the bars, each bar is classified as
+    up, down, null (slow is nan) or carry.  The last up, down, or null
+    bar on or before each bar determines the sign, and the number of
+    consecutive up (down) bars since the last down (up) or null bar is
+    a difference of cumulative counts.
 
+    Returns an array of floats with the same shape as `slow`.
+    """
+    null = np.isnan(slow)
+    up = ~null & (fast > slow*(1+band/100))
+    down = ~null & ~up & (fast < slow*(1-band/100))
+
+    rows = np.arange(len(slow)).reshape((-1,) + (1,)*(slow.ndim-1))
+
+    def _last(mask):
+        """ Row of the last True value on or before each row, else -1. """
+        return np.maximum.accumulate(np.where(mask, rows, -1), axis=0)
+
+    def _take(a, last, default):
+        """ a[last] along the rows, `default` where last is -1. """
+        v = np.take_along_axis(a, np.maximum(last, 0), axis=0)
+        return np.where(last >= 0, v, default)
+
+    def _run(mask, breaks):
+        """ Number of `mask` rows since the last `breaks` row. """
+        cum = np.cumsum(mask, axis=0)
+        return cum - _take(cum, _last(breaks), 0)
+
+    event = np.select([up, down, null], [1, -1, 2], default=0)
+    kind = _take(event, _last(event != 0), 0)
+    return np.select([kind == 1, kind == -1, kind == 2],
+                     [_run(up, down | null), -_run(down, up | null), np.nan],
+                     default=0).astype(float)
+
+
+@cached_indicator
 def CROSSOVER(ts, timeperiod_fast=50, timeperiod_slow=200,
               func_fast=SMA, func_slow=SMA, band=0,
               price='close', prevday=False):
@@ -184,7 +533,9 @@ def CROSSOVER(ts, timeperiod_fast=50, timeperiod_slow=200,
         Percent band around the slow moving average.
         (default is 0, which implies no band is used).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        or a list of columns, which requires pinkfish functions for
+        `func_fast` and `func_slow`.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -192,8 +543,9 @@ def CROSSOVER(ts, timeperiod_fast=50, timeperiod_slow=200,
 
     Returns
     -------
-    s : pd.Series
-        Series that contains the rolling regime indicator values.
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling regime indicator values, or
+        a dataframe with one column per symbol if `price` is a list.
 
     Raises
     ------
@@ -209,23 +561,27 @@ def CROSSOVER(ts, timeperiod_fast=50, timeperiod_slow=200,
         or timeperiod_fast >= timeperiod_slow):
         raise TradeCrossOverError
 
-    ts['__sma_fast__'] = ts[price] if timeperiod_fast == 1 else \
+    fast = _price(ts, price) if timeperiod_fast == 1 else \
         func_fast(ts, timeperiod=timeperiod_fast, price=price)
+    slow = func_slow(ts, timeperiod=timeperiod_slow, price=price)
 
-    ts['__sma_slow__'] = \
-        func_slow(ts, timeperiod=timeperiod_slow, price=price)
-
-    func = _CrossOver().apply
-    s = ts.apply(func, band=band, axis=1)
+    r = _regime(np.asarray(fast, dtype=float), np.asarray(slow, dtype=float), band)
+    if r.ndim == 1:
+        s = pd.Series(r, index=ts.index)
+        if not s.isnull().any():
+            s = s.astype(int)
+    else:
+        s = pd.DataFrame(r, index=ts.index, columns=slow.columns)
+        s = s.astype({col: int for col in s.columns if not s[col].isnull().any()})
     if prevday:
         s = s.shift()
-    ts.drop(['__sma_fast__', '__sma_slow__'], axis=1, inplace=True)
     return s
 
 
 ########################################################################
 # MOMENTUM
 
+@cached_indicator
 def MOMENTUM(ts, lookback=1, time_frame='monthly', price='close', prevday=False):
     """
     This indicator is used to represent momentum is security prices.
@@ -238,15 +594,19 @@ def MOMENTUM(ts, lookback=1, time_frame='monthly', price='close', prevday=False)
 
     Parameters
     ----------
-    ts : pd.DateFrame
-        A dataframe with 'open', 'high', 'low', 'close', 'volume'.
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     lookback : int, optional
         The number of time frames to lookback, e.g. 2 months
         (default is 1).
     timeframe : str, optional {'monthly', 'daily', 'weekly', 'yearly'}
         The unit or timeframe type of lookback (default is 'monthly').
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -254,8 +614,9 @@ def MOMENTUM(ts, lookback=1, time_frame='monthly', price='close', prevday=False)
 
     Returns
     -------
-    s : pd.Series
-        Series that contains the rolling momentum indicator values.
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling momentum indicator values,
+        or a dataframe with one column per symbol.
 
     Raises
     ------
@@ -276,7 +637,7 @@ def MOMENTUM(ts, lookback=1, time_frame='monthly', price='close', prevday=False)
     else:
         raise ValueError(f'invalid time_frame "{time_frame}"')
 
-    s = ts[price].pct_change(periods=lookback*factor)
+    s = _price(ts, price).pct_change(periods=lookback*factor)
     if prevday:
         s = s.shift()
 
@@ -286,6 +647,7 @@ def MOMENTUM(ts, lookback=1, time_frame='monthly', price='close', prevday=False)
 ########################################################################
 # VOLATILITY
 
+@cached_indicator
 def VOLATILITY(ts, lookback=20, time_frame='yearly', downside=False, upside=False,
                price='close', prevday=False):
     """
@@ -301,8 +663,10 @@ def VOLATILITY(ts, lookback=20, time_frame='yearly', downside=False, upside=Fals
 
     Parameters
     ----------
-    ts : pd.DateFrame
-        A dataframe with 'open', 'high', 'low', 'close', 'volume'.
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     lookback : int, optional
         The number of time frames to lookback, e.g. 2 months
         (default is 1).
@@ -316,7 +680,9 @@ def VOLATILITY(ts, lookback=20, time_frame='yearly', downside=False, upside=Fals
     downside : bool, optional
         True to calculate the upside volatility (default is False).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -324,8 +690,9 @@ def VOLATILITY(ts, lookback=20, time_frame='yearly', downside=False, upside=Fals
 
     Returns
     -------
-    s : pd.Series
-        A new column that contains the rolling volatility.
+    s : pd.Series or pd.DataFrame
+        A new column that contains the rolling volatility, or a
+        dataframe with one column per symbol.
 
     Raises
     ------
@@ -346,7 +713,7 @@ def VOLATILITY(ts, lookback=20, time_frame='yearly', downside=False, upside=Fals
     else:
         raise ValueError(f'invalid time_frame "{time_frame}"')
 
-    s = ts[price].pct_change()
+    s = _price(ts, price).pct_change()
     if downside:
         s[s > 0] = 0
     elif upside:
@@ -387,20 +754,25 @@ def inverse_volatility_weight(vol, floor=VOLATILITY_METRIC_FLOOR):
 ########################################################################
 # ANNUALIZED_RETURNS
 
+@cached_indicator
 def ANNUALIZED_RETURNS(ts, lookback=5, price='close', prevday=False):
     """
     Calculate the rolling annualized returns.
 
     Parameters
     ----------
-    ts : pd.DateFrame
-        A dataframe with 'open', 'high', 'low', 'close', 'volume'.
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     lookback : float, optional
         The number of years to lookback, e.g. 5 years.  1/12 can be
         used for 1 month.  Likewise 3/12 for 3 months, etc...
         (default is 5).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -408,8 +780,9 @@ def ANNUALIZED_RETURNS(ts, lookback=5, price='close', prevday=False):
 
     Returns
     -------
-    s : pd.Series
-        Series that contains the rolling annualized returns.
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling annualized returns,
+        or a dataframe with one column per symbol.
 
     Raises
     ------
@@ -424,23 +797,17 @@ def ANNUALIZED_RETURNS(ts, lookback=5, price='close', prevday=False):
     >>> annual_returns_3yr = pf.ANNUALIZED_RETURNS(ts, lookback=3)
     >>> annual_returns_5yr = pf.ANNUALIZED_RETURNS(ts, lookback=5)
     """
-    def _cagr(s):
-        """
-        Calculate compound annual growth rate.
-
-        B = end balance; A = begin balance; n = num years
-        """
-        A = s.iloc[0]
-        B = s.iloc[-1]
-        n = len(s)
-        if B < 0: B = 0
-        return (math.pow(B / A, 1 / n) - 1) * 100
-
     if lookback <= 0:
         raise ValueError('lookback must be positive')
 
+    # CAGR over each window, B = end balance; A = begin balance.
+    # Following the original rolling apply, n is the number of bars.
     window = int(lookback * pfstatistics.TRADING_DAYS_PER_YEAR)
-    s = pd.Series(ts[price]).rolling(window).apply(_cagr)
+    p = _price(ts, price)
+    A = p.shift(window - 1)
+    B = p.clip(lower=0)
+    s = ((B / A)**(1 / window) - 1) * 100
+    s = s.where(_full_window(p, window))
     if prevday:
         s = s.shift()
 
@@ -450,20 +817,25 @@ def ANNUALIZED_RETURNS(ts, lookback=5, price='close', prevday=False):
 ########################################################################
 # ANNUALIZED_STANDARD_DEVIATION
 
+@cached_indicator
 def ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3, price='close', prevday=False):
     """
     Calculate the rolling annualized standard deviation.
 
     Parameters
     ----------
-    ts : pd.DateFrame
-        A dataframe with 'open', 'high', 'low', 'close', 'volume'.
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     lookback : float, optional
         The number of years to lookback, e.g. 5 years.  1/12 can be
         used for 1 month.  Likewise 3/12 for 3 months, etc...
         (default is 5).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -471,8 +843,9 @@ def ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3, price='close', prevday=False):
 
     Returns
     -------
-    s : pd.Series
-        Series that contains the rolling annualized standard deviation.
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling annualized standard deviation,
+        or a dataframe with one column per symbol.
 
     Raises
     ------
@@ -487,18 +860,12 @@ def ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3, price='close', prevday=False):
     >>> std_dev_3yr = pf.ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3)
     >>> std_dev_5yr = pf.ANNUALIZED_STANDARD_DEVIATION(ts, lookback=5)
     """
-    def _std_dev(s):
-        """
-        Calculate the annualized standard deviation.
-        """
-        return np.std(s, axis=0) * math.sqrt(pfstatistics.TRADING_DAYS_PER_YEAR)
-
     if lookback <= 0:
         raise ValueError('lookback must be positive')
 
     window = int(lookback * pfstatistics.TRADING_DAYS_PER_YEAR)
-    pc = ts[price].pct_change()
-    s = pd.Series(pc).rolling(window).apply(_std_dev)
+    pc = _price(ts, price).pct_change()
+    s = pc.rolling(window).std(ddof=0) * math.sqrt(pfstatistics.TRADING_DAYS_PER_YEAR)
     if prevday:
         s = s.shift()
 
@@ -508,6 +875,7 @@ def ANNUALIZED_STANDARD_DEVIATION(ts, lookback=3, price='close', prevday=False):
 ########################################################################
 # ANNUALIZED_SHARPE_RATIO
 
+@cached_indicator
 def ANNUALIZED_SHARPE_RATIO(ts, lookback=5, price='close', prevday=False,
                             risk_free=0):
     """
@@ -515,14 +883,18 @@ def ANNUALIZED_SHARPE_RATIO(ts, lookback=5, price='close', prevday=False,
 
     Parameters
     ----------
-    ts : pd.DateFrame
-        A dataframe with 'open', 'high', 'low', 'close', 'volume'.
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, or a dataframe with one column of price
+        data per symbol.
     lookback : float, optional
         The number of years to lookback, e.g. 5 years.  1/12 can be
         used for 1 month.  Likewise 3/12 for 3 months, etc...
         (default is 5).
     price : str, optional {'close', 'open', 'high', 'low'}
-        Input_array column to use for price (default is 'close').
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
     prevday : bool, optional
         True will shift the series forward.  Unless you are buying
         on the close, you'll likely want to set this to True.
@@ -532,8 +904,9 @@ def ANNUALIZED_SHARPE_RATIO(ts, lookback=5, price='close', prevday=False,
 
     Returns
     -------
-    s : pd.Series
-        Series that contains the rolling annualized sharpe ratio.
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling annualized sharpe ratio,
+        or a dataframe with one column per symbol.
 
     Raises
     ------
@@ -548,22 +921,142 @@ def ANNUALIZED_SHARPE_RATIO(ts, lookback=5, price='close', prevday=False,
     >>> sharpe_ratio_3yr = pf.ANNUALIZED_SHARPE_RATIO(ts, lookback=3)
     >>> sharpe_ratio_5yr = pf.ANNUALIZED_SHARPE_RATIO(ts, lookback=5)
     """
-    def _sharpe_ratio(s):
-        """
-        Calculate the annualized sharpe ratio.
-        """
-        dev = np.std(s, axis=0)
-        mean = np.mean(s, axis=0)
-        period = len(s)
-        sharpe = (mean*period - risk_free) / (dev * np.sqrt(period))
-        return sharpe
-
     if lookback <= 0:
         raise ValueError('lookback must be positive')
 
     window = int(lookback * pfstatistics.TRADING_DAYS_PER_YEAR)
-    pc = ts[price].pct_change()
-    s = pd.Series(pc).rolling(window).apply(_sharpe_ratio)
+    pc = _price(ts, price).pct_change()
+    r = pc.rolling(window)
+    s = (r.mean()*window - risk_free) / (r.std(ddof=0) * np.sqrt(window))
+    if prevday:
+        s = s.shift()
+
+    return s
+
+
+########################################################################
+# MAX_DRAWDOWN
+
+def _time_frame_factor(time_frame):
+    """
+    Return the number of trading days in `time_frame`.
+    """
+    if   time_frame == 'daily':   return 1
+    elif time_frame == 'weekly':  return pfstatistics.TRADING_DAYS_PER_WEEK
+    elif time_frame == 'monthly': return pfstatistics.TRADING_DAYS_PER_MONTH
+    elif time_frame == 'yearly':  return pfstatistics.TRADING_DAYS_PER_YEAR
+    raise ValueError(f'invalid time_frame "{time_frame}"')
+
+
+@cached_indicator
+def MAX_DRAWDOWN(ts, lookback=1, time_frame='yearly', price='close', prevday=False):
+    """
+    Calculate the rolling maximum drawdown.
+
+    The drawdown is the percent decline from a peak to the trough
+    that follows it.  This is the worst drawdown within the lookback
+    period ending on each day.  It runs in O(N log W) time, where W is
+    the lookback period in days.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, e.g. the daily balance close, or a
+        dataframe with one column of price data per symbol.
+    lookback : int, optional
+        The number of time frames to lookback, e.g. 1 year
+        (default is 1).
+    time_frame : str, optional {'yearly', 'daily', 'weekly', 'monthly'}
+        The unit or timeframe type of lookback (default is 'yearly').
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
+    prevday : bool, optional
+        True will shift the series forward.  Unless you are buying
+        on the close, you'll likely want to set this to True.
+        It gives you the previous day's drawdown (default is False).
+
+    Returns
+    -------
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling max drawdown as a negative
+        percent, or a dataframe with one column per symbol.
+
+    Raises
+    ------
+    ValueError
+        If the lookback is not positive or the time_frame is invalid.
+
+    Examples
+    --------
+    >>> ts['dd'] = pf.MAX_DRAWDOWN(ts, lookback=1, time_frame='yearly')
+    """
+    if lookback < 1:
+        raise ValueError('lookback must be positive')
+
+    s = _price(ts, price)
+    s = pfstatistics._rolling_max_dd(s, int(lookback * _time_frame_factor(time_frame)))
+    if prevday:
+        s = s.shift()
+
+    return s
+
+
+########################################################################
+# MAX_RUNUP
+
+@cached_indicator
+def MAX_RUNUP(ts, lookback=1, time_frame='yearly', price='close', prevday=False):
+    """
+    Calculate the rolling maximum runup.
+
+    The runup is the percent rise from a trough to the peak that
+    follows it.  This is the largest runup within the lookback
+    period ending on each day.  It runs in O(N log W) time, where W is
+    the lookback period in days.
+
+    Parameters
+    ----------
+    ts : pd.DateFrame or pd.Series
+        A dataframe with 'open', 'high', 'low', 'close', 'volume', or
+        a series of price data, e.g. the daily balance close, or a
+        dataframe with one column of price data per symbol.
+    lookback : int, optional
+        The number of time frames to lookback, e.g. 1 year
+        (default is 1).
+    time_frame : str, optional {'yearly', 'daily', 'weekly', 'monthly'}
+        The unit or timeframe type of lookback (default is 'yearly').
+    price : str, optional {'close', 'open', 'high', 'low'}
+        Input_array column to use for price (default is 'close'),
+        a list of columns, or None if `ts` is a dataframe of symbols.
+        Not used if `ts` is a series.
+    prevday : bool, optional
+        True will shift the series forward.  Unless you are buying
+        on the close, you'll likely want to set this to True.
+        It gives you the previous day's runup (default is False).
+
+    Returns
+    -------
+    s : pd.Series or pd.DataFrame
+        Series that contains the rolling max runup as a percent, or a
+        dataframe with one column per symbol.
+
+    Raises
+    ------
+    ValueError
+        If the lookback is not positive or the time_frame is invalid.
+
+    Examples
+    --------
+    >>> ts['ru'] = pf.MAX_RUNUP(ts, lookback=1, time_frame='yearly')
+    """
+    if lookback < 1:
+        raise ValueError('lookback must be positive')
+
+    s = _price(ts, price)
+    s = pfstatistics._rolling_max_ru(s, int(lookback * _time_frame_factor(time_frame)))
     if prevday:
         s = s.shift()
 
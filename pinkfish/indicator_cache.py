@@ -0,0 +1,423 @@
+"""
+Memoized indicators.
+
+Indicator results are keyed by the indicator name, its parameters,
+and a fingerprint of the price data it reads.  Results are kept in an
+in-memory LRU with a byte limit, and optionally on disk next to the
+symbol cache, also with a byte limit.  The key includes the pinkfish
+version and `CACHE_VERSION`, so results on disk computed by older
+indicator code are never returned.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+import hashlib
+import importlib.metadata
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+
+import pinkfish.fetch as fetch
+import pinkfish.pfstatistics as pfstatistics
+from pinkfish.profiling import profiled
+
+
+CACHE_VERSION = 1
+"""
+int : The version of the cached results.  Increment it when the
+results of an indicator change, to invalidate the results on disk.
+"""
+
+_indicator_cache = None
+"""
+IndicatorCache : The active indicator cache, or None when caching is
+disabled.  See `cache_indicators()`.
+"""
+
+
+########################################################################
+# INDICATOR CACHE
+
+def _nbytes(value):
+    """
+    Return the memory used by an indicator result.
+    """
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    return int(getattr(value, 'nbytes', 0))
+
+
+def _fingerprint(h, data):
+    """
+    Update the hash `h` with the values, index, and names of `data`.
+    """
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    h.update(repr(list(data.columns)).encode())
+    for a in (data.index, data):
+        values = a.to_numpy()
+        if values.dtype == object:
+            values = pd.util.hash_pandas_object(a, index=False).to_numpy()
+        values = np.ascontiguousarray(values)
+        h.update(f'{values.dtype}{values.shape}'.encode())
+        h.update(values.view(np.uint8))
+
+
+def _cacheable(value):
+    """
+    Return True if a parameter can be part of a cache key.
+
+    Functions can only be keyed by name, which isn't unique for
+    lambdas, closures, partials, or functions that are redefined, e.g.
+    in a notebook.  So the only functions that can be keyed are cached
+    indicators, whose code is versioned by `CACHE_VERSION`.
+    """
+    if isinstance(value, (list, tuple)):
+        return all(_cacheable(v) for v in value)
+    return not callable(value) or hasattr(value, '_cache_key')
+
+
+def _param_repr(value):
+    """
+    Return a repr of a cacheable parameter that is stable across
+    processes.
+    """
+    if callable(value):
+        return f'{value.__module__}.{value.__qualname__}'
+    if isinstance(value, (list, tuple)):
+        return repr([_param_repr(v) for v in value])
+    return repr(value)
+
+
+@lru_cache(maxsize=None)
+def _version():
+    """
+    Return the version of the cached results, and of pinkfish if it
+    is installed.
+    """
+    try:
+        pinkfish_version = importlib.metadata.version('pinkfish')
+    except importlib.metadata.PackageNotFoundError:
+        pinkfish_version = None
+    return f'{CACHE_VERSION}-{pinkfish_version}'
+
+
+class IndicatorCache:
+    """
+    An LRU cache of indicator results.
+    """
+
+    def __init__(self, max_bytes=256*2**20, dir_name=None, max_disk_bytes=2**30):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The maximum memory used by cached results (default is
+            256 MB).  The least recently used results are evicted
+            first.
+        dir_name : str, optional
+            The leaf data dir name for the on-disk tier, e.g.
+            'indicator-cache', which is created next to the symbol
+            cache (default is None, which implies no on-disk tier).
+        max_disk_bytes : int, optional
+            The maximum disk space used by cached results (default is
+            1 GB).  The least recently used results are removed first.
+
+        Attributes
+        ----------
+        nbytes : int
+            The memory used by cached results.
+        disk_nbytes : int
+            The disk space used by cached results.
+        hits : int
+            The number of results returned from the cache.
+        misses : int
+            The number of results that had to be computed.
+        """
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.dir_path = None if dir_name is None else fetch._get_cache_dir(dir_name)
+        self.nbytes = 0
+        self.disk_nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if self.dir_path is not None:
+            self.disk_nbytes = sum(size for _, size, _ in self._disk_entries())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return self.dir_path / f'{key}.pkl'
+
+    def _disk_entries(self):
+        """
+        Return the (mtime, size, path) of the results on disk, least
+        recently used first.
+        """
+        entries = []
+        for path in self.dir_path.glob('*.pkl'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                # Removed by another process.
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def _read(self, key):
+        """
+        Return the result for `key` on disk, or None if it isn't there
+        or can't be read, e.g. because it was written by another
+        version of pandas.
+        """
+        path = self._path(key)
+        try:
+            value = pd.read_pickle(path)
+            # The mtime is the last use, for evicting.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        return value
+
+    def _write(self, key, value):
+        """
+        Write the result for `key` to disk, removing the least recently
+        used results if the disk tier is full.
+        """
+        path = self._path(key)
+        if path.exists():
+            return
+        # Write then rename so that parallel workers never read a
+        # partial file.
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        pd.to_pickle(value, tmp_path)
+        os.replace(tmp_path, path)
+        self.disk_nbytes += path.stat().st_size
+        if self.disk_nbytes > self.max_disk_bytes:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """
+        Remove the least recently used results on disk until they use
+        at most 3/4 of `max_disk_bytes`, so that the directory isn't
+        scanned on every write.
+        """
+        entries = self._disk_entries()
+        self.disk_nbytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.disk_nbytes <= self.max_disk_bytes * 3 // 4:
+                break
+            path.unlink(missing_ok=True)
+            self.disk_nbytes -= size
+
+    def _store(self, key, value):
+        """
+        Add `value` to memory, evicting the least recently used.
+        """
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, n) = self._entries.popitem(last=False)
+            self.nbytes -= n
+
+    def get(self, key):
+        """
+        Return the result for `key`, or None if it isn't cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        if self.dir_path is not None:
+            value = self._read(key)
+            if value is not None:
+                self._store(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Cache the result for `key`.
+        """
+        if key in self._entries:
+            return
+        self._store(key, value)
+        if self.dir_path is not None:
+            self._write(key, value)
+
+    def clear(self, disk=False):
+        """
+        Remove all results from memory, and from disk if `disk` is True.
+        """
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.dir_path is not None:
+            for _, _, path in self._disk_entries():
+                path.unlink(missing_ok=True)
+            self.disk_nbytes = 0
+
+
+@contextmanager
+def cache_indicators(max_bytes=256*2**20, dir_name=None, cache=None,
+                     max_disk_bytes=2**30):
+    """
+    Compute each indicator only once for the same data and parameters.
+
+    Within this context, the pinkfish indicators, e.g. `SMA()`,
+    `CROSSOVER()`, `MOMENTUM()`, return a copy of a cached result when
+    they are called again with the same price data and parameters.
+    This is useful when a strategy is run many times on the same data,
+    e.g. when sweeping a stop loss.  Nested contexts share the
+    outermost cache.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        The maximum memory used by cached results (default is 256 MB).
+    dir_name : str, optional
+        The leaf data dir name for the on-disk tier, e.g.
+        'indicator-cache' (default is None, which implies no on-disk
+        tier).
+    cache : IndicatorCache, optional
+        An existing cache to use (default is None, which implies that
+        a new cache is created).
+    max_disk_bytes : int, optional
+        The maximum disk space used by cached results (default is
+        1 GB).
+
+    Yields
+    ------
+    IndicatorCache
+        The cache.
+
+    Examples
+    --------
+    >>> with pf.cache_indicators():
+    ...     strategies = pf.sweep(strategy.Strategy, symbol, capital,
+    ...                           start, end, options,
+    ...                           {'stop_loss_pct': [5, 10, 15]})
+    """
+    global _indicator_cache
+    prev_cache = _indicator_cache
+    if prev_cache is None:
+        _indicator_cache = IndicatorCache(max_bytes, dir_name, max_disk_bytes) if cache is None else cache
+    try:
+        yield _indicator_cache
+    finally:
+        _indicator_cache = prev_cache
+
+
+def cached_indicator(func):
+    """
+    Decorator that caches the results of an indicator function.
+
+    `func` must have the positional argument `ts`.  If it also has
+    a `price` argument, only that price data of `ts` is fingerprinted,
+    otherwise all of `ts`.  Caching is done only within
+    `cache_indicators()`; otherwise `func` is simply called.  Calls
+    with a function argument other than a cached indicator, e.g. a
+    lambda, aren't cached.
+
+    Parameters
+    ----------
+    func : function
+        The indicator function.
+
+    Returns
+    -------
+    function
+        The caching indicator function.
+
+    Examples
+    --------
+    >>> @pf.cached_indicator
+    ... def ROC(ts, timeperiod=10, price='close'):
+    ...     return ts[price].pct_change(timeperiod)
+    """
+    signature = inspect.signature(func)
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _indicator_cache
+        if cache is None:
+            return func(*args, **kwargs)
+
+        key = _key(name, signature, args, kwargs)
+        if key is None:
+            return func(*args, **kwargs)
+        s = cache.get(key)
+        if s is None:
+            s = func(*args, **kwargs)
+            cache.put(key, s)
+        return s.copy()
+
+    wrapper._cache_key = lambda args, kwargs: _key(name, signature, args, kwargs)
+    return profiled('indicators')(wrapper)
+
+
+def _key(name, signature, args, kwargs):
+    """
+    Return the cache key for calling indicator `name` with `args` and
+    `kwargs`, or None if the call can't be cached.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    if not all(_cacheable(v) for v in params.values()):
+        return None
+    ts = params.pop('ts')
+    data = ts
+    if isinstance(ts, pd.DataFrame) and 'price' in params:
+        price = params['price']
+        if isinstance(price, list) or price in ts.columns:
+            data = ts[price]
+
+    h = hashlib.blake2b(digest_size=20)
+    h.update(name.encode())
+    h.update(_version().encode())
+    h.update(repr(pfstatistics.get_trading_days()).encode())
+    h.update(repr({k: _param_repr(v) for k, v in params.items()}).encode())
+    _fingerprint(h, data)
+    return h.hexdigest()
+
+
+def seed_indicator(func, value, *args, **kwargs):
+    """
+    Cache `value` as the result of calling `func(*args, **kwargs)`.
+
+    Does nothing outside of `cache_indicators()`.  This lets a
+    function that computes many results at once, e.g. the grid
+    indicators, fill the cache for the single result indicators.
+
+    Parameters
+    ----------
+    func : function
+        An indicator decorated with `cached_indicator`.
+    value : pd.Series or pd.DataFrame
+        The result of calling `func(*args, **kwargs)`.
+    *args, **kwargs
+        The arguments of `func`.
+    """
+    cache = _indicator_cache
+    if cache is not None:
+        key = func._cache_key(args, kwargs)
+        if key is not None:
+            cache.put(key, value)
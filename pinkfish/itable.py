@@ -24,6 +24,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 '''
 
+import bisect
+
+import numpy as np
+
 
 class TableStyle(object):
 
@@ -68,10 +72,8 @@ class CellStyle(object):
         self.style_elements[key] = value
 
     def css(self):
-        style = ""
-        for key in self.style_elements:
-            style += "%s: %s;" % (key, self.style_elements[key])
-        return style
+        return "".join("%s: %s;" % (key, value)
+                       for key, value in self.style_elements.items())
 
     def column_format(self, x):
         if self.format_function is None:
@@ -82,6 +84,16 @@ class CellStyle(object):
             except:
                 return str(x)
 
+    def format_values(self, values):
+        """
+        Format a column of values, as column_format() does for each
+        value, without a function call per value when there is no
+        format_function
+        """
+        if self.format_function is None:
+            return [str(x) for x in values]
+        return [self.column_format(x) for x in values]
+
     def copy(self):
         c = CellStyle()
         c.style_elements = self.style_elements.copy()
@@ -93,6 +105,16 @@ class PrettyTable(object):
 
     """
     Formatted tables for display in IPython notebooks
+
+    Cells and headers with the same style share one CellStyle object,
+    so styles are never modified in place: the set_*, update_*, and
+    reset_* methods replace the styles of the cells they change.
+
+    Cell styles are stored sparsely, as a default plus styles for
+    whole rows, whole columns, and single cells, so memory is
+    proportional to the number of styled rows, columns, and cells.
+    Each entry has a sequence number, and a cell gets the style of
+    its most recent entry, as if every cell had been styled in turn.
     """
 
     def __init__(self, df, tstyle=None, header_row=False, header_col=True,
@@ -116,21 +138,86 @@ class PrettyTable(object):
         if tstyle is None:
             self.cell_style = CellStyle()
             self.corner_style = CellStyle()
-            self.header_row_styles = [CellStyle()
-                                      for i in range(self.num_rows)]
-            self.header_col_styles = [CellStyle()
-                                      for i in range(self.num_cols)]
-            self.cell_styles = [[CellStyle() for i in range(self.num_cols)]
-                                for j in range(self.num_rows)]
+            row_head_style = CellStyle()
+            col_head_style = CellStyle()
+            cell_style = CellStyle()
         else:
             self.cell_style = tstyle.cell_style
             self.corner_style = tstyle.corner_style
-            self.header_row_styles = [
-                tstyle.row_head_style.copy() for i in range(self.num_rows)]
-            self.header_col_styles = [
-                tstyle.col_head_style.copy() for i in range(self.num_cols)]
-            self.cell_styles = [[self.cell_style.copy() for i in range(self.num_cols)]
-                                for j in range(self.num_rows)]
+            row_head_style = tstyle.row_head_style.copy()
+            col_head_style = tstyle.col_head_style.copy()
+            cell_style = self.cell_style.copy()
+        self.header_row_styles = [row_head_style] * self.num_rows
+        self.header_col_styles = [col_head_style] * self.num_cols
+
+        # sparse cell styles: index -> (sequence number, style)
+        self.default_cell_style = cell_style
+        self.row_cell_styles = {}
+        self.col_cell_styles = {}
+        self.cell_style_overrides = {}
+        self._seq = 0
+
+    # functions to look up styles
+    def get_cell_style(self, i, j):
+        """
+        Return the style of cell (i, j)
+        """
+        i = _check_index(i, self.num_rows)
+        j = _check_index(j, self.num_cols)
+        return self._resolve(i, j)
+
+    def _resolve(self, i, j):
+        """
+        Return the most recent style of cell (i, j), which must be
+        non-negative
+        """
+        seq, style = -1, self.default_cell_style
+        for entry in (self.row_cell_styles.get(i), self.col_cell_styles.get(j),
+                      self.cell_style_overrides.get((i, j))):
+            if entry is not None and entry[0] > seq:
+                seq, style = entry
+        return style
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def _set_cell_styles(self, style, rows, cols):
+        """
+        Set the style of the cells in rows x cols, where None is all
+        rows or all columns
+        """
+        if rows is None and cols is None:
+            self.default_cell_style = style
+            self.row_cell_styles.clear()
+            self.col_cell_styles.clear()
+            self.cell_style_overrides.clear()
+            return
+        seq = self._next_seq()
+        if rows is None:
+            cols = {_check_index(j, self.num_cols) for j in cols}
+            for j in cols:
+                self.col_cell_styles[j] = (seq, style)
+            self._prune_overrides(lambda i, j: j in cols)
+        elif cols is None:
+            rows = {_check_index(i, self.num_rows) for i in rows}
+            for i in rows:
+                self.row_cell_styles[i] = (seq, style)
+            self._prune_overrides(lambda i, j: i in rows)
+        else:
+            cols = [_check_index(j, self.num_cols) for j in cols]
+            for i in rows:
+                i = _check_index(i, self.num_rows)
+                for j in cols:
+                    self.cell_style_overrides[(i, j)] = (seq, style)
+
+    def _prune_overrides(self, replaced):
+        """
+        Remove the cell overrides that replaced(i, j) is True for
+        """
+        overrides = self.cell_style_overrides
+        for key in [key for key in overrides if replaced(*key)]:
+            del overrides[key]
 
     # functions to set styles
     def set_cell_style(self, style=None, tuples=None, rows=None, cols=None,
@@ -145,20 +232,16 @@ class PrettyTable(object):
             style.set(k, value)
         if format_function is not None:
             style.format_function = format_function
+        style = style.copy()
         if tuples:
+            seq = self._next_seq()
             for tup in tuples:
-                i = tup[0]
-                j = tup[1]
-                self.cell_styles[i][j] = style.copy()
+                i = _check_index(tup[0], self.num_rows)
+                j = _check_index(tup[1], self.num_cols)
+                self.cell_style_overrides[(i, j)] = (seq, style)
         if rows is None and cols is None:
             return
-        if rows is None:
-            rows = range(self.num_rows)
-        if cols is None:
-            cols = range(self.num_cols)
-        for i in rows:
-            for j in cols:
-                self.cell_styles[i][j] = style.copy()
+        self._set_cell_styles(style, rows, cols)
 
     def set_row_header_style(self, style=None, indices=None, format_function=None, **kwargs):
         """
@@ -174,8 +257,9 @@ class PrettyTable(object):
             style.format_function = format_function
         if indices is None:
             indices = range(self.num_rows)
+        style = style.copy()
         for i in indices:
-            self.header_row_styles[i] = style.copy()
+            self.header_row_styles[i] = style
 
     def set_col_header_style(self, style=None, indices=None, format_function=None, **kwargs):
         """
@@ -191,8 +275,9 @@ class PrettyTable(object):
         for key, value in kwargs.items():
             k = key.replace("_", "-")
             style.set(k, value)
+        style = style.copy()
         for i in indices:
-            self.header_col_styles[i] = style.copy()
+            self.header_col_styles[i] = style
 
     def set_corner_style(self, style=None, format_function=None, **kwargs):
         """
@@ -212,15 +297,60 @@ class PrettyTable(object):
         """
         Update existing cell style
         """
-        if rows is None:
-            rows = range(self.num_rows)
-        if cols is None:
-            cols = range(self.num_cols)
-        for i in rows:
-            for j in cols:
-                style = self.cell_styles[i][j]
-                self.set_cell_style(
-                    style=style, rows=[i], cols=[j], format_function=format_function, **kwargs)
+        updated = {}
+
+        def update(style):
+            if style not in updated:
+                updated[style] = _updated_style(style, format_function, kwargs)
+            return updated[style]
+
+        if rows is None and cols is None:
+            # Updating every cell keeps the order of the entries.
+            self.default_cell_style = update(self.default_cell_style)
+            for styles in (self.row_cell_styles, self.col_cell_styles,
+                           self.cell_style_overrides):
+                for key, (seq, style) in styles.items():
+                    styles[key] = (seq, update(style))
+        elif rows is None:
+            self._update_lines([_check_index(j, self.num_cols) for j in cols], 1, update)
+        elif cols is None:
+            self._update_lines([_check_index(i, self.num_rows) for i in rows], 0, update)
+        else:
+            cols = [_check_index(j, self.num_cols) for j in cols]
+            seq = self._next_seq()
+            for i in rows:
+                i = _check_index(i, self.num_rows)
+                for j in cols:
+                    self.cell_style_overrides[(i, j)] = (seq, update(self._resolve(i, j)))
+
+    def _update_lines(self, lines, axis, update):
+        """
+        Update whole rows (axis=0) or columns (axis=1): the line style
+        is updated, and each cell with a more recent style gets an
+        updated override
+        """
+        if axis == 0:
+            line_styles, cross_styles = self.row_cell_styles, self.col_cell_styles
+        else:
+            line_styles, cross_styles = self.col_cell_styles, self.row_cell_styles
+        overrides = self.cell_style_overrides
+        lines = dict.fromkeys(lines)
+        line_overrides = {}
+        for key in overrides:
+            line, other = key if axis == 0 else key[::-1]
+            if line in lines:
+                line_overrides.setdefault(line, set()).add(other)
+
+        for line in lines:
+            seq, style = line_styles.get(line, (-1, self.default_cell_style))
+            others = line_overrides.get(line, set())
+            others.update(other for other, entry in cross_styles.items() if entry[0] > seq)
+            cells = [(line, other) if axis == 0 else (other, line) for other in others]
+            resolved = [self._resolve(*cell) for cell in cells]
+            line_styles[line] = (self._next_seq(), update(style))
+            seq = self._next_seq()
+            for cell, style in zip(cells, resolved):
+                overrides[cell] = (seq, update(style))
 
     def update_row_header_style(self, indices=None, format_function=None, **kwargs):
         """
@@ -228,10 +358,7 @@ class PrettyTable(object):
         """
         if indices is None:
             indices = range(self.num_rows)
-        for i in indices:
-            style = self.header_row_styles[i]
-            self.set_row_header_style(
-                style=style, indices=[i], format_function=format_function, **kwargs)
+        self._update_styles(self.header_row_styles, indices, format_function, kwargs)
 
     def update_col_header_style(self, indices=None, format_function=None, **kwargs):
         """
@@ -239,10 +366,19 @@ class PrettyTable(object):
         """
         if indices is None:
             indices = range(self.num_cols)
+        self._update_styles(self.header_col_styles, indices, format_function, kwargs)
+
+    def _update_styles(self, styles, indices, format_function, kwargs):
+        """
+        Replace styles[i] for each index with an updated copy, one copy
+        per distinct style
+        """
+        updated = {}
         for i in indices:
-            style = self.header_col_styles[i]
-            self.set_col_header_style(
-                style=style, indices=[i], format_function=format_function, **kwargs)
+            style = styles[i]
+            if style not in updated:
+                updated[style] = _updated_style(style, format_function, kwargs)
+            styles[i] = updated[style]
 
     def update_corner_style(self, format_function=None, **kwargs):
         """
@@ -257,13 +393,7 @@ class PrettyTable(object):
         """
         Reset existing cell style to defaults
         """
-        if rows is None:
-            rows = range(self.num_rows)
-        if cols is None:
-            cols = range(self.num_cols)
-        for i in rows:
-            for j in cols:
-                self.set_cell_style(style=CellStyle(), rows=[i], cols=[j])
+        self._set_cell_styles(CellStyle(), rows, cols)
 
     def reset_row_header_style(self, indices=None):
         """
@@ -271,8 +401,7 @@ class PrettyTable(object):
         """
         if indices is None:
             indices = range(self.num_rows)
-        for i in indices:
-            self.set_row_header_style(style=CellStyle(), indices=[i])
+        self.set_row_header_style(style=CellStyle(), indices=indices)
 
     def reset_col_header_style(self, indices=None):
         """
@@ -280,8 +409,7 @@ class PrettyTable(object):
         """
         if indices is None:
             indices = range(self.num_cols)
-        for i in indices:
-            self.set_col_header_style(style=CellStyle(), indices=[i])
+        self.set_col_header_style(style=CellStyle(), indices=indices)
 
     def reset_corner_style(self):
         """
@@ -294,84 +422,172 @@ class PrettyTable(object):
         IPython display protocol calls this method to get the
         HTML representation of the object
         """
-        html = "<table style=\"%s\">" % self.cell_style.css()
+        return self.to_html()
+
+    def to_html(self, buf=None, chunk_rows=1000):
+        """
+        Render the table as HTML
+
+        buf: None to return the HTML as a str, or a path or writable
+            file-like object to stream it to
+        chunk_rows: number of rows rendered at a time, which bounds
+            the memory used when streaming; at least 1
+        """
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1, got %s" % chunk_rows)
+        chunks = self._iter_html(chunk_rows)
+        if buf is None:
+            return "".join(chunks)
+        if hasattr(buf, "write"):
+            buf.writelines(chunks)
+        else:
+            with open(buf, "w", encoding="utf-8") as f:
+                f.writelines(chunks)
+
+    def _iter_html(self, chunk_rows):
+        """
+        Generate the HTML in fragments of up to chunk_rows rows
+
+        Cell values are read a column at a time, and the CSS of each
+        distinct style is computed once.
+        """
+        css_cache = {}
+
+        def css(style):
+            if style not in css_cache:
+                css_cache[style] = style.css()
+            return css_cache[style]
+
+        tr = "<tr style=\"%s\">" % css(self.cell_style)
+        header = ""
         if self.header_col:
-            html += "<tr style=\"%s\">" % self.cell_style.css()
-            if self.header_row:
-                # need to add an extra empty cell
-                html += "<td style=\"%s\"></td>" % self.corner_style.css()
-            for j in range(self.num_cols):
-                if self.header_col_styles is not None:
-                    header_style = self.header_col_styles[j].css()
-                    header_data = self.header_col_styles[
-                        j].column_format(self.df.columns[j])
-                else:
-                    header_style = self.cell_style.css()
-                    header_data = self.cell_style.column_format(
-                        self.df.columns[j])
-                html += "<td style=\"%s\">" % header_style
-                html += header_data
-                html += "</td>"
-            html += "</tr>"
-        for i in range(self.num_rows):
-            html += "<tr style=\"%s\">" % self.cell_style.css()
+            header_styles = self.header_col_styles
+            if header_styles is None:
+                header_styles = [self.cell_style] * self.num_cols
+            header = "".join(
+                [tr]
+                + (["<td style=\"%s\"></td>" % css(self.corner_style)]
+                   if self.header_row else [])
+                + _cells_html(header_styles, self.df.columns, css, self.cell_style)
+                + ["</tr>"])
+
+        if self.center:
+            yield "<center>"
+        yield "<table style=\"%s\">" % css(self.cell_style)
+        yield header
+        index = self.df.index.values
+        styled_rows = sorted(self.row_cell_styles)
+        override_rows = {}
+        for i, j in sorted(self.cell_style_overrides):
+            override_rows.setdefault(j, []).append(i)
+        for start in range(0, self.num_rows, chunk_rows):
+            stop = min(start + chunk_rows, self.num_rows)
+            columns = []
             if self.header_row:
-                if self.header_row_styles is not None:
-                    header_style = self.header_row_styles[i].css()
-                    header_data = self.header_row_styles[
-                        i].column_format(self.df.index.values[i])
-                else:
-                    header_style = self.cell_style.css()
-                    header_data = self.cell_style.column_format(
-                        self.df.index.values[i])
-                html += "<td style=\"%s\">" % header_style
-                html += header_data
-                html += "</td>"
+                row_styles = self.header_row_styles
+                if row_styles is None:
+                    row_styles = [self.cell_style] * self.num_rows
+                columns.append(_cells_html(row_styles[start:stop], index[start:stop],
+                                           css, self.cell_style))
+            chunk_rows_styled = _between(styled_rows, start, stop)
             for j in range(self.num_cols):
-                if self.cell_styles[i][j] is not None:
-                    col_style = self.cell_styles[i][j].css()
-                    col_data = self.cell_styles[i][
-                        j].column_format(self.df.iloc[i, j])
-                else:
-                    col_style = self.cell_style.css()
-                    col_data = self.cell_style.column_format(
-                        self.df.iloc[i, j])
-                html += "<td style=\"%s\">" % col_style
-                html += col_data
-                html += "</td>"
-            html += "</tr>"
-            if self.rpt_header > 0 and (i + 1) % self.rpt_header == 0 and i < self.num_rows - 1:
-                if self.header_col:
-                    html += "<tr style=\"%s\">" % self.cell_style.css()
-                    if self.header_row:
-                        # need to add an extra empty cell
-                        html += "<td style=\"%s\"></td>" % self.corner_style.css(
-                        )
-                    for j in range(self.num_cols):
-                        if self.header_col_styles is not None:
-                            header_style = self.header_col_styles[j].css()
-                            header_data = self.header_col_styles[
-                                j].column_format(self.df.columns[j])
-                        else:
-                            header_style = self.cell_style.css()
-                            header_data = self.cell_style.column_format(
-                                self.df.columns[j])
-                        html += "<td style=\"%s\">" % header_style
-                        html += header_data
-                        html += "</td>"
-                    html += "</tr>"
-        html += "</table>"
+                styles = self._column_styles(j, start, stop, chunk_rows_styled,
+                                             _between(override_rows.get(j, []), start, stop))
+                values = _column_values(self.df.iloc[start:stop, j])
+                columns.append(_cells_html(styles, values, css, self.cell_style))
+
+            html = []
+            for i, cells in enumerate(zip(*columns), start):
+                html.append(tr)
+                html.extend(cells)
+                html.append("</tr>")
+                if (self.rpt_header > 0 and (i + 1) % self.rpt_header == 0
+                        and i < self.num_rows - 1):
+                    html.append(header)
+            yield "".join(html)
+        yield "</table>"
         if self.center:
-            return "<center>%s</center>" % html
-        else:
-            return html
+            yield "</center>"
+
+    def _column_styles(self, j, start, stop, styled_rows, override_rows):
+        """
+        Return the styles of rows start to stop of column j, given the
+        rows in that range with a row style or an override in column j
+        """
+        style = self.col_cell_styles.get(j, (-1, self.default_cell_style))[1]
+        styles = [style] * (stop - start)
+        for i in styled_rows:
+            styles[i - start] = self._resolve(i, j)
+        for i in override_rows:
+            styles[i - start] = self._resolve(i, j)
+        return styles
 
     def copy(self):
+        # Styles are replaced, never modified, so copies can share them.
         p = PrettyTable(self.df, self.style, self.header_row, self.header_col)
-        p.header_row_styles = [item.copy() for item in self.header_row_styles]
-        p.header_col_styles = [item.copy() for item in self.header_col_styles]
-        p.cell_styles = [[self.cell_styles[i][j].copy() for j in range(
-            self.num_cols)] for i in range(self.num_rows)]
+        p.header_row_styles = list(self.header_row_styles)
+        p.header_col_styles = list(self.header_col_styles)
+        p.default_cell_style = self.default_cell_style
+        p.row_cell_styles = self.row_cell_styles.copy()
+        p.col_cell_styles = self.col_cell_styles.copy()
+        p.cell_style_overrides = self.cell_style_overrides.copy()
+        p._seq = self._seq
         p.corner_style = self.corner_style.copy()
         p.center = self.center
         return p
+
+
+def _check_index(i, n):
+    """
+    Return the non-negative index of i in a sequence of length n
+    """
+    if not -n <= i < n:
+        raise IndexError("index %s out of range" % i)
+    return i + n if i < 0 else i
+
+
+def _between(indices, start, stop):
+    """
+    Return the items of the sorted list indices in [start, stop)
+    """
+    return indices[bisect.bisect_left(indices, start):bisect.bisect_left(indices, stop)]
+
+
+def _updated_style(style, format_function, kwargs):
+    """
+    Return a copy of style with the CSS properties in kwargs and the
+    format_function, if not None
+    """
+    style = CellStyle() if style is None else style.copy()
+    for key, value in kwargs.items():
+        style.set(key.replace("_", "-"), value)
+    if format_function is not None:
+        style.format_function = format_function
+    return style
+
+
+def _column_values(s):
+    """
+    Return the values of a column as the scalars that df.iloc[i, j]
+    returns, e.g. Timestamps rather than datetime64s
+    """
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind not in "mM":
+        return s.to_numpy()
+    return s.astype(object).to_numpy()
+
+
+def _cells_html(styles, values, css, default_style):
+    """
+    Return the <td> elements of a column of values
+    """
+    first = styles[0] if len(styles) else None
+    if all(style is first for style in styles):
+        style = default_style if first is None else first
+        td = "<td style=\"%s\">" % css(style)
+        return [td + text + "</td>" for text in style.format_values(values)]
+    html = []
+    for style, x in zip(styles, values):
+        if style is None:
+            style = default_style
+        html.append("<td style=\"%s\">%s</td>" % (css(style), style.column_format(x)))
+    return html
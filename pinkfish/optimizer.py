@@ -0,0 +1,357 @@
+"""
+Parameter sweeps and walk-forward optimization.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import pinkfish.fetch as fetch
+import pinkfish.indicator_cache as indicator_cache
+import pinkfish.pfstatistics as pfstatistics
+
+
+########################################################################
+# HELPERS
+
+def _expand_grid(param_grid):
+    """
+    Return a list of option dicts, one per combination in `param_grid`.
+    """
+    keys = list(param_grid)
+    return [dict(zip(keys, values))
+            for values in itertools.product(*param_grid.values())]
+
+
+def _label(params):
+    """
+    Return a label for a combination of parameters.
+
+    A single parameter is labeled with its value, e.g. '7', which
+    matches the labels used in the optimize notebooks.
+    """
+    if len(params) == 1:
+        return str(next(iter(params.values())))
+    return ', '.join(f'{k}={v}' for k, v in params.items())
+
+
+def _init_worker(memo, cache):
+    """
+    Share the timeseries memo and indicator cache of the parent
+    process with a worker.
+    """
+    fetch._timeseries_memo = memo
+    indicator_cache._indicator_cache = cache
+
+
+def _run_strategy(strategy_class, symbol, capital, start, end, options):
+    """
+    Run a strategy and return it.
+    """
+    s = strategy_class(symbol, capital, start, end, options)
+    s.run()
+    return s
+
+
+def _run_stats(strategy_class, symbol, capital, start, end, options):
+    """
+    Run a strategy and return only its stats.
+    """
+    return _run_strategy(strategy_class, symbol, capital, start, end, options).stats
+
+
+def _map(func, jobs, max_workers):
+    """
+    Call `func(*job)` for each job, in a process pool if max_workers != 1.
+
+    Within `cache_indicators()`, the first job is run in this process
+    so that the workers start with its indicators already cached.
+    """
+    if max_workers == 1 or not jobs:
+        return [func(*job) for job in jobs]
+    results = []
+    if indicator_cache._indicator_cache is not None:
+        results.append(func(*jobs[0]))
+        jobs = jobs[1:]
+        if not jobs:
+            return results
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(fetch._timeseries_memo,
+                                       indicator_cache._indicator_cache)) as executor:
+        return results + list(executor.map(func, *zip(*jobs)))
+
+
+def _preload(symbol, dir_name):
+    """
+    Read the timeseries for `symbol` (str or list) into the memo.
+
+    Returns the dates that are common to all symbols.
+    """
+    symbols = symbol if isinstance(symbol, list) else [symbol]
+    index = None
+    for sym in symbols:
+        ts = fetch.fetch_timeseries(sym, dir_name=dir_name)
+        index = ts.index if index is None else index.intersection(ts.index)
+    return index
+
+
+########################################################################
+# SWEEP
+
+def sweep(strategy_class, symbol, capital, start, end, options, param_grid,
+          dir_name='symbol-cache', max_workers=None):
+    """
+    Run a strategy once for each combination of parameters.
+
+    The timeseries are read only once.  The runs are done in parallel
+    in a process pool.  Within `cache_indicators()`, indicators that
+    don't depend on `param_grid` are also computed only once.
+
+    Parameters
+    ----------
+    strategy_class : class
+        The strategy class, e.g. `strategy.Strategy`.  It must accept
+        (symbol, capital, start, end, options), have a `run()` method,
+        and set the `stats` attribute.
+    symbol : str or list of str
+        The symbol(s) passed to the strategy.
+    capital : int
+        The amount of money available for trading.
+    start : datetime.datetime
+        The desired start date for the strategy.
+    end : datetime.datetime
+        The desired end date for the strategy.
+    options : dict
+        The base options for the strategy.
+    param_grid : dict of lists
+        The values to try for each option, e.g.
+        {'period': range(2, 15), 'sma': [70, 200]}.
+    dir_name : str, optional
+        The leaf data dir name (default is 'symbol-cache').
+    max_workers : int, optional
+        The number of worker processes (default is None, which implies
+        the number of processors on the machine).  Use 1 to run in the
+        current process.
+
+    Returns
+    -------
+    strategies : pd.Series
+        The strategies that were run, labeled by parameter values.
+        Suitable for use with `optimizer_summary()`.
+
+    Examples
+    --------
+    >>> strategies = pf.sweep(strategy.Strategy, 'SPY', capital, start,
+    ...                       end, options, {'sma': range(20, 210, 10)})
+    >>> df = pf.optimizer_summary(strategies, metrics)
+    """
+    grid = _expand_grid(param_grid)
+    with fetch.memoize_timeseries():
+        _preload(symbol, dir_name)
+        jobs = [(strategy_class, symbol, capital, start, end, {**options, **params})
+                for params in grid]
+        results = _map(_run_strategy, jobs, max_workers)
+
+    strategies = pd.Series(dtype=object)
+    for params, s in zip(grid, results):
+        strategies[_label(params)] = s
+    return strategies
+
+
+########################################################################
+# WALK FORWARD
+
+class WalkForward:
+    """
+    Walk-forward optimization and out-of-sample evaluation.
+
+    The trading period is split into consecutive train/test windows.
+    The strategy is optimized on each train window, then the best
+    options are used to trade the test window that follows it.  The
+    out-of-sample test results are stitched together into one equity
+    curve.
+    """
+
+    def __init__(self, strategy_class, symbol, capital, start, end, options,
+                 param_grid, metric='sharpe_ratio', maximize=True,
+                 train_bars=None, test_bars=None, anchored=False,
+                 dir_name='symbol-cache', max_workers=None):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        strategy_class : class
+            The strategy class, e.g. `strategy.Strategy`.
+        symbol : str or list of str
+            The symbol(s) passed to the strategy.
+        capital : int
+            The amount of money available for trading.
+        start : datetime.datetime
+            The desired start date for the first train window.
+        end : datetime.datetime
+            The desired end date for the last test window.
+        options : dict
+            The base options for the strategy.
+        param_grid : dict of lists
+            The values to try for each option on each train window.
+        metric : str, optional
+            The `stats` metric used to pick the best options
+            (default is 'sharpe_ratio').  NaN values are ignored.  If
+            the metric is NaN for every option combination of a train
+            window, e.g. the sharpe ratio of a window without trades,
+            its test window is traded with the base `options`.
+        maximize : bool, optional
+            True to pick the options with the largest metric, False
+            for the smallest (default is True).
+        train_bars : int, optional
+            The number of bars in each train window (default is None,
+            which implies 5 years of trading days).
+        test_bars : int, optional
+            The number of bars in each test window (default is None,
+            which implies 1 year of trading days).
+        anchored : bool, optional
+            True for train windows that all begin at `start`, False for
+            rolling train windows of fixed length (default is False).
+        dir_name : str, optional
+            The leaf data dir name (default is 'symbol-cache').
+        max_workers : int, optional
+            The number of worker processes (default is None, which
+            implies the number of processors on the machine).  Use 1
+            to run in the current process.
+
+        Attributes
+        ----------
+        windows : pd.DataFrame
+            One row per window with the train and test dates, the best
+            options ({} for the base options), and the train and test
+            metric.
+        train_results : pd.DataFrame
+            The metric for each window (rows) and option combination
+            (columns).
+        strategies : pd.Series
+            The out-of-sample strategies, one per test window.
+        ts : pd.DataFrame
+            The timeseries of all test windows.
+        tlog : pd.DataFrame
+            The trade log of all test windows.
+        dbal : pd.DataFrame
+            The stitched out-of-sample daily balance.
+        stats : pd.Series
+            The statistics of the stitched out-of-sample results.
+        """
+        self.strategy_class = strategy_class
+        self.symbol = symbol
+        self.capital = capital
+        self.start = start
+        self.end = end
+        self.options = options.copy()
+        self.param_grid = param_grid
+        self.metric = metric
+        self.maximize = maximize
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.anchored = anchored
+        self.dir_name = dir_name
+        self.max_workers = max_workers
+
+        self.windows = None
+        self.train_results = None
+        self.strategies = None
+        self.ts = None
+        self.tlog = None
+        self.dbal = None
+        self.stats = None
+
+    def _split(self, index):
+        """
+        Split `index` into train/test windows.
+
+        Returns a list of (train_start, train_end, test_start, test_end)
+        dates.
+        """
+        train_bars = self.train_bars or 5*pfstatistics.TRADING_DAYS_PER_YEAR
+        test_bars = self.test_bars or pfstatistics.TRADING_DAYS_PER_YEAR
+        if train_bars < 1 or test_bars < 1:
+            raise ValueError('train_bars and test_bars must be positive')
+        if len(index) <= train_bars:
+            raise ValueError(f'not enough data for a {train_bars} bar train window')
+
+        windows = []
+        for i in range(train_bars, len(index), test_bars):
+            train_start = 0 if self.anchored else i - train_bars
+            test_end = min(i + test_bars, len(index)) - 1
+            windows.append((index[train_start], index[i-1], index[i], index[test_end]))
+        return windows
+
+    def _stitch(self):
+        """
+        Stitch the test windows into one out-of-sample result.
+
+        Each test window starts with `capital`, so it is rescaled to
+        begin where the previous window ended.
+        """
+        dbals = []; tlogs = []
+        equity = self.capital
+        for s in self.strategies:
+            factor = equity / self.capital
+            dbal = s.dbal.copy()
+            dbal[['high', 'low', 'close', 'cash']] *= factor
+            tlog = s.tlog.copy()
+            tlog['pl_cash'] *= factor
+            dbals.append(dbal)
+            tlogs.append(tlog)
+            equity = dbal['close'].iloc[-1]
+
+        self.ts = pd.concat([s.ts for s in self.strategies])
+        self.dbal = pd.concat(dbals)
+        self.tlog = pd.concat(tlogs, ignore_index=True)
+        self.tlog['cumul_total'] = self.tlog['pl_cash'].cumsum()
+
+    def run(self):
+        """
+        Run the walk-forward optimization.
+        """
+        grid = _expand_grid(self.param_grid)
+        labels = [_label(params) for params in grid]
+
+        with fetch.memoize_timeseries():
+            index = _preload(self.symbol, self.dir_name)
+            index = index[(index >= self.start) & (index <= self.end)]
+            windows = self._split(index)
+
+            # Optimize every train window in one parallel batch.
+            jobs = [(self.strategy_class, self.symbol, self.capital,
+                     train_start, train_end, {**self.options, **params})
+                    for train_start, train_end, _, _ in windows
+                    for params in grid]
+            results = _map(_run_stats, jobs, self.max_workers)
+            values = [stats[self.metric] for stats in results]
+            self.train_results = pd.DataFrame(
+                [values[i:i+len(grid)] for i in range(0, len(values), len(grid))],
+                columns=labels, index=range(len(windows)))
+
+            scores = self.train_results.astype(float)
+            arg = np.nanargmax if self.maximize else np.nanargmin
+            best = [None if np.isnan(row).all() else int(arg(row))
+                    for row in scores.to_numpy()]
+            params = [{} if b is None else grid[b] for b in best]
+
+            # Trade each test window with the best train options, or
+            # the base options if no train metric is a number.
+            jobs = [(self.strategy_class, self.symbol, self.capital,
+                     test_start, test_end, {**self.options, **p})
+                    for (_, _, test_start, test_end), p in zip(windows, params)]
+            self.strategies = pd.Series(_map(_run_strategy, jobs, self.max_workers))
+
+        self.windows = pd.DataFrame(windows, columns=['train_start', 'train_end',
+                                                      'test_start', 'test_end'])
+        self.windows['params'] = params
+        self.windows['train_metric'] = [np.nan if b is None else scores.iloc[i, b]
+                                        for i, b in enumerate(best)]
+        self.windows['test_metric'] = [s.stats[self.metric] for s in self.strategies]
+
+        self._stitch()
+        self.stats = pfstatistics.stats(self.ts, self.tlog, self.dbal, self.capital)
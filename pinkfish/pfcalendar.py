@@ -32,88 +32,153 @@ Adds calendar columns to a timeseries.
     Last trading day of the year.
 """
 
+from collections import OrderedDict
+import hashlib
+
+import numpy as np
 import pandas as pd
 pd.set_option('future.no_silent_downcasting', True)
 
+from pinkfish.profiling import profiled
+import pinkfish.utility as utility
+
+
+CALENDAR_COLUMNS = [
+    'dotw', 'dotm', 'doty', 'month',
+    'first_dotw', 'first_dotm', 'first_doty',
+    'last_dotw', 'last_dotm', 'last_doty'
+]
+"""
+list of str : The calendar columns, in the order they are added.
+"""
+
+_CALENDAR_CACHE_SIZE = 32
+_calendar_cache = OrderedDict()
+"""
+OrderedDict : The calendar columns of the most recently used indexes,
+keyed by a fingerprint of the index.
+"""
+
 
-def _first_day(row):
+def _index_key(index):
     """
-    Get the first trading day of week, month, year.
+    Return a fingerprint of a DatetimeIndex.
     """
-    first_dotw = row['dotw'] < row['__prev_dotw__']
-    first_dotm = row['dotm'] < row['__prev_dotm__']
-    first_doty = row['doty'] < row['__prev_doty__']
+    h = hashlib.blake2b(index.asi8, digest_size=16)
+    h.update(str(index.tz).encode())
+    return h.hexdigest()
 
-    return first_dotw, first_dotm, first_doty
 
+def _calendar_columns(index):
+    """
+    Compute the calendar columns of `index`.
+
+    A day is the first trading day of the week (month, year) if its
+    day of the week (month, year) is less than that of the previous
+    trading day.  The first row is never a first day, and the last
+    row is never a last day.
 
-def calendar(ts, columns=None):
+    Returns a dict of read-only arrays, keyed by column name.
+    """
+    key = _index_key(index)
+    if key in _calendar_cache:
+        _calendar_cache.move_to_end(key)
+        return _calendar_cache[key]
+
+    cols = {
+        'dotw': index.dayofweek.to_numpy(),
+        'dotm': index.day.to_numpy(),
+        'doty': index.dayofyear.to_numpy(),
+        'month': index.month.to_numpy()
+    }
+    for unit in ('dotw', 'dotm', 'doty'):
+        day = cols[unit]
+        first = np.zeros(len(day), dtype=bool)
+        first[1:] = day[1:] < day[:-1]
+        last = np.zeros(len(day), dtype=bool)
+        last[:-1] = first[1:]
+        cols['first_' + unit] = first
+        cols['last_' + unit] = last
+    for a in cols.values():
+        a.flags.writeable = False
+
+    _calendar_cache[key] = cols
+    if len(_calendar_cache) > _CALENDAR_CACHE_SIZE:
+        _calendar_cache.popitem(last=False)
+    return cols
+
+
+def _calendar_arrays(index, columns, compact):
+    """
+    Return a dict of writable calendar column arrays for `index`.
+    """
+    if compact is None:
+        compact = utility.COMPACT_DTYPES
+    cols = _calendar_columns(index)
+    arrays = {}
+    for column in CALENDAR_COLUMNS:
+        if columns is not None and column not in columns:
+            continue
+        a = cols[column]
+        if compact and a.dtype != bool:
+            a = a.astype(np.int16 if column == 'doty' else np.int8)
+        arrays[column] = a.copy()
+    return arrays
+
+
+@profiled('indicators')
+def calendar(ts, columns=None, compact=None):
     """
     Add calendar columns to a timeseries.
 
+    The columns are computed with vectorized comparisons on the index
+    and cached, so repeated calls with the same index are a lookup.
+
     Parameters
     ----------
     ts : pd.DataFrame
         The timeseries of a symbol.
     columns: list of str, optional
         Specify the name of the columns to keep
-        (default is None, which implies keeping all columns). 
+        (default is None, which implies keeping all columns).
+    compact : bool, optional
+        True to use int8 (int16 for `doty`) instead of int32 for the
+        day and month columns (default is None, which implies the
+        setting of `set_compact_dtypes()`).
 
     Returns
     -------
     pd.DataFrame
         The timeseries with calendar columns added.
     """
+    for column, a in _calendar_arrays(ts.index, columns, compact).items():
+        ts[column] = a
+    return ts
 
-    # Day of the week with Monday=0, Sunday=6.
-    ts['dotw'] = ts.index.dayofweek
-
-    # Day of the month.
-    ts['dotm'] = ts.index.day
-
-    # Day of the year.
-    ts['doty'] = ts.index.dayofyear
-
-    # Month as January=1, December=12.
-    ts['month'] = ts.index.month
-
-    # Temporarily add __prev_dotw__, __prev_dotm__, __prev_doty__ for
-    # convenience; drop them later.
-    ts['__prev_dotw__'] = ts['dotw'].shift()
-    ts['__prev_dotw__'] = ts['__prev_dotw__'].fillna(0)
-
-    ts['__prev_dotm__'] = ts['dotm'].shift()
-    ts['__prev_dotm__'] = ts['__prev_dotm__'].fillna(0)
-
-    ts['__prev_doty__'] = ts['doty'].shift()
-    ts['__prev_doty__'] = ts['__prev_doty__'].fillna(0)
-
-    # First and last day of the week, month, and year.
-    ts['first_dotw'], ts['first_dotm'], ts['first_doty'] = \
-        zip(*ts.apply(_first_day, axis=1))
-
-    ts['last_dotw'] = ts['first_dotw'].shift(-1)
-    ts['last_dotw'] = ts['last_dotw'].fillna(False).infer_objects(copy=False)
 
-    ts['last_dotm'] = ts['first_dotm'].shift(-1)
-    ts['last_dotm'] = ts['last_dotm'].fillna(False).infer_objects(copy=False)
+@profiled('indicators')
+def calendar_frame(ts, columns=None, compact=None):
+    """
+    Return the calendar columns of a timeseries as a new dataframe.
 
-    ts['last_doty'] = ts['first_doty'].shift(-1)
-    ts['last_doty'] = ts['last_doty'].fillna(False).infer_objects(copy=False)
+    Unlike `calendar()`, `ts` isn't modified.  This is the form used
+    by `add_features()`.
 
-    # Drop temporary columns.
-    ts.drop(columns=['__prev_dotw__', '__prev_dotm__', '__prev_doty__'],
-            inplace=True)
-    
-    # If `columns` is provided, drop any new columns not in `columns`
-    if columns is not None:
-        # Create a list of all new columns
-        new_columns = [
-            'dotw', 'dotm', 'doty', 'month',
-            'first_dotw', 'first_dotm', 'first_doty',
-            'last_dotw', 'last_dotm', 'last_doty'
-        ]
-        drop_columns = [column for column in new_columns if column not in columns]
-        ts.drop(columns=drop_columns, errors='ignore', inplace=True)
+    Parameters
+    ----------
+    ts : pd.DataFrame or pd.Series
+        The timeseries of a symbol.
+    columns: list of str, optional
+        Specify the name of the columns to keep
+        (default is None, which implies keeping all columns).
+    compact : bool, optional
+        True to use int8 (int16 for `doty`) instead of int32 for the
+        day and month columns (default is None, which implies the
+        setting of `set_compact_dtypes()`).
 
-    return ts
+    Returns
+    -------
+    pd.DataFrame
+        The calendar columns, with the index of `ts`.
+    """
+    return pd.DataFrame(_calendar_arrays(ts.index, columns, compact), index=ts.index)
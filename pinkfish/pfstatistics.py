@@ -321,15 +321,13 @@ The stats() function returns the following metrics in a pd.Series.
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import math
-import operator
 import sys
 
 import numpy as np
-from numpy.lib.stride_tricks import as_strided
 import pandas as pd
 
+from pinkfish.profiling import profiled
 import pinkfish.trade as trade
-import pinkfish.utility as utility
 
 
 # This is a reference to the module object instance itself.
@@ -406,28 +404,8 @@ def get_trading_days():
 def _beginning_balance(capital):
     return capital
 
-def _ending_balance(dbal):
-    return dbal.iloc[-1]['close']
-
-@utility.no_empty_container('tlog', 0)
-def _total_net_profit(tlog):
-    return tlog.iloc[-1]['cumul_total']
-
-@utility.no_empty_container('tlog', 0)
-def _gross_profit(tlog):
-    return tlog[tlog['pl_cash'] > 0]['pl_cash'].sum()
-
-@utility.no_empty_container('tlog', 0)
-def _gross_loss(tlog):
-    return tlog[tlog['pl_cash'] < 0]['pl_cash'].sum()
-
-def _profit_factor(tlog):
-    if _gross_profit(tlog) == 0: return 0
-    if _gross_loss(tlog) == 0: return 1000
-    return _gross_profit(tlog) / _gross_loss(tlog) * -1
-
-def _return_on_initial_capital(tlog, capital):
-    return _total_net_profit(tlog) / capital * 100
+def _ending_balance(close):
+    return close[-1]
 
 def _difference_in_years(start, end):
     diff  = abs(start - end)
@@ -448,14 +426,14 @@ def _trading_period(start, end):
     diff = relativedelta(end, start)
     return f'{diff.years} years {diff.months} months {diff.days} days'
 
-def _total_days_in_market(dbal):
-    n = (dbal['shares'] > 0).sum()
-    if dbal.iloc[-2]['shares'] > 0:
+def _total_days_in_market(shares):
+    n = np.count_nonzero(shares > 0)
+    if shares[-2] > 0:
         n += 1
     return n
 
-def _pct_time_in_market(dbal):
-    return _total_days_in_market(dbal) / len(dbal) * 100
+def _pct_time_in_market(shares):
+    return _total_days_in_market(shares) / len(shares) * 100
 
 
 ########################################################################
@@ -475,216 +453,160 @@ def _min_leverage(dbal):
 
 
 ########################################################################
-# SUMS
-
-def _total_num_trades(tlog):
-    return len(tlog)
+# TRADES - sums, cash profits and losses, points, and streaks
 
-def _trades_per_year(tlog, start, end):
+def _trades_per_year(num_trades, start, end):
     diff = relativedelta(end, start)
     years = diff.years + diff.months/12 + diff.days/365
-    return _total_num_trades(tlog) / years
+    return num_trades / years
 
-@utility.no_empty_container('tlog', 0)
-def _num_winning_trades(tlog):
-    return (tlog['pl_cash'] > 0).sum()
+def _max(a):
+    return a.max() if len(a) > 0 else np.nan
 
-@utility.no_empty_container('tlog', 0)
-def _num_losing_trades(tlog):
-    return (tlog['pl_cash'] < 0).sum()
-
-@utility.no_empty_container('tlog', 0)
-def _num_even_trades(tlog):
-    return (tlog['pl_cash'] == 0).sum()
-
-def _pct_profitable_trades(tlog):
-    if _total_num_trades(tlog) == 0: return 0
-    return _num_winning_trades(tlog) / _total_num_trades(tlog) * 100
-
-
-########################################################################
-# CASH PROFITS AND LOSSES
+def _min(a):
+    return a.min() if len(a) > 0 else np.nan
 
-def _avg_profit_per_trade(tlog):
-    if _total_num_trades(tlog) == 0: return 0
-    return _total_net_profit(tlog) / _total_num_trades(tlog)
-
-def _avg_profit_per_winning_trade(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return _gross_profit(tlog) / _num_winning_trades(tlog)
+def _longest_run(mask):
+    """
+    Return the length of the longest run of True values in `mask`.
 
-def _avg_loss_per_losing_trade(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return _gross_loss(tlog) / _num_losing_trades(tlog)
+    Example: If `mask` is 001000111100 as booleans, then the longest
+    run has length 4.
+    """
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return int((edges[1::2] - edges[::2]).max())
 
-def _ratio_avg_profit_win_loss(tlog):
-    if _avg_profit_per_winning_trade(tlog) == 0: return 0
-    if _avg_loss_per_losing_trade(tlog) == 0: return 1000
-    return (_avg_profit_per_winning_trade(tlog) /
-            _avg_loss_per_losing_trade(tlog) * -1)
+def _trade_stats(tlog):
+    """
+    Compute all of the trade level statistics.
 
-def _largest_profit_winning_trade(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_cash'] > 0].max()['pl_cash']
+    The trade log columns are converted to NumPy arrays once, and
+    each subset of trades (winners, losers) is selected only once.
 
-def _largest_loss_losing_trade(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_cash'] < 0].min()['pl_cash']
+    Returns a dict of metric name and value.
+    """
+    s = {}
+    n = len(tlog)
+    if n == 0:
+        for metric in ('total_net_profit', 'gross_profit', 'gross_loss',
+                       'profit_factor', 'total_num_trades',
+                       'num_winning_trades', 'num_losing_trades',
+                       'num_even_trades', 'pct_profitable_trades',
+                       'avg_profit_per_trade', 'avg_profit_per_winning_trade',
+                       'avg_loss_per_losing_trade', 'ratio_avg_profit_win_loss',
+                       'largest_profit_winning_trade', 'largest_loss_losing_trade',
+                       'num_winning_points', 'num_losing_points',
+                       'total_net_points', 'avg_points',
+                       'largest_points_winning_trade', 'largest_points_losing_trade',
+                       'avg_pct_gain_per_trade', 'largest_pct_winning_trade',
+                       'largest_pct_losing_trade', 'expected_shortfall',
+                       'max_consecutive_winning_trades',
+                       'max_consecutive_losing_trades'):
+            s[metric] = 0
+        return s
+
+    pl_cash = tlog['pl_cash'].to_numpy(dtype=float)
+    pl_points = tlog['pl_points'].to_numpy(dtype=float)
+    pct = pl_points / tlog['entry_price'].to_numpy(dtype=float)
+
+    win = pl_cash > 0
+    loss = pl_cash < 0
+    win_points = pl_points > 0
+    loss_points = pl_points < 0
+    num_winning = win.sum()
+    num_losing = loss.sum()
 
+    # SUMS
+    total_net_profit = tlog['cumul_total'].iloc[-1]
+    gross_profit = pl_cash[win].sum()
+    gross_loss = pl_cash[loss].sum()
+    s['total_net_profit'] = total_net_profit
+    s['gross_profit'] = gross_profit
+    s['gross_loss'] = gross_loss
+    if gross_profit == 0: s['profit_factor'] = 0
+    elif gross_loss == 0: s['profit_factor'] = 1000
+    else: s['profit_factor'] = gross_profit / gross_loss * -1
+    s['total_num_trades'] = n
+    s['num_winning_trades'] = num_winning
+    s['num_losing_trades'] = num_losing
+    s['num_even_trades'] = (pl_cash == 0).sum()
+    s['pct_profitable_trades'] = num_winning / n * 100
 
-########################################################################
-# POINTS
-
-def _num_winning_points(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_points'] > 0]['pl_points'].sum()
-
-def _num_losing_points(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_points'] < 0]['pl_points'].sum()
-
-def _total_net_points(tlog):
-    return _num_winning_points(tlog) + _num_losing_points(tlog)
-
-@utility.no_empty_container('tlog', 0)
-def _avg_points(tlog):
-    return tlog['pl_points'].sum() / len(tlog.index)
-
-def _largest_points_winning_trade(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_points'] > 0].max()['pl_points']
-
-def _largest_points_losing_trade(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return tlog[tlog['pl_points'] < 0].min()['pl_points']
-
-@utility.no_empty_container('tlog', 0)
-def _avg_pct_gain_per_trade(tlog):
-    s = tlog['pl_points'] / tlog['entry_price']
-    return np.average(s) * 100
-
-def _largest_pct_winning_trade(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    df = tlog[tlog['pl_points'] > 0]
-    s = df['pl_points'] / df['entry_price']
-    return s.max() * 100
-
-def _largest_pct_losing_trade(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    df = tlog[tlog['pl_points'] < 0]
-    s = df['pl_points'] / df['entry_price']
-    return s.min() * 100
-
-@utility.no_empty_container('tlog', 0)
-def _expected_shortfall(tlog):
-    df = tlog[tlog['pl_points'] < 0]
-    s = df['pl_points'] / df['entry_price']
-    l = sorted(s)
-    end = int(len(l) * .05)
-    avg = np.mean(l[:end]) *100 if end > 0 else 0
-    return avg
+    # CASH PROFITS AND LOSSES
+    avg_win = gross_profit / num_winning if num_winning else 0
+    avg_loss = gross_loss / num_losing if num_losing else 0
+    s['avg_profit_per_trade'] = total_net_profit / n
+    s['avg_profit_per_winning_trade'] = avg_win
+    s['avg_loss_per_losing_trade'] = avg_loss
+    if avg_win == 0: s['ratio_avg_profit_win_loss'] = 0
+    elif avg_loss == 0: s['ratio_avg_profit_win_loss'] = 1000
+    else: s['ratio_avg_profit_win_loss'] = avg_win / avg_loss * -1
+    s['largest_profit_winning_trade'] = pl_cash[win].max() if num_winning else 0
+    s['largest_loss_losing_trade'] = pl_cash[loss].min() if num_losing else 0
 
+    # POINTS
+    winning_points = pl_points[win_points].sum() if num_winning else 0
+    losing_points = pl_points[loss_points].sum() if num_losing else 0
+    s['num_winning_points'] = winning_points
+    s['num_losing_points'] = losing_points
+    s['total_net_points'] = winning_points + losing_points
+    s['avg_points'] = pl_points.sum() / n
+    s['largest_points_winning_trade'] = _max(pl_points[win_points]) if num_winning else 0
+    s['largest_points_losing_trade'] = _min(pl_points[loss_points]) if num_losing else 0
+    s['avg_pct_gain_per_trade'] = np.average(pct) * 100
+    s['largest_pct_winning_trade'] = _max(pct[win_points]) * 100 if num_winning else 0
+    s['largest_pct_losing_trade'] = _min(pct[loss_points]) * 100 if num_losing else 0
+    losses = np.sort(pct[loss_points])
+    end = int(len(losses) * .05)
+    s['expected_shortfall'] = np.mean(losses[:end]) * 100 if end > 0 else 0
 
-########################################################################
-# STREAKS
+    # STREAKS
+    s['max_consecutive_winning_trades'] = _longest_run(win) if num_winning else 0
+    s['max_consecutive_losing_trades'] = _longest_run(~win) if num_losing else 0
+    return s
 
-def _subsequence(s, c):
+def _get_trade_bars(ts, tlog):
     """
-    Calculate the length of a subsequence
-
-    Takes as parameter list like object `s` and returns the length of
-    the longest subsequence of `s` constituted only by consecutive
-    character `c`s.
+    Return the number of bars in each trade.
 
-    Example: If the string passed as parameter is "001000111100",
-    and `c` is '0', then the longest subsequence of only '0's has
-    length 3.
+    Use the 'bars' column of `tlog` if it has one.
     """
-    count = 0
-    maxlen = 0
-
-    for bit in s:
-        if bit == c:
-            count += 1
-            if count > maxlen:
-                maxlen = count
-        else:
-            count = 0
-    return maxlen
-
-def _max_consecutive_winning_trades(tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return _subsequence(tlog['pl_cash'] > 0, True)
-
-def _max_consecutive_losing_trades(tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return _subsequence(tlog['pl_cash'] > 0, False)
+    if 'bars' in tlog:
+        return tlog['bars'].to_numpy()
+    return trade._bars_in_trade(ts.index, tlog)
 
-@utility.no_empty_container('tlog', [])
-def _get_trade_bars(ts, tlog, op):
-    l = []
-    for row in tlog.itertuples():
-        if op(row.pl_cash, 0):
-            l.append(len(ts[row.entry_date:row.exit_date].index))
-    return l
-
-def _avg_bars_winning_trades(ts, tlog):
-    if _num_winning_trades(tlog) == 0: return 0
-    return np.average(_get_trade_bars(ts, tlog, operator.gt))
-
-def _avg_bars_losing_trades(ts, tlog):
-    if _num_losing_trades(tlog) == 0: return 0
-    return np.average(_get_trade_bars(ts, tlog, operator.lt))
+def _avg_bars(bars, mask):
+    if not mask.any(): return 0
+    return np.average(bars[mask])
 
 
 ########################################################################
 # DRAWDOWN AND RUNUP
 
-def _max_closed_out_drawdown(close):
-    """
-    Only compare each point to the previous running peak O(N).
+def _max_drawdown(index, high, low):
     """
-    running_max = pd.Series(close).expanding(min_periods=1).max()
-    cur_dd = (close - running_max) / running_max * 100
-    dd_max = min(0, cur_dd.min())
-    idx = cur_dd.idxmin()
-
-    dd = pd.Series(dtype='object')
-    dd['max'] = dd_max
-    dd['peak'] = running_max[idx]
-    dd['trough'] = close[idx]
-    dd['peak_date'] = close[close == dd['peak']].index[0].strftime('%Y-%m-%d')
-    dd['trough_date'] = idx.strftime('%Y-%m-%d')
-    close = close[close.index > idx]
-
-    rd_mask = close > dd['peak']
-    if rd_mask.any():
-        dd['recovery_date'] = close[rd_mask].index[0].strftime('%Y-%m-%d')
-    else:
-        dd['recovery_date'] = 'Not Recovered Yet'
+    Compare each `low` to the previous running peak of `high` O(N).
 
-    return dd
-
-def _max_intra_day_drawdown(high, low):
-    """
-    Only compare each point to the previous running peak O(N).
+    `high` and `low` are 1d arrays; for closed out drawdown both are
+    the closing balance.
     """
-    running_max = pd.Series(high).expanding(min_periods=1).max()
+    running_max = np.maximum.accumulate(high)
     cur_dd = (low - running_max) / running_max * 100
-    dd_max = min(0, cur_dd.min())
-    idx = cur_dd.idxmin()
+    idx = np.nanargmin(cur_dd)
 
-    dd = pd.Series(dtype='object')
-    dd['max'] = dd_max
+    dd = {}
+    dd['max'] = min(0, cur_dd[idx])
     dd['peak'] = running_max[idx]
     dd['trough'] = low[idx]
-    dd['peak_date'] = high[high == dd['peak']].index[0].strftime('%Y-%m-%d')
-    dd['trough_date'] = idx.strftime('%Y-%m-%d')
-    high = high[high.index > idx]
+    dd['peak_date'] = index[np.flatnonzero(high == dd['peak'])[0]].strftime('%Y-%m-%d')
+    dd['trough_date'] = index[idx].strftime('%Y-%m-%d')
 
-    rd_mask = high > dd['peak']
-    if rd_mask.any():
-        dd['recovery_date'] = high[rd_mask].index[0].strftime('%Y-%m-%d')
+    rd = np.flatnonzero(high[idx+1:] > dd['peak'])
+    if len(rd) > 0:
+        dd['recovery_date'] = index[idx+1+rd[0]].strftime('%Y-%m-%d')
     else:
         dd['recovery_date'] = 'Not Recovered Yet'
 
@@ -701,68 +623,94 @@ def _drawdown_loss_recovery_period(peak_date, trough_date , recovery_date):
         recovery_period = abs(trough_date-recovery_date).days
     return loss_period, recovery_period
 
-def _windowed_view(x, window_size):
+def _rolling_max_extreme(x, window_size):
     """
-    Create a 2d windowed view of a 1d array.
-
-    `x` must be a 1d numpy array.
-
-    `numpy.lib.stride_tricks.as_strided` is used to create the view.
-    The data is not copied.
-
-    Example:
-
-    >>> x = np.array([1, 2, 3, 4, 5, 6])
-    >>> _windowed_view(x, 3)
-    array([[1, 2, 3],
-           [2, 3, 4],
-           [3, 4, 5],
-           [4, 5, 6]])
+    Compute the max drawdown and max runup of every `window_size`
+    window of `x` in O(N log W) time and O(N) memory.
+
+    `x` must be a 1d numpy array, or a 2d array with one series per
+    column.  Windows that begin before the first value are padded
+    with `x[0]`, so the results have the same shape as `x`.
+
+    Each window is split into power of two blocks.  A block is
+    summarized by its max, min, max drawdown, and max runup.  Two
+    adjacent blocks L and R combine into one block whose max drawdown
+    is the lesser of L's, R's, and the drop from L's max to R's min;
+    runup is the mirror image.  The block summaries for each power of
+    two are computed from the previous power of two, and the blocks
+    of a window are combined from left to right.
+
+    Returns the max drawdown and the max runup.
     """
-    y = as_strided(x, shape=(x.size - window_size + 1, window_size),
-                   strides=(x.strides[0], x.strides[0]))
-    return y
+    def _combine(left, right):
+        l_hi, l_lo, l_dd, l_ru = left
+        r_hi, r_lo, r_dd, r_ru = right
+        dd = np.subtract(r_lo, l_hi)
+        dd /= l_hi
+        dd *= 100
+        np.minimum(dd, l_dd, out=dd)
+        np.minimum(dd, r_dd, out=dd)
+        ru = np.subtract(r_hi, l_lo)
+        ru /= l_lo
+        ru *= 100
+        np.maximum(ru, l_ru, out=ru)
+        np.maximum(ru, r_ru, out=ru)
+        return np.maximum(l_hi, r_hi), np.minimum(l_lo, r_lo), dd, ru
+
+    n = len(x)
+    x = np.concatenate((np.repeat(x[:1], window_size - 1, axis=0), x))
+    zeros = np.zeros(x.shape)
+    block = (x, x, zeros, zeros)
+    acc = None
+    acc_size = 0
+    size = 1
+    while True:
+        if window_size & size:
+            b = tuple(a[acc_size:acc_size+n] for a in block)
+            acc = b if acc is None else _combine(acc, b)
+            acc_size += size
+        if size * 2 > window_size:
+            break
+        block = _combine(tuple(a[:-size] for a in block),
+                         tuple(a[size:] for a in block))
+        size *= 2
+    # Copy so the results don't share memory with `x` or each other.
+    return np.array(acc[2]), np.array(acc[3])
 
 def _rolling_max_dd(ser, period, min_periods=1):
     """
     Compute the rolling maximum drawdown of `ser`.
 
-    `ser` must be a Series.
+    `ser` must be a Series, or a DataFrame with one series per column.
     `min_periods` should satisfy 1 <= min_periods <= window_size.
+    Values with fewer than `min_periods` observations are NaN.
 
-    Returns an 1d array with length len(x) - min_periods + 1.
+    Returns a Series (DataFrame) the same shape as `ser`.
     """
     window_size = period + 1
-    x = ser.values
-    if min_periods < window_size:
-        pad = np.empty(window_size - min_periods)
-        pad.fill(x[0])
-        x = np.concatenate((pad, x))
-    y = _windowed_view(x, window_size)
-    running_max_y = np.maximum.accumulate(y, axis=1)
-    dd = (y - running_max_y) / running_max_y * 100
-    rmdd = dd.min(axis=1)
+    x = ser.to_numpy(dtype=float)
+    rmdd, _ = _rolling_max_extreme(x, window_size)
+    rmdd[:min_periods-1] = np.nan
+    if rmdd.ndim == 2:
+        return pd.DataFrame(data=rmdd, index=ser.index, columns=ser.columns)
     return pd.Series(data=rmdd, index=ser.index, name=ser.name)
 
 def _rolling_max_ru(ser, period, min_periods=1):
     """
     Compute the rolling maximum runup of `ser`.
 
-    `ser` must be a Series.
+    `ser` must be a Series, or a DataFrame with one series per column.
     `min_periods` should satisfy 1 <= min_periods <= window_size.
+    Values with fewer than `min_periods` observations are NaN.
 
-    Returns an 1d array with length len(x) - min_periods + 1.
+    Returns a Series (DataFrame) the same shape as `ser`.
     """
     window_size = period + 1
-    x = ser.values
-    if min_periods < window_size:
-        pad = np.empty(window_size - min_periods)
-        pad.fill(x[0])
-        x = np.concatenate((pad, x))
-    y = _windowed_view(x, window_size)
-    running_min_y = np.minimum.accumulate(y, axis=1)
-    ru = (y - running_min_y) / running_min_y * 100
-    rmru = ru.max(axis=1)
+    x = ser.to_numpy(dtype=float)
+    _, rmru = _rolling_max_extreme(x, window_size)
+    rmru[:min_periods-1] = np.nan
+    if rmru.ndim == 2:
+        return pd.DataFrame(data=rmru, index=ser.index, columns=ser.columns)
     return pd.Series(data=rmru, index=ser.index, name=ser.name)
 
 
@@ -770,9 +718,13 @@ def _rolling_max_ru(ser, period, min_periods=1):
 # PERCENT CHANGE - used to compute several stastics
 
 def _pct_change(close, period):
-    diff = (close.shift(-period) - close) / close * 100
-    diff.dropna(inplace=True)
-    return diff
+    """
+    Return the percent change of `close` over `period` bars.
+
+    `close` is a 1d array; NaN values are removed from the result.
+    """
+    diff = (close[period:] - close[:-period]) / close[:-period] * 100
+    return diff[~np.isnan(diff)]
 
 
 ########################################################################
@@ -804,6 +756,7 @@ def _sortino_ratio(rets, risk_free=0.00, period=TRADING_DAYS_PER_YEAR):
 ########################################################################
 # STATS - this is the primary call used to generate the results
 
+@profiled('stats')
 def stats(ts, tlog, dbal, capital):
     """
     Compute trading stats.
@@ -832,22 +785,32 @@ def stats(ts, tlog, dbal, capital):
     start = ts.index[0]
     end = ts.index[-1]
 
+    # Convert the daily balance to arrays once; every equity curve
+    # statistic below is computed from these.
+    close = dbal['close'].to_numpy(dtype=float)
+    high = dbal['high'].to_numpy(dtype=float)
+    low = dbal['low'].to_numpy(dtype=float)
+    shares = dbal['shares'].to_numpy()
+    rets = dbal['close'].pct_change()
+
+    t = _trade_stats(tlog)
+
     stats = pd.Series(dtype='object')
 
     # OVERALL RESULTS
     stats['start'] = start.strftime('%Y-%m-%d')
     stats['end'] = end.strftime('%Y-%m-%d')
     stats['beginning_balance'] = _beginning_balance(capital)
-    stats['ending_balance'] = _ending_balance(dbal)
-    stats['total_net_profit'] = _total_net_profit(tlog)
-    stats['gross_profit'] = _gross_profit(tlog)
-    stats['gross_loss'] = _gross_loss(tlog)
-    stats['profit_factor'] = _profit_factor(tlog)
-    stats['return_on_initial_capital'] = _return_on_initial_capital(tlog, capital)
-    cagr = _annual_return_rate(dbal['close'].iloc[-1], capital, start, end)
+    stats['ending_balance'] = _ending_balance(close)
+    stats['total_net_profit'] = t['total_net_profit']
+    stats['gross_profit'] = t['gross_profit']
+    stats['gross_loss'] = t['gross_loss']
+    stats['profit_factor'] = t['profit_factor']
+    stats['return_on_initial_capital'] = t['total_net_profit'] / capital * 100
+    cagr = _annual_return_rate(close[-1], capital, start, end)
     stats['annual_return_rate'] = cagr
     stats['trading_period'] = _trading_period(start, end)
-    stats['pct_time_in_market'] = _pct_time_in_market(dbal)
+    stats['pct_time_in_market'] = _pct_time_in_market(shares)
 
     # LEVERAGE
     stats['margin'] = _margin()
@@ -856,41 +819,31 @@ def stats(ts, tlog, dbal, capital):
     stats['min_leverage'] = _min_leverage(dbal)
 
     # SUMS
-    stats['total_num_trades'] = _total_num_trades(tlog)
-    stats['trades_per_year'] = _trades_per_year(tlog, start, end)
-    stats['num_winning_trades'] = _num_winning_trades(tlog)
-    stats['num_losing_trades'] = _num_losing_trades(tlog)
-    stats['num_even_trades'] = _num_even_trades(tlog)
-    stats['pct_profitable_trades'] = _pct_profitable_trades(tlog)
-
-    # CASH PROFITS AND LOSSES
-    stats['avg_profit_per_trade'] = _avg_profit_per_trade(tlog)
-    stats['avg_profit_per_winning_trade'] = _avg_profit_per_winning_trade(tlog)
-    stats['avg_loss_per_losing_trade'] = _avg_loss_per_losing_trade(tlog)
-    stats['ratio_avg_profit_win_loss'] = _ratio_avg_profit_win_loss(tlog)
-    stats['largest_profit_winning_trade'] = _largest_profit_winning_trade(tlog)
-    stats['largest_loss_losing_trade'] = _largest_loss_losing_trade(tlog)
-
-    # POINTS
-    stats['num_winning_points'] = _num_winning_points(tlog)
-    stats['num_losing_points'] = _num_losing_points(tlog)
-    stats['total_net_points'] = _total_net_points(tlog)
-    stats['avg_points'] = _avg_points(tlog)
-    stats['largest_points_winning_trade'] = _largest_points_winning_trade(tlog)
-    stats['largest_points_losing_trade'] = _largest_points_losing_trade(tlog)
-    stats['avg_pct_gain_per_trade'] = _avg_pct_gain_per_trade(tlog)
-    stats['largest_pct_winning_trade'] = _largest_pct_winning_trade(tlog)
-    stats['largest_pct_losing_trade'] = _largest_pct_losing_trade(tlog)
-    stats['expected_shortfall'] = _expected_shortfall(tlog)
-
-    # STREAKS
-    stats['max_consecutive_winning_trades'] = _max_consecutive_winning_trades(tlog)
-    stats['max_consecutive_losing_trades'] = _max_consecutive_losing_trades(tlog)
-    stats['avg_bars_winning_trades'] = _avg_bars_winning_trades(ts, tlog)
-    stats['avg_bars_losing_trades'] = _avg_bars_losing_trades(ts, tlog)
+    stats['total_num_trades'] = t['total_num_trades']
+    stats['trades_per_year'] = _trades_per_year(t['total_num_trades'], start, end)
+    for metric in ('num_winning_trades', 'num_losing_trades',
+                   'num_even_trades', 'pct_profitable_trades',
+                   # CASH PROFITS AND LOSSES
+                   'avg_profit_per_trade', 'avg_profit_per_winning_trade',
+                   'avg_loss_per_losing_trade', 'ratio_avg_profit_win_loss',
+                   'largest_profit_winning_trade', 'largest_loss_losing_trade',
+                   # POINTS
+                   'num_winning_points', 'num_losing_points',
+                   'total_net_points', 'avg_points',
+                   'largest_points_winning_trade', 'largest_points_losing_trade',
+                   'avg_pct_gain_per_trade', 'largest_pct_winning_trade',
+                   'largest_pct_losing_trade', 'expected_shortfall',
+                   # STREAKS
+                   'max_consecutive_winning_trades',
+                   'max_consecutive_losing_trades'):
+        stats[metric] = t[metric]
+    bars = _get_trade_bars(ts, tlog)
+    pl_cash = tlog['pl_cash'].to_numpy(dtype=float)
+    stats['avg_bars_winning_trades'] = _avg_bars(bars, pl_cash > 0)
+    stats['avg_bars_losing_trades'] = _avg_bars(bars, pl_cash < 0)
 
     # DRAWDOWN
-    dd = _max_closed_out_drawdown(dbal['close'])
+    dd = _max_drawdown(dbal.index, close, close)
     stats['max_closed_out_drawdown'] = dd['max']
     stats['max_closed_out_drawdown_peak_date'] = dd['peak_date']
     stats['max_closed_out_drawdown_trough_date'] = dd['trough_date']
@@ -902,69 +855,204 @@ def stats(ts, tlog, dbal, capital):
         stats['annualized_return_over_max_drawdown'] = 0
     else:
         stats['annualized_return_over_max_drawdown'] = abs(cagr / dd['max'])
-    dd = _max_intra_day_drawdown(dbal['high'], dbal['low'])
+    dd = _max_drawdown(dbal.index, high, low)
     stats['max_intra_day_drawdown'] = dd['max']
-    dd = _rolling_max_dd(dbal['close'], TRADING_DAYS_PER_YEAR)
-    stats['avg_yearly_closed_out_drawdown'] = np.average(dd)
-    stats['max_yearly_closed_out_drawdown'] = min(dd)
-    dd = _rolling_max_dd(dbal['close'], TRADING_DAYS_PER_MONTH)
-    stats['avg_monthly_closed_out_drawdown'] = np.average(dd)
-    stats['max_monthly_closed_out_drawdown'] = min(dd)
-    dd = _rolling_max_dd(dbal['close'], TRADING_DAYS_PER_WEEK)
-    stats['avg_weekly_closed_out_drawdown'] = np.average(dd)
-    stats['max_weekly_closed_out_drawdown'] = min(dd)
+    # The rolling drawdown and runup come from one pass per period.
+    extremes = {unit: _rolling_max_extreme(close, period + 1)
+                for period, unit in ((TRADING_DAYS_PER_YEAR, 'yearly'),
+                                     (TRADING_DAYS_PER_MONTH, 'monthly'),
+                                     (TRADING_DAYS_PER_WEEK, 'weekly'))}
+    for unit, (dd, _) in extremes.items():
+        stats[f'avg_{unit}_closed_out_drawdown'] = np.average(dd)
+        stats[f'max_{unit}_closed_out_drawdown'] = np.min(dd)
 
     # RUNUP
-    ru = _rolling_max_ru(dbal['close'], TRADING_DAYS_PER_YEAR)
-    stats['avg_yearly_closed_out_runup'] = np.average(ru)
-    stats['max_yearly_closed_out_runup'] = ru.max()
-    ru = _rolling_max_ru(dbal['close'], TRADING_DAYS_PER_MONTH)
-    stats['avg_monthly_closed_out_runup'] = np.average(ru)
-    stats['max_monthly_closed_out_runup'] = max(ru)
-    ru = _rolling_max_ru(dbal['close'], TRADING_DAYS_PER_WEEK)
-    stats['avg_weekly_closed_out_runup'] = np.average(ru)
-    stats['max_weekly_closed_out_runup'] = max(ru)
+    for unit, (_, ru) in extremes.items():
+        stats[f'avg_{unit}_closed_out_runup'] = np.average(ru)
+        stats[f'max_{unit}_closed_out_runup'] = np.max(ru)
 
     # PERCENT CHANGE
-    pc = _pct_change(dbal['close'], TRADING_DAYS_PER_YEAR)
-    if len(pc) > 0:
-        stats['pct_profitable_years'] = (pc > 0).sum() / len(pc) * 100
-        stats['best_year'] = pc.max()
-        stats['worst_year'] = pc.min()
-        stats['avg_year'] = np.average(pc)
-        stats['annual_std'] = pc.std()
-    pc = _pct_change(dbal['close'], TRADING_DAYS_PER_MONTH)
-    if len(pc) > 0:
-        stats['pct_profitable_months'] = (pc > 0).sum() / len(pc) * 100
-        stats['best_month'] = pc.max()
-        stats['worst_month'] = pc.min()
-        stats['avg_month'] = np.average(pc)
-        stats['monthly_std'] = pc.std()
-    pc = _pct_change(dbal['close'], TRADING_DAYS_PER_WEEK)
-    if len(pc) > 0:
-        stats['pct_profitable_weeks'] = (pc > 0).sum() / len(pc) * 100
-        stats['best_week'] = pc.max()
-        stats['worst_week'] = pc.min()
-        stats['avg_week'] = np.average(pc)
-        stats['weekly_std'] = pc.std()
-    pc = _pct_change(dbal['close'], 1)
-    if len(pc) > 0:
-        stats['pct_profitable_days'] = (pc > 0).sum() / len(pc) * 100
-        stats['best_day'] = pc.max()
-        stats['worst_day'] = pc.min()
-        stats['avg_day'] = np.average(pc)
-        stats['daily_std'] = pc.std()
+    for period, unit, std in ((TRADING_DAYS_PER_YEAR, 'year', 'annual_std'),
+                              (TRADING_DAYS_PER_MONTH, 'month', 'monthly_std'),
+                              (TRADING_DAYS_PER_WEEK, 'week', 'weekly_std'),
+                              (1, 'day', 'daily_std')):
+        pc = _pct_change(close, period)
+        if len(pc) > 0:
+            stats[f'pct_profitable_{unit}s'] = np.count_nonzero(pc > 0) / len(pc) * 100
+            stats[f'best_{unit}'] = pc.max()
+            stats[f'worst_{unit}'] = pc.min()
+            stats[f'avg_{unit}'] = np.average(pc)
+            stats[std] = np.std(pc, ddof=1) if len(pc) > 1 else np.nan
 
     # RATIOS
-    sr = _sharpe_ratio(dbal['close'].pct_change())
+    sr = _sharpe_ratio(rets)
     sr_std = math.sqrt((1 + 0.5*sr**2) / len(dbal))
     stats['sharpe_ratio'] = sr
     stats['sharpe_ratio_max'] = sr + 3*sr_std #3 std=>99.73%
     stats['sharpe_ratio_min'] = sr - 3*sr_std
-    stats['sortino_ratio'] = _sortino_ratio(dbal['close'].pct_change())
+    stats['sortino_ratio'] = _sortino_ratio(rets)
     return stats
 
 
+########################################################################
+# STATS MATRIX - stats for many equity curves at once
+
+def _nan_std(a, ddof=0):
+    """
+    Column-wise std that ignores NaN, NaN where too few values.
+    """
+    n = np.count_nonzero(~np.isnan(a), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(a, axis=0) / n
+        var = np.nansum((a - mean)**2, axis=0) / (n - ddof)
+    var[n - ddof <= 0] = np.nan
+    return np.sqrt(var)
+
+_STATS_MATRIX_BLOCK_SIZE = 2**17
+"""
+int : The number of values in each block of columns of `stats_matrix()`.
+"""
+
+def _stats_matrix_block(close, capital, years):
+    """
+    Compute the `stats_matrix()` metrics for a block of columns.
+
+    Returns a dict of metric name and 1d array of values.
+    """
+    n, m = close.shape
+    A = close[0] if capital is None else np.full(m, capital, dtype=float)
+    B = close[-1]
+    s = {}
+    s['beginning_balance'] = A
+    s['ending_balance'] = B
+    cagr = (np.power(np.maximum(B, 0) / A, 1 / years) - 1) * 100
+    s['annual_return_rate'] = cagr
+
+    # DRAWDOWN
+    running_max = np.maximum.accumulate(close, axis=0)
+    dd = np.minimum(0, np.nanmin((close - running_max) / running_max * 100, axis=0))
+    s['max_closed_out_drawdown'] = dd
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s['annualized_return_over_max_drawdown'] = np.where(dd == 0, 0, np.abs(cagr / dd))
+
+    # DRAWDOWN AND RUNUP
+    for period, unit in ((TRADING_DAYS_PER_YEAR, 'yearly'),
+                         (TRADING_DAYS_PER_MONTH, 'monthly'),
+                         (TRADING_DAYS_PER_WEEK, 'weekly')):
+        rdd, rru = _rolling_max_extreme(close, period + 1)
+        s[f'avg_{unit}_closed_out_drawdown'] = np.mean(rdd, axis=0)
+        s[f'max_{unit}_closed_out_drawdown'] = np.min(rdd, axis=0)
+        s[f'avg_{unit}_closed_out_runup'] = np.mean(rru, axis=0)
+        s[f'max_{unit}_closed_out_runup'] = np.max(rru, axis=0)
+
+    # PERCENT CHANGE
+    for period, unit, std in ((TRADING_DAYS_PER_YEAR, 'year', 'annual_std'),
+                              (TRADING_DAYS_PER_MONTH, 'month', 'monthly_std'),
+                              (TRADING_DAYS_PER_WEEK, 'week', 'weekly_std'),
+                              (1, 'day', 'daily_std')):
+        if n <= period:
+            for metric in (f'pct_profitable_{unit}s', f'best_{unit}',
+                           f'worst_{unit}', f'avg_{unit}', std):
+                s[metric] = np.full(m, np.nan)
+            continue
+        pc = (close[period:] - close[:-period]) / close[:-period] * 100
+        count = np.count_nonzero(~np.isnan(pc), axis=0)
+        s[f'pct_profitable_{unit}s'] = np.count_nonzero(pc > 0, axis=0) / count * 100
+        s[f'best_{unit}'] = np.nanmax(pc, axis=0)
+        s[f'worst_{unit}'] = np.nanmin(pc, axis=0)
+        s[f'avg_{unit}'] = np.nanmean(pc, axis=0)
+        s[std] = _nan_std(pc, ddof=1)
+
+    # RATIOS
+    period = TRADING_DAYS_PER_YEAR
+    rets = close[1:] / close[:-1] - 1
+    mean = np.nanmean(rets, axis=0)
+    dev = _nan_std(rets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sr = np.where(dev == 0, 0, mean*period / (dev * np.sqrt(period)))
+        sr_std = np.sqrt((1 + 0.5*sr**2) / n)
+        s['sharpe_ratio'] = sr
+        s['sharpe_ratio_max'] = sr + 3*sr_std
+        s['sharpe_ratio_min'] = sr - 3*sr_std
+        dev = _nan_std(np.where(rets < 0, rets, np.nan))
+        dev = np.where(np.isnan(dev), 0, dev)
+        s['sortino_ratio'] = np.where(dev == 0, 0, mean*period / (dev * np.sqrt(period)))
+
+    return s
+
+def stats_matrix(dbals, capital=None):
+    """
+    Compute trading stats for many equity curves at once.
+
+    This is the vectorized counterpart of `stats()` for ranking a
+    large number of strategies or configurations.  Every metric is a
+    column-wise NumPy reduction, so 10,000 equity curves take one
+    call.  Only the metrics that depend on the daily balance alone
+    are computed; trade metrics require `stats()`.  The values agree
+    with `stats()` to floating point precision.
+
+    The metrics are: 'beginning_balance', 'ending_balance',
+    'annual_return_rate', 'max_closed_out_drawdown',
+    'annualized_return_over_max_drawdown',
+    'avg_yearly_closed_out_drawdown', 'max_yearly_closed_out_drawdown',
+    'avg_monthly_closed_out_drawdown', 'max_monthly_closed_out_drawdown',
+    'avg_weekly_closed_out_drawdown', 'max_weekly_closed_out_drawdown',
+    'avg_yearly_closed_out_runup', 'max_yearly_closed_out_runup',
+    'avg_monthly_closed_out_runup', 'max_monthly_closed_out_runup',
+    'avg_weekly_closed_out_runup', 'max_weekly_closed_out_runup',
+    the 'pct_profitable_', 'best_', 'worst_' and 'avg_' metrics for
+    years, months, weeks, and days, 'annual_std', 'monthly_std',
+    'weekly_std', 'daily_std', 'sharpe_ratio', 'sharpe_ratio_max',
+    'sharpe_ratio_min', and 'sortino_ratio'.
+
+    Parameters
+    ----------
+    dbals : pd.DataFrame or np.ndarray
+        The daily closing balances, one column per strategy.  All
+        columns must cover the same dates.  If a DataFrame with a
+        DatetimeIndex is given, the dates are used for the annual
+        return rate; otherwise the number of years is the number of
+        rows divided by the trading days per year.
+    capital : float, optional
+        The beginning balance (default is None, which implies the
+        first row of `dbals`).
+
+    Returns
+    -------
+    pd.DataFrame
+        Metrics (rows) vs strategies (columns), in the same layout as
+        `optimizer_summary()`.
+
+    Examples
+    --------
+    >>> dbals = pd.DataFrame({k: s.dbal['close'] for k, s in strategies.items()})
+    >>> df = pf.stats_matrix(dbals, capital)
+    >>> df.loc['sharpe_ratio'].nlargest(10)
+    """
+    columns = dbals.columns if isinstance(dbals, pd.DataFrame) else None
+    index = dbals.index if isinstance(dbals, pd.DataFrame) else None
+    close = np.asarray(dbals, dtype=float)
+    if close.ndim == 1:
+        close = close[:, np.newaxis]
+    n, m = close.shape
+    if columns is None:
+        columns = range(m)
+
+    if isinstance(index, pd.DatetimeIndex):
+        years = _difference_in_years(index[0], index[-1])
+    else:
+        years = (n - 1) / TRADING_DAYS_PER_YEAR
+
+    # Work on blocks of columns small enough to stay in the CPU cache.
+    step = max(1, _STATS_MATRIX_BLOCK_SIZE // n)
+    blocks = [_stats_matrix_block(np.ascontiguousarray(close[:, i:i+step]),
+                                  capital, years)
+              for i in range(0, m, step)]
+    s = {metric: np.concatenate([block[metric] for block in blocks])
+         for metric in blocks[0]}
+    return pd.DataFrame(s, index=columns).T
+
+
 ########################################################################
 # SUMMARY - stats() must be called before calling summary()
 
@@ -0,0 +1,167 @@
+"""
+Declarative feature pipeline.
+
+A pipeline is a list of `Feature` specs, each naming an output column
+and the indicator that computes it.  `add_features()` computes every
+feature from one input timeseries, which it doesn't modify, and
+returns a new timeseries with the feature columns added in a single
+allocation.  Features that share an intermediate, e.g. a CROSSOVER and
+an SMA with the same timeperiod, compute it only once.
+"""
+
+import pandas as pd
+
+import pinkfish.indicator as indicator
+from pinkfish.indicator_cache import cache_indicators
+from pinkfish.profiling import profiled
+
+
+class Feature:
+    """
+    A feature spec: an output column and the indicator that computes it.
+    """
+
+    def __init__(self, name, func, **kwargs):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        name : str or None
+            The name of the output column.  If `func` returns a
+            dataframe, its columns are named '{name}_{column}', or
+            keep their names if `name` is None.
+        func : function
+            The indicator, called as `func(ts, **kwargs)`, e.g.
+            `pf.SMA`.  It must not modify `ts`.
+        **kwargs
+            The arguments of `func`.  If `price` is the name of an
+            earlier feature, that feature is used as the price data.
+
+        Attributes
+        ----------
+        name : str or None
+            The name of the output column.
+        func : function
+            The indicator.
+        kwargs : dict
+            The arguments of `func`.
+
+        Examples
+        --------
+        >>> pf.Feature('sma200', pf.SMA, timeperiod=200)
+        """
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        kwargs = ', '.join(f'{k}={v!r}' for k, v in self.kwargs.items())
+        func = getattr(self.func, '__name__', self.func)
+        return f'Feature({self.name!r}, {func}, {kwargs})'
+
+
+_GRID_INDICATORS = {
+    indicator.PERIOD_HIGH: indicator.PERIOD_HIGH_GRID,
+    indicator.PERIOD_LOW: indicator.PERIOD_LOW_GRID
+}
+"""
+dict : Indicators with a grid version that fills the indicator cache
+for many timeperiods at once.
+"""
+
+
+def _seed_grids(ts, features):
+    """
+    Compute the features that have a grid version with one grid call
+    per indicator and price.
+    """
+    groups = {}
+    for feature in features:
+        grid = _GRID_INDICATORS.get(feature.func)
+        kwargs = feature.kwargs
+        price = kwargs.get('price', 'close')
+        if (grid is None or kwargs.get('prevday')
+                or not isinstance(price, str) or price not in ts.columns):
+            continue
+        key = (grid, price)
+        groups.setdefault(key, set()).add(kwargs.get('timeperiod', 20))
+
+    for (grid, price), timeperiods in groups.items():
+        if len(timeperiods) > 1:
+            grid(ts, timeperiods=sorted(timeperiods), price=price)
+
+
+def _columns(feature, result):
+    """
+    Return a dict of output columns for the result of a feature.
+    """
+    if isinstance(result, pd.DataFrame):
+        if feature.name is None:
+            return {column: result[column] for column in result.columns}
+        return {f'{feature.name}_{column}': result[column] for column in result.columns}
+    return {feature.name: result}
+
+
+@profiled('indicators')
+def add_features(ts, features):
+    """
+    Compute a list of features and add them to a timeseries.
+
+    `ts` isn't modified, so the same timeseries can be reused for many
+    pipelines, e.g. in a sweep, without copying it first.  Features are
+    computed in order, so a feature may use an earlier feature as its
+    price data.  Within the pipeline, every indicator result is cached,
+    so features that share an intermediate, e.g. the moving averages
+    of `CROSSOVER()`, compute it only once.  The period highs and lows
+    for many timeperiods are computed with one grid call.
+
+    Parameters
+    ----------
+    ts : pd.DataFrame
+        The timeseries of a symbol.
+    features : list of Feature
+        The features to compute.
+
+    Returns
+    -------
+    pd.DataFrame
+        A new timeseries with the columns of `ts` and one column per
+        feature.
+
+    Raises
+    ------
+    ValueError
+        If two features have the same output column.
+
+    Examples
+    --------
+    >>> ts = pf.add_features(ts, [
+    ...     pf.Feature('regime', pf.CROSSOVER, timeperiod_fast=50,
+    ...                timeperiod_slow=200),
+    ...     pf.Feature('sma200', pf.SMA, timeperiod=200),
+    ...     pf.Feature('period_high', pf.PERIOD_HIGH, timeperiod=7),
+    ...     pf.Feature('period_low', pf.PERIOD_LOW, timeperiod=7),
+    ...     pf.Feature(None, pf.calendar_frame, columns=['dotw'])
+    ... ])
+    """
+    columns = {}
+    with cache_indicators():
+        _seed_grids(ts, features)
+        for feature in features:
+            kwargs = feature.kwargs
+            price = kwargs.get('price')
+            data = ts
+            if isinstance(price, str) and price in columns:
+                # The earlier feature is the price data.
+                data = columns[price]
+                kwargs = dict(kwargs, price=None)
+            result = feature.func(data, **kwargs)
+            for name, s in _columns(feature, result).items():
+                if name in columns or name in ts.columns:
+                    raise ValueError(f'Duplicate feature column: {name}')
+                columns[name] = s
+
+    if not columns:
+        return ts.copy(deep=False)
+    return pd.concat([ts, pd.DataFrame(columns, index=ts.index)], axis=1)
@@ -3,15 +3,60 @@ Plotting functions.
 """
 
 import matplotlib.pyplot as plt
+import numpy as np
 from pandas.plotting import register_matplotlib_converters
 # Register matplotlib converters.
 register_matplotlib_converters()
 
+import pinkfish.downsampling as downsampling
 import pinkfish.pfstatistics as pfstatistics
 import pinkfish.trade as trade
 
 
-def plot_equity_curve(strategy, benchmark=None, yscale='linear', fname=None):
+MARKER_SIZE = 10
+"""
+int : The size of the trade markers in points.
+"""
+
+
+def _plot_width(axes, downsample):
+    """
+    Return the width in pixels to downsample to, or None.
+    """
+    if downsample is None:
+        return None
+    if downsample == 'auto':
+        return max(int(axes.bbox.width), 1)
+    return int(downsample)
+
+
+def _downsampled(s, width):
+    """
+    Return `s` downsampled to `width` pixels, or `s` if width is None.
+    """
+    if width is None:
+        return s
+    return downsampling.downsample(s, width)
+
+
+def _plot_markers(axes, s, marker, color, width, index):
+    """
+    Plot trade markers, merging markers that overlap if width is set.
+    """
+    if width is None or len(s) == 0:
+        axes.plot(s.index, s, marker, markersize=MARKER_SIZE, color=color)
+        return
+    marker_width = MARKER_SIZE * axes.figure.dpi / 72
+    buckets = max(int(width / marker_width), 1)
+    markers = downsampling.aggregate_markers(s, index[0], index[-1], buckets)
+    # The area of a merged marker grows with the log of its count.
+    sizes = MARKER_SIZE**2 * (1 + np.log10(markers['count']))
+    axes.scatter(markers.index, markers['value'], s=sizes, marker=marker,
+                 color=color, zorder=3)
+
+
+def plot_equity_curve(strategy, benchmark=None, yscale='linear', fname=None,
+                      downsample=None):
     """
     Plot Equity Curve: Strategy and (optionally) Benchmark.
 
@@ -27,22 +72,61 @@ def plot_equity_curve(strategy, benchmark=None, yscale='linear', fname=None):
     fname: str or path-like or file-like, optional
         Save the current figure to fname (default is None, which
         implies to not output the figure to a file).
+    downsample : int or 'auto', optional
+        Downsample the curves to this width in pixels, or to the width
+        of the plot if 'auto', with `pf.downsample()` (default is
+        None, which implies to plot every point).
 
     Returns
     -------
     None
     """
     fig = plt.figure()
+    draw_equity_curve(fig, strategy, benchmark, yscale, downsample)
+    if fname:
+        fig.savefig(fname, bbox_inches='tight')
+
+
+def draw_equity_curve(fig, strategy, benchmark=None, yscale='linear',
+                      downsample=None):
+    """
+    Draw Equity Curve on a figure: Strategy and (optionally) Benchmark.
+
+    Unlike `plot_equity_curve()`, this doesn't use the pyplot current
+    figure, so it is safe to call on a headless figure in a thread or
+    worker process.  See `pinkfish.render`.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to draw on.
+    strategy : pd.DataFrame
+        Daily balance for the strategy.
+    benchmark: pd.DataFrame, optional
+        Daily balance for the benchmark (default is None, which implies
+        that a benchmark is not being used).
+    yscale: str, {'linear', 'log', 'symlog', 'logit'}
+        The axis scale type to apply (default is 'linear')
+    downsample : int or 'auto', optional
+        Downsample the curves to this width in pixels, or to the width
+        of the plot if 'auto', with `pf.downsample()` (default is
+        None, which implies to plot every point).
+
+    Returns
+    -------
+    None
+    """
     axes = fig.add_subplot(111, ylabel='Portfolio value in $')
-    axes.plot(strategy['close'], label='strategy')
+    width = _plot_width(axes, downsample)
+    axes.plot(_downsampled(strategy['close'], width), label='strategy')
     axes.set_yscale(yscale)
     if benchmark is not None:
-        axes.plot(benchmark['close'], label='benchmark')
-    plt.legend(loc='best')
-    if fname:
-        plt.savefig(fname, bbox_inches='tight')
+        axes.plot(_downsampled(benchmark['close'], width), label='benchmark')
+    axes.legend(loc='best')
 
-def plot_equity_curves(strategies, labels=None, yscale='linear', fname=None):
+
+def plot_equity_curves(strategies, labels=None, yscale='linear', fname=None,
+                       downsample=None):
     """
     Plot one or more equity curves on the same plot.
 
@@ -58,6 +142,10 @@ def plot_equity_curves(strategies, labels=None, yscale='linear', fname=None):
     fname: str or path-like or file-like, optional
         Save the current figure to fname (default is None, which
         implies to not output the figure to a file).
+    downsample : int or 'auto', optional
+        Downsample the curves to this width in pixels, or to the width
+        of the plot if 'auto', with `pf.downsample()` (default is
+        None, which implies to plot every point).
 
     Returns
     -------
@@ -65,18 +153,20 @@ def plot_equity_curves(strategies, labels=None, yscale='linear', fname=None):
     """
     fig = plt.figure(figsize=(16,12))
     axes = fig.add_subplot(111, ylabel='Portfolio value in $')
+    width = _plot_width(axes, downsample)
     for i, strategy in enumerate(strategies):
         if labels is None:
             label = strategy.symbol
         else:
             label = labels[i]
-        axes.plot(strategy.dbal['close'], label=label)
+        axes.plot(_downsampled(strategy.dbal['close'], width), label=label)
         axes.set_yscale(yscale)
     plt.legend(loc='best')
     if fname:
         plt.savefig(fname, bbox_inches='tight')
 
-def plot_trades(strategy, benchmark=None, yscale='linear', fname=None):
+def plot_trades(strategy, benchmark=None, yscale='linear', fname=None,
+                downsample=None):
     """
     Plot Trades.
 
@@ -94,6 +184,46 @@ def plot_trades(strategy, benchmark=None, yscale='linear', fname=None):
     fname: str or path-like or file-like, optional
         Save the current figure to fname (default is None, which
         implies to not output the figure to a file).
+    downsample : int or 'auto', optional
+        Downsample the curve to this width in pixels, or to the width
+        of the plot if 'auto', with `pf.downsample()`, and merge trade
+        markers that overlap with `pf.aggregate_markers()` (default is
+        None, which implies to plot every point and every trade).
+
+    Returns
+    -------
+    None
+    """
+    fig = plt.figure()
+    draw_trades(fig, strategy, benchmark, yscale, downsample)
+    if fname:
+        fig.savefig(fname, bbox_inches='tight')
+
+
+def draw_trades(fig, strategy, benchmark=None, yscale='linear',
+                downsample=None):
+    """
+    Draw Trades on a figure.
+
+    Benchmark is the equity curve that the trades get drawn on.
+    If not provided, strategy equity curve is used.  Like
+    `draw_equity_curve()`, this doesn't use the pyplot current figure.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to draw on.
+    strategy : pd.DataFrame
+        Daily balance for the strategy.
+    benchmark: pd.DataFrame, optional
+        Daily balance for the benchmark.
+    yscale: str, {'linear', 'log', 'symlog', 'logit'}
+        The axis scale type to apply (default is 'linear')
+    downsample : int or 'auto', optional
+        Downsample the curve to this width in pixels, or to the width
+        of the plot if 'auto', with `pf.downsample()`, and merge trade
+        markers that overlap with `pf.aggregate_markers()` (default is
+        None, which implies to plot every point and every trade).
 
     Returns
     -------
@@ -105,27 +235,25 @@ def plot_trades(strategy, benchmark=None, yscale='linear', fname=None):
     else:
         label = 'benchmark'
 
-    fig = plt.figure()
     axes = fig.add_subplot(111, ylabel='Portfolio value in $')
-    axes.plot(benchmark.index, benchmark['close'], label=label)
+    width = _plot_width(axes, downsample)
+    axes.plot(_downsampled(benchmark['close'], width), label=label)
     axes.set_yscale(yscale)
 
     # Buy trades.
     s = strategy['state'] == trade.TradeState.OPEN
     s = s.reindex_like(benchmark)
     buy = benchmark[s]
-    axes.plot(buy.index, buy['close'], '^', markersize=10, color='k')
+    _plot_markers(axes, buy['close'], '^', 'k', width, benchmark.index)
     axes.set_yscale(yscale)
 
     # Sell trades.
     s = strategy['state'] == trade.TradeState.CLOSE
     s = s.reindex_like(benchmark)
     sell = benchmark[s]
-    axes.plot(sell.index, sell['close'], 'v', markersize=10, color='r')
+    _plot_markers(axes, sell['close'], 'v', 'r', width, benchmark.index)
     axes.set_yscale(yscale)
-    plt.legend(loc='best')
-    if fname:
-        plt.savefig(fname, bbox_inches='tight')
+    axes.legend(loc='best')
 
 
 default_metrics = (
@@ -176,6 +304,41 @@ def plot_bar_graph(stats, benchmark_stats=None, metrics=default_metrics,
         Save the current figure to fname (default is None, which
         implies to not output the figure to a file).
 
+    Returns
+    -------
+    pd.DataFrame
+        Summary metrics.
+    """
+    fig = plt.figure()
+    df = draw_bar_graph(fig, stats, benchmark_stats, metrics, extras)
+    if fname:
+        fig.savefig(fname, bbox_inches='tight')
+    return df
+
+
+def draw_bar_graph(fig, stats, benchmark_stats=None, metrics=default_metrics,
+                   extras=None):
+    """
+    Draw Bar Graph on a figure: Strategy vs Benchmark (optional).
+
+    Like `draw_equity_curve()`, this doesn't use the pyplot current
+    figure.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to draw on.
+    stats : pd.Series
+        Statistics from the strategy.
+    benchmark_stats : pd.Series, optional
+        Statistics from the benchmark (default is None, which implies
+        that a benchmark is not being used).
+    metrics: tuple, optional
+        The metrics to be plotted (default is `default_metrics`).
+    extras: tuple, optional
+        The additional metrics to be plotted (default is None, which
+        implies no extra metrics should be added).
+
     Returns
     -------
     pd.DataFrame
@@ -186,13 +349,10 @@ def plot_bar_graph(stats, benchmark_stats=None, metrics=default_metrics,
     metrics += extras
 
     df = pfstatistics.summary(stats, benchmark_stats, metrics)
-    fig = plt.figure()
     axes = fig.add_subplot(111, ylabel='Trading Metrix')
     df.plot(kind='bar', ax=axes, color=['g', 'r'])
     axes.set_xticklabels(df.index, rotation=60)
-    plt.legend(loc='best')
-    if fname:
-        plt.savefig(fname, bbox_inches='tight')
+    axes.legend(loc='best')
     return df
 
 
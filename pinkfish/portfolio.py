@@ -4,10 +4,8 @@ Portfolio backtesting.
 
 from functools import wraps
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn
 
 from pinkfish.pfcalendar import calendar
 from pinkfish.fetch import (
@@ -16,12 +14,34 @@ from pinkfish.fetch import (
     finalize_timeseries
 )
 import pinkfish.pfstatistics as pfstatistics
+import pinkfish.profiling as profiling
 import pinkfish.trade as trade
 import pinkfish.utility as utility
 
 
+def _batched_indicator(func, args, kwargs, input_columns, index):
+    """
+    Call `func` once with the list of all input columns.
+
+    Returns a dataframe with one column per input column.
+
+    Raises
+    ------
+    ValueError
+        If `func` doesn't return a dataframe with one column per input
+        column.
+    """
+    kwargs['input_column'] = input_columns
+    df = func(*args, **kwargs)
+    if (isinstance(df, pd.DataFrame) and list(df.columns) == input_columns
+        and df.index.equals(index)):
+        return df
+    raise ValueError('func must return a pd.DataFrame with one column '
+                     'per input column when batch is True')
+
+
 def technical_indicator(symbols, output_column_suffix,
-                        input_column_suffix='close'):
+                        input_column_suffix='close', batch=False):
     """
     Decorator for adding a technical indicator to portfolio symbols.
 
@@ -38,6 +58,11 @@ def technical_indicator(symbols, output_column_suffix,
     `input_column`.  'ts` is passed in, but input_column (args[1]) is
     assigned in the wrapper before `func` is called.
 
+    The pinkfish indicators accept a list of input columns and then
+    compute every symbol in one vectorized call.  If `func` only calls
+    them, pass batch=True, and `func` is called once with
+    `input_column` set to the list of all input columns.
+
     Parameters
     ----------
     symbols : list
@@ -46,6 +71,10 @@ def technical_indicator(symbols, output_column_suffix,
         Output column suffix to use for technical indicator.
     input_column_suffix : str, {'open', 'high', 'low', 'close'}
         Input column suffix to use for price (default is 'close').
+    batch : bool, optional
+        True to call `func` once with the list of input columns, which
+        must then return a dataframe with one column per input column,
+        False to call `func` once per symbol (default is False).
 
     Returns
     -------
@@ -60,22 +89,34 @@ def technical_indicator(symbols, output_column_suffix,
     >>> def _volatility(ts, input_column=None):
     ...     return pf.VOLATILITY(ts, price=input_column)
     >>> ts = _volatility(ts)
+
+    >>> # The same, computing every symbol in one call.
+    >>> @pf.technical_indicator(symbols, 'vola', 'close', batch=True)
+    >>> def _volatility(ts, input_column=None):
+    ...     return pf.VOLATILITY(ts, price=input_column)
     """
     def decorator(func):
+        @profiling.profiled('indicators')
         @wraps(func)
         def wrapper(*args, **kwargs):
             assert len(args) >= 1, f'func requires at least 1 args, detected {len(args)}'
             assert type(args[0]) == pd.DataFrame, f'args[0] not a pd.DataFrame'
             ts = args[0]
-            indicator_column = {}
-            for symbol in symbols:
-                input_column = symbol + '_' + input_column_suffix
-                output_column = symbol + '_' + output_column_suffix
-                kwargs['input_column'] = input_column
-                indicator_column[output_column] = func(*args, **kwargs)
-            
+            input_columns = [symbol + '_' + input_column_suffix for symbol in symbols]
+            output_columns = [symbol + '_' + output_column_suffix for symbol in symbols]
+
+            if batch:
+                df = _batched_indicator(func, args, kwargs, input_columns, ts.index)
+                df = df.set_axis(output_columns, axis=1)
+            else:
+                indicator_column = {}
+                for input_column, output_column in zip(input_columns, output_columns):
+                    kwargs['input_column'] = input_column
+                    indicator_column[output_column] = func(*args, **kwargs)
+                df = pd.DataFrame(indicator_column)
+
             # Join all the symbol columns to the original DataFrame using pd.concat
-            ts = pd.concat([ts, pd.DataFrame(indicator_column)], axis=1)
+            ts = pd.concat([ts, df], axis=1)
             return ts
         return wrapper
     return decorator
@@ -165,6 +206,7 @@ class Portfolio:
             ts[column] = symbol_ts[field]
         return ts
 
+    @profiling.profiled('fetch')
     def fetch_timeseries(self, symbols, start, end,
                          fields=['open', 'high', 'low', 'close'],
                          dir_name='symbol-cache',
@@ -245,6 +287,7 @@ class Portfolio:
         self.symbols = symbols
         return ts
 
+    @profiling.profiled('indicators')
     def add_technical_indicator(self, ts, ta_func, ta_param, output_column_suffix,
                                 input_column_suffix='close'):
         """
@@ -305,6 +348,7 @@ class Portfolio:
         ts = pd.concat([ts, pd.DataFrame(indicator_column)], axis=1)
         return ts
 
+    @profiling.profiled('indicators')
     def calendar(self, ts, columns=None):
         """
         Add calendar columns to a timeseries.
@@ -324,6 +368,7 @@ class Portfolio:
         """
         return calendar(ts, columns)
 
+    @profiling.profiled('fetch')
     def finalize_timeseries(self, ts, start, dropna=True):
         """
         Finalize timeseries.
@@ -371,6 +416,10 @@ class Portfolio:
         price : float
             The current column value.
         """
+        counters = profiling._counters
+        if counters is not None:
+            counters['price_lookups'] += 1
+
         symbol += '_' + field
         try:
             price = getattr(row, symbol)
@@ -424,6 +473,10 @@ class Portfolio:
         """
         Return total share value in portfolio.
         """
+        counters = profiling._counters
+        if counters is not None:
+            counters['portfolio_values'] += 1
+
         value = 0
         for symbol, tlog in trade.TradeLog.instance.items():
             price = self.get_price(row, symbol, field)
@@ -592,8 +645,10 @@ class Portfolio:
         ----------
         row : pd.Series
             A row of data from the timeseries of the portfolio.
-        weights : dict of floats
-            Dict of key value pair of symbol:weight, where 0 <= weight <=1.
+        weights : dict of floats or pd.Series
+            Dict of key value pair of symbol:weight, where 0 <= weight <=1,
+            or a row of weights from `pinkfish.risk`, e.g.
+            `inverse_volatility_weights()`.
         field : str, {'open', 'high', 'low', 'close'}
             The price field to use.
         directions : dict of pf.Direction, optional
@@ -719,6 +774,10 @@ class Portfolio:
 
         # calculate daily balance values: date, high, low, close,
         # shares, cash
+        counters = profiling._counters
+        if counters is not None:
+            counters['bars'] += 1
+
         date = row.Index.to_pydatetime()
         field = 'close'
         equity = self._equity(row, field)
@@ -730,10 +789,14 @@ class Portfolio:
              trade.TradeLog.cash, leverage)
         self._l.append(t)
 
+    @profiling.profiled('get_logs')
     def get_logs(self):
         """
         Return raw tradelog, tradelog, and daily balance log.
 
+        The tradelog includes the 'bars' column, the number of bars
+        in each trade.
+
         Parameters
         ----------
         None
@@ -759,6 +822,12 @@ class Portfolio:
         tlog = pd.concat(tlogs_non_empty).sort_values(['entry_date', 'exit_date'])
 
         tlog['cumul_total'] = tlog['pl_cash'].cumsum()
+        tlog['bars'] = trade._bars_in_trade(self._ts.index, tlog)
+
+        # Concatenating categoricals with different categories gives
+        # object columns, so compact the combined logs again.
+        rlog = trade._compact_rlog(rlog)
+        tlog = trade._compact_tlog(tlog)
 
         dbal = trade.DailyBal()
         dbal._l = self._l
@@ -783,6 +852,7 @@ class Portfolio:
             The dataframe contains performance for each symbol in the
             portfolio.
         """
+        import matplotlib.pyplot as plt
 
         def _weight(row, weights):
             return weights[row.name]
@@ -849,6 +919,8 @@ class Portfolio:
             The dataframe contains the correlation data for each symbol
             in the portfolio.
         """
+        import matplotlib.pyplot as plt
+        import seaborn
 
         # Filter coloumn names for ''_close''; remove '_close' suffix.
         df = ts.filter(regex='_close')
@@ -0,0 +1,557 @@
+"""
+Profiling of strategy runs.
+
+Within `profile()`, pinkfish records the wall time, CPU time, number of
+calls, and optionally the peak memory of each instrumented function,
+and sums them per phase of a run: 'fetch', 'indicators', 'algo',
+'get_logs', and 'stats'.  The functions of each phase are instrumented
+with the `profiled()` decorator, which costs one global lookup per
+call when profiling is disabled.  The hot functions that are called
+on every bar, e.g. `DailyBal.append()`, are only wrapped while
+profiling is enabled, so they cost nothing otherwise.
+
+Within `count_hot_loop()`, `Portfolio` and `TradeLog` count the price
+lookups, share value computations, and trade log mutations of the bar
+loop, which exposes O(N^2) patterns in portfolio strategies.
+`sample_stacks()` samples the call stack of a run and writes it in the
+collapsed stack format used by flamegraph tools.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+import importlib
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+PHASES = ['fetch', 'indicators', 'algo', 'get_logs', 'stats']
+"""
+list of str : The phases of a strategy run.
+"""
+
+HOT_FUNCTIONS = [
+    ('pinkfish.portfolio', 'Portfolio', 'adjust_percents'),
+    ('pinkfish.trade', 'TradeLog', '_enter_trade'),
+    ('pinkfish.trade', 'TradeLog', '_exit_trade'),
+    ('pinkfish.trade', 'DailyBal', 'append')
+]
+"""
+list of tuple : (module, class, method) of the functions called in the
+bar loop, which are instrumented in the 'algo' phase only while
+profiling is enabled.
+"""
+
+_profiler = None
+"""
+Profiler : The active profiler, or None when profiling is disabled.
+See `profile()`.
+"""
+
+_counters = None
+"""
+collections.Counter : The active hot loop counters, or None when
+counting is disabled.  See `count_hot_loop()`.
+"""
+
+
+########################################################################
+# PROFILER
+
+class _Frame:
+    """
+    An instrumented call in progress.
+    """
+    __slots__ = ('start_memory', 'peak_memory')
+
+    def __init__(self, memory):
+        self.start_memory = memory
+        self.peak_memory = memory
+
+
+class Profiler:
+    """
+    Timings of instrumented functions and phases.
+    """
+
+    def __init__(self, memory=False):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        memory : bool, optional
+            True to record the peak memory allocated by each call with
+            `tracemalloc`, which slows down the run (default is False).
+
+        Attributes
+        ----------
+        memory : bool
+            True if the peak memory is recorded.
+        functions : dict
+            The calls, wall time, CPU time, and peak memory of each
+            function, keyed by (phase, name).
+        phases : dict
+            The same, keyed by phase, counting only calls that aren't
+            made from within another instrumented function.
+        wall : float
+            The wall time of the `profile()` context.
+        """
+        self.memory = memory
+        self.functions = {}
+        self.phases = {}
+        self.wall = 0
+        self._stack = []
+
+    def _enter(self):
+        """
+        Start an instrumented call.
+        """
+        memory = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                frame = self._stack[-1]
+                frame.peak_memory = max(frame.peak_memory, peak)
+            tracemalloc.reset_peak()
+            memory = current
+        self._stack.append(_Frame(memory))
+        return time.perf_counter(), time.process_time()
+
+    def _exit(self, phase, name, wall_start, cpu_start):
+        """
+        Finish an instrumented call and record it.
+        """
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        frame = self._stack.pop()
+        peak = 0
+        if self.memory:
+            frame.peak_memory = max(frame.peak_memory, tracemalloc.get_traced_memory()[1])
+            peak = frame.peak_memory - frame.start_memory
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak_memory = max(parent.peak_memory, frame.peak_memory)
+
+        _add(self.functions, (phase, name), wall, cpu, peak)
+        if not self._stack:
+            _add(self.phases, phase, wall, cpu, peak)
+
+    def report(self):
+        """
+        Return the timings of each instrumented function.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns 'phase', 'function', 'calls', 'wall', 'cpu', and
+            'peak_memory', sorted by wall time.  Times are in seconds,
+            memory in bytes.
+        """
+        rows = [{'phase': phase, 'function': name, **values}
+                for (phase, name), values in self.functions.items()]
+        df = pd.DataFrame(rows, columns=['phase', 'function', 'calls', 'wall',
+                                         'cpu', 'peak_memory'])
+        return df.sort_values('wall', ascending=False, ignore_index=True)
+
+    def phase_report(self):
+        """
+        Return the timings of each phase.
+
+        Calls from within another instrumented function are counted
+        only in the phase of the outermost function.  The 'other' row
+        is the time of the `profile()` context not spent in any phase,
+        e.g. in an uninstrumented bar loop.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns 'calls', 'wall', 'cpu', and 'peak_memory', indexed
+            by phase.
+        """
+        phases = [p for p in PHASES if p in self.phases]
+        phases += [p for p in self.phases if p not in PHASES]
+        df = pd.DataFrame([self.phases[p] for p in phases], index=phases,
+                          columns=['calls', 'wall', 'cpu', 'peak_memory'])
+        other = max(self.wall - df['wall'].sum(), 0)
+        df.loc['other'] = [0, other, float('nan'), float('nan')]
+        df['calls'] = df['calls'].astype(int)
+        df.index.name = 'phase'
+        return df
+
+    def to_dict(self):
+        """
+        Return the phase and function timings as a dict.
+        """
+        return {
+            'wall': self.wall,
+            'phases': self.phase_report().reset_index().to_dict(orient='records'),
+            'functions': self.report().to_dict(orient='records')
+        }
+
+    def to_json(self, path=None):
+        """
+        Return the phase and function timings as JSON, optionally
+        writing them to `path`.
+        """
+        s = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(s)
+        return s
+
+
+def _add(d, key, wall, cpu, peak):
+    values = d.get(key)
+    if values is None:
+        d[key] = {'calls': 1, 'wall': wall, 'cpu': cpu, 'peak_memory': peak}
+    else:
+        values['calls'] += 1
+        values['wall'] += wall
+        values['cpu'] += cpu
+        values['peak_memory'] = max(values['peak_memory'], peak)
+
+
+########################################################################
+# INSTRUMENTATION
+
+def profiled(phase, name=None):
+    """
+    Decorator that records the calls of a function in a phase.
+
+    When profiling is disabled, the only cost is checking whether
+    it is enabled.
+
+    Parameters
+    ----------
+    phase : str
+        The phase, e.g. 'indicators'.
+    name : str, optional
+        The name in the report (default is None, which implies the
+        qualified name of the function).
+
+    Returns
+    -------
+    function
+        The decorator.
+
+    Examples
+    --------
+    >>> @pf.profiled('indicators')
+    ... def ROC(ts, timeperiod=10, price='close'):
+    ...     return ts[price].pct_change(timeperiod)
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            wall, cpu = profiler._enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler._exit(phase, label, wall, cpu)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def phase(name):
+    """
+    Record a block of code as a phase, e.g. the bar loop.
+
+    Does nothing when profiling is disabled.
+
+    Parameters
+    ----------
+    name : str
+        The phase, e.g. 'algo'.
+
+    Examples
+    --------
+    >>> with pf.phase('algo'):
+    ...     s._algo()
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    wall, cpu = profiler._enter()
+    try:
+        yield
+    finally:
+        profiler._exit(name, name, wall, cpu)
+
+
+def _patch_hot_functions():
+    """
+    Wrap the hot functions, and return a function that restores them.
+    """
+    originals = []
+    for module_name, class_name, method_name in HOT_FUNCTIONS:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        method = cls.__dict__[method_name]
+        originals.append((cls, method_name, method))
+        setattr(cls, method_name,
+                profiled('algo', f'{class_name}.{method_name}')(method))
+
+    def restore():
+        for cls, method_name, method in originals:
+            setattr(cls, method_name, method)
+    return restore
+
+
+@contextmanager
+def profile(memory=False):
+    """
+    Profile the pinkfish functions called within this context.
+
+    Nested contexts share the outermost profiler.  Profiling is per
+    process, so the workers of a parallel `sweep()` aren't profiled.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        True to also record the peak memory allocated by each call,
+        which slows down the run (default is False).
+
+    Yields
+    ------
+    Profiler
+        The profiler.  Its reports are complete when the context exits.
+
+    Examples
+    --------
+    >>> with pf.profile() as profiler:
+    ...     s = strategy.Strategy(symbol, capital, start, end, options)
+    ...     s.run()
+    >>> profiler.phase_report()
+    >>> profiler.report().head(10)
+    """
+    global _profiler
+    if _profiler is not None:
+        yield _profiler
+        return
+
+    profiler = Profiler(memory)
+    start_tracing = memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    restore = _patch_hot_functions()
+    _profiler = profiler
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        profiler.wall = time.perf_counter() - start
+        _profiler = None
+        restore()
+        if start_tracing:
+            tracemalloc.stop()
+
+
+########################################################################
+# HOT LOOP COUNTERS
+
+COUNTERS = {
+    'bars': 'Bars recorded in the daily balance',
+    'price_lookups': 'Portfolio.get_price() calls',
+    'portfolio_values': 'Portfolio share value computations, over all symbols',
+    'share_values': 'TradeLog.share_value() calls',
+    'trade_log_mutations': 'Trades entered or exited'
+}
+"""
+dict : The hot loop counters and their descriptions.
+"""
+
+
+def count(name):
+    """
+    Increment the hot loop counter `name`, if counting is enabled.
+
+    This is for counters in user code; pinkfish checks `_counters`
+    inline to avoid the function call.
+    """
+    if _counters is not None:
+        _counters[name] += 1
+
+
+def counter_report(counters):
+    """
+    Return the hot loop counters as totals and per bar.
+
+    Parameters
+    ----------
+    counters : collections.Counter
+        The counters yielded by `count_hot_loop()`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns 'count' and 'per_bar', indexed by counter.
+    """
+    names = list(COUNTERS) + sorted(set(counters) - set(COUNTERS))
+    df = pd.DataFrame({'count': [counters[name] for name in names]}, index=names)
+    df['per_bar'] = df['count'] / counters['bars'] if counters['bars'] else float('nan')
+    df.index.name = 'counter'
+    return df
+
+
+@contextmanager
+def count_hot_loop():
+    """
+    Count the operations of the bar loop.
+
+    Within this context, `Portfolio` and `TradeLog` count the events
+    in `COUNTERS`.  Divided by the number of bars, these show the cost
+    per bar; e.g. 'share_values' per bar that grows with the square of
+    the number of symbols is an O(N^2) pattern.  Nested contexts share
+    the outermost counters.
+
+    Yields
+    ------
+    collections.Counter
+        The counters.  Use `counter_report()` to summarize them.
+
+    Examples
+    --------
+    >>> with pf.count_hot_loop() as counters:
+    ...     s.run()
+    >>> pf.counter_report(counters)
+    """
+    global _counters
+    prev_counters = _counters
+    if prev_counters is None:
+        _counters = Counter()
+    try:
+        yield _counters
+    finally:
+        _counters = prev_counters
+
+
+########################################################################
+# STACK SAMPLING
+
+def _frame_label(frame):
+    """
+    Return 'module:function' for a frame, without spaces or ';'.
+    """
+    module = frame.f_globals.get('__name__', '?')
+    label = f'{module}:{frame.f_code.co_qualname}'
+    return label.replace(' ', '_').replace(';', ':')
+
+
+class StackSampler:
+    """
+    Sample the call stack of a thread at a fixed interval.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        interval : float, optional
+            The seconds between samples (default is 0.005).
+        thread_id : int, optional
+            The thread to sample (default is None, which implies the
+            thread that calls `start()`).
+
+        Attributes
+        ----------
+        counts : collections.Counter
+            The number of samples of each collapsed stack.
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.counts[';'.join(reversed(labels))] += 1
+
+    def start(self):
+        """
+        Start sampling in a background thread.
+        """
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self):
+        """
+        Return the samples in the collapsed stack format.
+
+        Each line is the stack from the outermost to the innermost
+        frame, separated by ';', a space, and the number of samples,
+        e.g. 'strategy:Strategy.run;strategy:Strategy._algo 12'.
+        """
+        return ''.join(f'{stack} {n}\n' for stack, n in self.counts.most_common())
+
+
+@contextmanager
+def sample_stacks(path=None, interval=0.005):
+    """
+    Sample the call stack of the code run within this context.
+
+    The samples can be turned into a flamegraph offline, e.g. with
+    `flamegraph.pl out.folded > out.svg` or by loading the file in
+    speedscope.  Sampling runs in a background thread, so the stack
+    of the sampled thread is seen only when it releases the GIL,
+    which Python does at least every `sys.getswitchinterval()`.
+
+    Parameters
+    ----------
+    path : str, optional
+        The file to write the collapsed stacks to on exit
+        (default is None, which implies that no file is written).
+    interval : float, optional
+        The seconds between samples (default is 0.005).
+
+    Yields
+    ------
+    StackSampler
+        The sampler.
+
+    Examples
+    --------
+    >>> with pf.sample_stacks('double-7s.folded'):
+    ...     s.run()
+    """
+    sampler = StackSampler(interval)
+    sampler.start()
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(sampler.collapsed())
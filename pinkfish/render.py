@@ -0,0 +1,220 @@
+"""
+Headless chart rendering.
+
+The `plot_*()` functions draw on the pyplot current figure, which is
+global state: they aren't safe in threads, and every call leaves an
+open figure behind.  This module draws the same charts on figures
+created with the object-oriented API and the Agg canvas.  The figures
+are never registered with pyplot, so they don't need a display, don't
+become the current figure, and are released as soon as they are saved.
+
+`render_reports()` renders a batch of reports, e.g. one per strategy,
+to PNG or SVG files in a pool of worker processes, so a nightly run
+over hundreds of strategies scales with the number of cores.
+"""
+
+import concurrent.futures
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import pinkfish.analysis as analysis
+import pinkfish.plot as plot
+
+
+CHARTS = {
+    'equity_curve': plot.draw_equity_curve,
+    'trades': plot.draw_trades,
+    'bar_graph': plot.draw_bar_graph,
+    'prettier_graphs': analysis.draw_prettier_graphs
+}
+"""
+dict : The draw functions of the built-in charts, by name.
+"""
+
+
+class Chart:
+    """
+    A chart spec: an output file name and the function that draws it.
+    """
+
+    def __init__(self, name, func, figsize=None, dpi=None, **kwargs):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        name : str
+            The name of the output file, without the extension.
+        func : function or str
+            The draw function, called as `func(fig, **kwargs)`, e.g.
+            `pf.draw_equity_curve`, or the name of a chart in `CHARTS`.
+            To render in a process pool, it must be defined at the
+            top level of a module, so that it can be pickled.
+        figsize : tuple of float, optional
+            The figure (width, height) in inches (default is None,
+            which implies the matplotlib default).
+        dpi : float, optional
+            The resolution in dots per inch (default is None, which
+            implies the matplotlib default).
+        **kwargs
+            The arguments of `func`.
+
+        Attributes
+        ----------
+        name : str
+            The name of the output file.
+        func : function
+            The draw function.
+        figsize : tuple of float
+            The figure size.
+        dpi : float
+            The resolution.
+        kwargs : dict
+            The arguments of `func`.
+
+        Raises
+        ------
+        KeyError
+            If `func` is a str that isn't in `CHARTS`.
+
+        Examples
+        --------
+        >>> pf.Chart('equity', 'equity_curve', strategy=dbal,
+        ...          benchmark=benchmark.dbal)
+        """
+        self.name = name
+        self.func = CHARTS[func] if isinstance(func, str) else func
+        self.figsize = figsize
+        self.dpi = dpi
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        func = getattr(self.func, '__name__', self.func)
+        return f'Chart({self.name!r}, {func})'
+
+
+def headless_figure(figsize=None, dpi=None):
+    """
+    Return a new figure on an Agg canvas that isn't managed by pyplot.
+
+    Parameters
+    ----------
+    figsize : tuple of float, optional
+        The figure (width, height) in inches (default is None, which
+        implies the matplotlib default).
+    dpi : float, optional
+        The resolution in dots per inch (default is None, which
+        implies the matplotlib default).
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        The figure.
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_chart(chart, fname):
+    """
+    Draw a chart on a headless figure and save it.
+
+    The figure is cleared after saving, even if drawing fails, so
+    rendering in a loop doesn't accumulate figures.
+
+    Parameters
+    ----------
+    chart : Chart
+        The chart to render.
+    fname : str or path-like or file-like
+        The output file.  The format is taken from the extension,
+        e.g. '.png' or '.svg'.
+
+    Returns
+    -------
+    str or path-like or file-like
+        `fname`.
+    """
+    fig = headless_figure(chart.figsize, chart.dpi)
+    try:
+        chart.func(fig, **chart.kwargs)
+        fig.savefig(fname, bbox_inches='tight')
+    finally:
+        fig.clear()
+    return fname
+
+
+def render_report(name, charts, dir_name, fmt='png'):
+    """
+    Render the charts of a report to '{dir_name}/{name}/{chart}.{fmt}'.
+
+    Parameters
+    ----------
+    name : str
+        The name of the report, e.g. the strategy.
+    charts : list of Chart
+        The charts of the report.
+    dir_name : str or path-like
+        The output directory.  It is created if it doesn't exist.
+    fmt : str, optional {'png', 'svg', 'pdf'}
+        The output format (default is 'png').
+
+    Returns
+    -------
+    list of str
+        The paths of the rendered files.
+    """
+    report_dir = Path(dir_name) / name
+    report_dir.mkdir(parents=True, exist_ok=True)
+    return [str(render_chart(chart, report_dir / f'{chart.name}.{fmt}'))
+            for chart in charts]
+
+
+def render_reports(reports, dir_name, fmt='png', max_workers=None):
+    """
+    Render a batch of reports in a pool of worker processes.
+
+    Each report is rendered by one worker, so the charts and their
+    data are pickled once per report.  An exception in a report is
+    raised after all the other reports have been submitted.
+
+    Parameters
+    ----------
+    reports : dict of str: list of Chart
+        The charts of each report, keyed by report name.
+    dir_name : str or path-like
+        The output directory.  Each report is written to a
+        subdirectory named after it.
+    fmt : str, optional {'png', 'svg', 'pdf'}
+        The output format (default is 'png').
+    max_workers : int, optional
+        The number of worker processes (default is None, which
+        implies the number of CPUs).  With 1, the reports are
+        rendered in this process.
+
+    Returns
+    -------
+    dict of str: list of str
+        The paths of the rendered files of each report.
+
+    Examples
+    --------
+    >>> reports = {
+    ...     name: [pf.Chart('equity', 'equity_curve', strategy=s.dbal,
+    ...                     benchmark=benchmark.dbal),
+    ...            pf.Chart('trades', 'trades', strategy=s.dbal)]
+    ...     for name, s in strategies.items()
+    ... }
+    >>> pf.render_reports(reports, 'reports', fmt='svg')
+    """
+    if max_workers == 1:
+        return {name: render_report(name, charts, dir_name, fmt)
+                for name, charts in reports.items()}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = {name: executor.submit(render_report, name, charts, dir_name, fmt)
+                   for name, charts in reports.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,461 @@
+"""
+Save and load strategy runs.
+
+A run is the result of a strategy: the timeseries, the trade logs, the
+daily balance, the statistics, and the options that produced them.
+`save_run()` writes it in a columnar format that doesn't depend on the
+pandas version: one NumPy .npy array per column, and a JSON manifest
+with the options, the statistics, and how to rebuild each dataframe.
+Columns of strings are dictionary encoded, i.e. stored as integer
+codes and a list of the distinct strings.
+
+A run is written to a directory, or to a single .zip file of the same
+members.  Arrays in a directory can be memory mapped when loading, so
+opening a run is nearly free until its data is used, and only the
+frames that are needed have to be read, e.g. just the daily balance
+of every run for a dashboard.
+
+Layout of a run directory::
+
+    manifest.json
+    ts/index.npy, ts/0.npy, ts/1.npy, ...
+    tlog/...
+    rlog/...
+    dbal/...
+"""
+
+import datetime
+import importlib.metadata
+import json
+import os
+from pathlib import Path
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+
+FORMAT = 'pinkfish.run'
+FORMAT_VERSION = 1
+
+FRAMES = ('ts', 'tlog', 'rlog', 'dbal')
+"""
+tuple of str : The dataframe attributes of a run.
+"""
+
+MANIFEST = 'manifest.json'
+
+
+class Run:
+    """
+    A strategy run loaded with `load_run()`.
+
+    It has the attributes of a strategy that `optimizer_summary()`,
+    `plot_equity_curves()`, etc. use, so a loaded run can be used in
+    place of the strategy object.
+    """
+
+    def __init__(self, manifest, frames):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        manifest : dict
+            The manifest of the run.
+        frames : dict of str: pd.DataFrame
+            The loaded dataframes, keyed by attribute name.
+
+        Attributes
+        ----------
+        strategy : str
+            The class of the strategy, e.g. 'strategy.Strategy'.
+        symbols : list of str
+            The symbols of the strategy.
+        symbol : str
+            The first symbol, or None.
+        capital : float
+            The starting capital.
+        start : datetime.datetime
+            The start date.
+        end : datetime.datetime
+            The end date.
+        options : dict
+            The options of the strategy.
+        stats : pd.Series
+            The statistics of the run.
+        ts, tlog, rlog, dbal : pd.DataFrame
+            The dataframes, or None if they weren't saved or loaded.
+        manifest : dict
+            The manifest of the run.
+        """
+        self.manifest = manifest
+        self.strategy = manifest['strategy']
+        self.symbols = manifest['symbols']
+        self.symbol = self.symbols[0] if self.symbols else None
+        self.capital = manifest['capital']
+        self.start = manifest['start']
+        self.end = manifest['end']
+        self.options = manifest['options']
+        self.stats = None
+        if manifest['stats'] is not None:
+            self.stats = pd.Series(manifest['stats'], dtype=object)
+        for name in FRAMES:
+            setattr(self, name, frames.get(name))
+
+    def __repr__(self):
+        return f'Run({self.strategy!r}, {self.symbols!r}, {self.start!s:.10}, {self.end!s:.10})'
+
+
+########################################################################
+# JSON
+
+def _to_json(value):
+    """
+    Return `value` converted to types that JSON can represent.  Dates
+    are tagged, so that `_from_json()` restores them.  Other objects
+    are stored as their repr.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, np.datetime64):
+        return {'__datetime__': str(pd.Timestamp(value).isoformat())}
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return {'__repr__': repr(value)}
+
+
+def _from_json(obj):
+    """
+    Restore the tagged values of a decoded JSON object.
+    """
+    if '__datetime__' in obj:
+        return datetime.datetime.fromisoformat(obj['__datetime__'])
+    if '__repr__' in obj:
+        return obj['__repr__']
+    return obj
+
+
+########################################################################
+# COLUMNS
+
+def _encode(values):
+    """
+    Return the spec and the array that store a column or index.
+
+    Raises
+    ------
+    TypeError
+        If the dtype of the values isn't supported.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = [_to_json(c) for c in dtype.categories]
+        spec = {'kind': 'category', 'categories': categories, 'ordered': dtype.ordered}
+        return spec, np.asarray(pd.Categorical(values).codes)
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        utc = pd.DatetimeIndex(values).tz_convert('UTC').tz_localize(None)
+        return {'kind': 'datetime_tz', 'tz': str(dtype.tz)}, utc.to_numpy()
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return {'kind': 'numpy'}, np.asarray(values)
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        codes, uniques = pd.factorize(values)
+        if not all(isinstance(u, str) for u in uniques):
+            raise TypeError('unsupported object column with non-str values')
+        spec = {'kind': 'strings', 'dtype': str(dtype), 'values': list(uniques)}
+        return spec, codes.astype(np.int32)
+    raise TypeError(f'unsupported dtype {dtype}')
+
+
+def _decode(spec, array):
+    """
+    Return the column or index values stored by `_encode()`.
+    """
+    kind = spec['kind']
+    if kind == 'numpy':
+        return array
+    if kind == 'category':
+        categories = [_from_json(c) if isinstance(c, dict) else c
+                      for c in spec['categories']]
+        return pd.Categorical.from_codes(array, categories=categories,
+                                         ordered=spec['ordered'])
+    if kind == 'datetime_tz':
+        return pd.DatetimeIndex(array).tz_localize('UTC').tz_convert(spec['tz'])
+    if kind == 'strings':
+        values = np.array(spec['values'] + [None], dtype=object)
+        return pd.array(values[array], dtype=spec['dtype'])
+    raise ValueError(f'unknown column kind "{kind}"')
+
+
+def _frame_members(name, df):
+    """
+    Return the spec of a dataframe and a dict of member name: array.
+
+    Raises
+    ------
+    TypeError
+        If a column name or dtype isn't supported.
+    """
+    members = {}
+    if isinstance(df.index, pd.RangeIndex):
+        index = {'kind': 'range', 'start': df.index.start,
+                 'stop': df.index.stop, 'step': df.index.step}
+    elif isinstance(df.index, pd.MultiIndex):
+        raise TypeError(f'{name}: a MultiIndex is not supported')
+    else:
+        index, members[f'{name}/index.npy'] = _encode(df.index)
+        index['file'] = f'{name}/index.npy'
+    index['name'] = df.index.name
+
+    columns = []
+    for i, column in enumerate(df.columns):
+        if not isinstance(column, (str, int)):
+            raise TypeError(f'{name}: column name {column!r} is not a str or int')
+        spec, members[f'{name}/{i}.npy'] = _encode(df.iloc[:, i])
+        spec.update(name=column, file=f'{name}/{i}.npy')
+        columns.append(spec)
+    return {'rows': len(df), 'index': index, 'columns': columns}, members
+
+
+def _build_frame(spec, read):
+    """
+    Return the dataframe described by `spec`, reading arrays with
+    `read(member)`.
+    """
+    index = spec['index']
+    if index['kind'] == 'range':
+        idx = pd.RangeIndex(index['start'], index['stop'], index['step'],
+                            name=index['name'])
+    else:
+        idx = pd.Index(_decode(index, read(index['file'])), name=index['name'])
+    data = {column['name']: _decode(column, read(column['file']))
+            for column in spec['columns']}
+    return pd.DataFrame(data, index=idx, columns=[c['name'] for c in spec['columns']],
+                        copy=False)
+
+
+########################################################################
+# SAVE AND LOAD
+
+def _version(package):
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _manifest(run):
+    """
+    Return the manifest of a strategy, without the frames.
+    """
+    symbols = getattr(run, 'symbols', None)
+    if symbols is None:
+        symbol = getattr(run, 'symbol', None)
+        symbols = [] if symbol is None else [symbol]
+    stats = getattr(run, 'stats', None)
+    if stats is not None:
+        stats = {str(k): _to_json(v) for k, v in stats.items()}
+    strategy = getattr(run, 'strategy', None)
+    if not isinstance(strategy, str):
+        strategy = f'{type(run).__module__}.{type(run).__qualname__}'
+    return {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'created': _to_json(datetime.datetime.now().replace(microsecond=0)),
+        'pinkfish': _version('pinkfish'),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'strategy': strategy,
+        'symbols': [str(s) for s in symbols],
+        'capital': _to_json(getattr(run, 'capital', None)),
+        'start': _to_json(getattr(run, 'start', None)),
+        'end': _to_json(getattr(run, 'end', None)),
+        'options': _to_json(getattr(run, 'options', None) or {}),
+        'stats': stats,
+        'frames': {}
+    }
+
+
+def save_run(run, path, frames=FRAMES, overwrite=False, compress=False):
+    """
+    Save a strategy run.
+
+    Parameters
+    ----------
+    run : object
+        The strategy, or any object with some of the attributes
+        `ts`, `tlog`, `rlog`, `dbal`, `stats`, `options`, `symbol`
+        or `symbols`, `capital`, `start`, and `end`, e.g. a `Run`.
+    path : str or Path
+        The run directory, or a file name ending in '.zip' to save to
+        a single file.  The run is written to a temporary name and
+        then renamed, so a partially written run is never visible.
+    frames : tuple of str, optional
+        The dataframe attributes to save (default is `FRAMES`).
+        Attributes that are None are skipped.
+    overwrite : bool, optional
+        True to replace an existing run (default is False).
+    compress : bool, optional
+        True to deflate the members of a .zip file (default is False).
+        Compressed runs can't be memory mapped.
+
+    Returns
+    -------
+    Path
+        The path of the run.
+
+    Raises
+    ------
+    FileExistsError
+        If `path` exists and `overwrite` is False.
+    TypeError
+        If a dataframe has a column type that can't be stored, e.g.
+        an object column of non-str values.
+
+    Examples
+    --------
+    >>> s = strategy.Strategy(symbol, capital, start, end, options)
+    >>> s.run()
+    >>> pf.save_run(s, 'runs/double-7s-SPY')
+    """
+    path = Path(path)
+    if path.exists() and not overwrite:
+        raise FileExistsError(f'{path} already exists')
+
+    manifest = _manifest(run)
+    members = {}
+    for name in frames:
+        df = getattr(run, name, None)
+        if df is None:
+            continue
+        manifest['frames'][name], frame_members = _frame_members(name, df)
+        members.update(frame_members)
+    manifest_bytes = json.dumps(manifest, indent=1).encode()
+
+    tmp_path = Path(f'{path}.{os.getpid()}.tmp')
+    if path.suffix == '.zip':
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(tmp_path, 'w', compression) as z:
+            z.writestr(MANIFEST, manifest_bytes)
+            for member, array in members.items():
+                with z.open(member, 'w', force_zip64=True) as f:
+                    np.lib.format.write_array(f, array, allow_pickle=False)
+        os.replace(tmp_path, path)
+        return path
+
+    tmp_path.mkdir(parents=True)
+    for name in manifest['frames']:
+        (tmp_path / name).mkdir()
+    for member, array in members.items():
+        np.save(tmp_path / member, array, allow_pickle=False)
+    (tmp_path / MANIFEST).write_bytes(manifest_bytes)
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+    os.replace(tmp_path, path)
+    return path
+
+
+def _check_manifest(manifest, path):
+    if manifest.get('format') != FORMAT:
+        raise ValueError(f'{path} is not a pinkfish run')
+    if manifest['version'] > FORMAT_VERSION:
+        raise ValueError(f'{path} has format version {manifest["version"]}, '
+                         f'this pinkfish reads up to {FORMAT_VERSION}')
+    return manifest
+
+
+def read_manifest(path):
+    """
+    Read the manifest of a run, without loading any data.
+
+    Parameters
+    ----------
+    path : str or Path
+        The run directory or .zip file.
+
+    Returns
+    -------
+    dict
+        The manifest, with keys 'strategy', 'symbols', 'capital',
+        'start', 'end', 'options', 'stats', and 'frames', among others.
+
+    Raises
+    ------
+    ValueError
+        If `path` isn't a run, or has a newer format version.
+    """
+    path = Path(path)
+    if path.is_dir():
+        text = (path / MANIFEST).read_bytes()
+    else:
+        with zipfile.ZipFile(path) as z:
+            text = z.read(MANIFEST)
+    return _check_manifest(json.loads(text, object_hook=_from_json), path)
+
+
+def load_run(path, frames=None, mmap=False):
+    """
+    Load a run saved with `save_run()`.
+
+    Parameters
+    ----------
+    path : str or Path
+        The run directory or .zip file.
+    frames : list of str, optional
+        The dataframes to load (default is None, which implies all
+        the saved dataframes).  The others are None.
+    mmap : bool, optional
+        True to memory map the arrays of a run directory instead of
+        reading them (default is False).  The dataframes are then
+        read-only views of the files.
+
+    Returns
+    -------
+    Run
+        The run.
+
+    Raises
+    ------
+    ValueError
+        If `path` isn't a run, or has a newer format version, or
+        `mmap` is True for a .zip file.
+
+    Examples
+    --------
+    >>> run = pf.load_run('runs/double-7s-SPY', frames=['dbal'], mmap=True)
+    >>> run.stats['sharpe_ratio'], run.dbal['close'].iloc[-1]
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    names = manifest['frames'] if frames is None else frames
+    names = [name for name in names if name in manifest['frames']]
+
+    loaded = {}
+    if path.is_dir():
+        mmap_mode = 'r' if mmap else None
+
+        def read(member):
+            # A plain ndarray view of a memmap keeps the file mapped.
+            array = np.load(path / member, mmap_mode=mmap_mode, allow_pickle=False)
+            return array.view(np.ndarray)
+        for name in names:
+            loaded[name] = _build_frame(manifest['frames'][name], read)
+    else:
+        if mmap:
+            raise ValueError('mmap requires a run directory')
+        with zipfile.ZipFile(path) as z:
+            def read(member):
+                with z.open(member) as f:
+                    return np.lib.format.read_array(f, allow_pickle=False)
+            for name in names:
+                loaded[name] = _build_frame(manifest['frames'][name], read)
+    return Run(manifest, loaded)
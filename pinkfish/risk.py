@@ -0,0 +1,353 @@
+"""
+Portfolio risk.
+
+Volatility and covariance matrices for all the symbols of a portfolio,
+computed in one vectorized pass over the 'SYM_close' returns, and the
+weights derived from them: inverse volatility, risk parity, and
+volatility targeting.  Weights are dataframes with one row per date
+and one column per symbol, so on a rebalance date the row can be
+passed directly to `Portfolio.adjust_percents()`.
+
+Two estimators are supported.  'rolling' uses the sample volatility
+and covariance of the last `lookback` returns.  'ewma' uses the
+exponentially weighted (RiskMetrics) estimate with a `decay` factor,
+which assumes zero mean returns.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pinkfish.indicator import VOLATILITY_METRIC_FLOOR
+import pinkfish.pfstatistics as pfstatistics
+from pinkfish.profiling import profiled
+
+
+########################################################################
+# HELPERS
+
+def _returns(ts, symbols, field):
+    """
+    Return a dataframe of the daily returns with one column per symbol.
+    """
+    r = ts[[f'{symbol}_{field}' for symbol in symbols]].pct_change()
+    r.columns = list(symbols)
+    return r
+
+
+def _check_method(method, lookback, decay):
+    """
+    Raise ValueError for an invalid estimator.
+    """
+    if method == 'rolling':
+        if lookback < 2:
+            raise ValueError('lookback must be at least 2')
+    elif method == 'ewma':
+        if not 0 < decay < 1:
+            raise ValueError('decay must be between 0 and 1 (exclusive)')
+    else:
+        raise ValueError(f'invalid method "{method}"')
+
+
+def _cov_array(cov):
+    """
+    Return the dates, symbols, and the (dates, symbols, symbols) array
+    of a covariance matrix returned by `covariance_matrix()`.
+    """
+    symbols = list(cov.columns)
+    n = len(symbols)
+    dates = cov.index.get_level_values(0)[::n]
+    return dates, symbols, cov.to_numpy(dtype=float).reshape(-1, n, n)
+
+
+########################################################################
+# VOLATILITY AND COVARIANCE MATRICES
+
+@profiled('indicators')
+def volatility_matrix(ts, symbols, field='close', method='rolling',
+                      lookback=20, decay=0.94, annualize=True):
+    """
+    Compute the volatility of every portfolio symbol.
+
+    With method='rolling', the values are identical to calling
+    `VOLATILITY()` for each symbol.
+
+    Parameters
+    ----------
+    ts : pd.DataFrame
+        The portfolio timeseries, with a 'SYM_field' column for each
+        symbol, e.g. 'SPY_close'.
+    symbols : list of str
+        The symbols.
+    field : str, optional
+        The price field to use (default is 'close').
+    method : str, optional {'rolling', 'ewma'}
+        The estimator (default is 'rolling').
+    lookback : int, optional
+        The number of returns in the rolling window (default is 20).
+    decay : float, optional
+        The daily decay factor of the 'ewma' estimator
+        (default is 0.94).
+    annualize : bool, optional
+        True to scale the daily volatility to one year
+        (default is True).
+
+    Returns
+    -------
+    pd.DataFrame
+        The volatility, with one column per symbol.
+
+    Raises
+    ------
+    ValueError
+        If the method, lookback, or decay is invalid.
+
+    Examples
+    --------
+    >>> vol = pf.volatility_matrix(ts, symbols, lookback=60)
+    """
+    _check_method(method, lookback, decay)
+    r = _returns(ts, symbols, field)
+    if method == 'rolling':
+        vol = r.rolling(lookback).std()
+    else:
+        vol = np.sqrt((r**2).ewm(alpha=1-decay, adjust=False).mean())
+    if annualize:
+        vol = vol * np.sqrt(pfstatistics.TRADING_DAYS_PER_YEAR)
+    return vol
+
+
+@profiled('indicators')
+def covariance_matrix(ts, symbols, field='close', method='rolling',
+                      lookback=60, decay=0.94, dates=None, annualize=True):
+    """
+    Compute the covariance matrix of the portfolio symbols per date.
+
+    With method='rolling', the covariance matrices of every window are
+    computed with one batched matrix product over a strided view of
+    the returns.  A symbol with a missing return in the window has NaN
+    covariances.  With method='ewma', the estimate starts on the first
+    date where every symbol has a return; later missing returns count
+    as zero.
+
+    Parameters
+    ----------
+    ts : pd.DataFrame
+        The portfolio timeseries, with a 'SYM_field' column for each
+        symbol, e.g. 'SPY_close'.
+    symbols : list of str
+        The symbols.
+    field : str, optional
+        The price field to use (default is 'close').
+    method : str, optional {'rolling', 'ewma'}
+        The estimator (default is 'rolling').
+    lookback : int, optional
+        The number of returns in the rolling window (default is 60).
+    decay : float, optional
+        The daily decay factor of the 'ewma' estimator
+        (default is 0.94).
+    dates : list of datetime.datetime, optional
+        The dates to compute the matrix for, e.g. the rebalance dates
+        (default is None, which implies every date of `ts`).
+    annualize : bool, optional
+        True to scale the daily covariance to one year
+        (default is True).
+
+    Returns
+    -------
+    pd.DataFrame
+        The covariance matrices, indexed by (date, symbol) with one
+        column per symbol, as returned by pandas `rolling().cov()`.
+        Use `cov.loc[date]` to get the matrix of one date.
+
+    Raises
+    ------
+    ValueError
+        If the method, lookback, or decay is invalid.
+    KeyError
+        If one of the `dates` isn't in `ts`.
+
+    Examples
+    --------
+    >>> cov = pf.covariance_matrix(ts, symbols, method='ewma',
+    ...                            dates=rebalance_dates)
+    """
+    _check_method(method, lookback, decay)
+    r = _returns(ts, symbols, field)
+    x = r.to_numpy(dtype=float)
+    n = len(symbols)
+
+    if dates is None:
+        index = r.index
+        positions = np.arange(len(index))
+    else:
+        index = pd.DatetimeIndex(dates)
+        positions = r.index.get_indexer(index)
+        if (positions < 0).any():
+            raise KeyError(f'dates not in timeseries: {list(index[positions < 0])}')
+
+    out = np.full((len(positions), n, n), np.nan)
+    if method == 'rolling':
+        full = positions >= lookback - 1
+        if full.any():
+            windows = np.lib.stride_tricks.sliding_window_view(x, lookback, axis=0)
+            w = windows[positions[full] - lookback + 1]
+            w = w - w.mean(axis=2, keepdims=True)
+            out[full] = np.einsum('dis,djs->dij', w, w) / (lookback - 1)
+    else:
+        wanted = {}
+        for k, position in enumerate(positions):
+            wanted.setdefault(position, []).append(k)
+        valid = ~np.isnan(x).any(axis=1)
+        start = valid.argmax() if valid.any() else len(x)
+        s = np.outer(x[start], x[start]) if start < len(x) else None
+        for t in range(start, len(x)):
+            if t > start:
+                xt = np.nan_to_num(x[t])
+                s = decay * s + (1 - decay) * np.outer(xt, xt)
+            for k in wanted.get(t, ()):
+                out[k] = s
+
+    if annualize:
+        out *= pfstatistics.TRADING_DAYS_PER_YEAR
+
+    multi_index = pd.MultiIndex.from_product([index, symbols],
+                                             names=[r.index.name, None])
+    return pd.DataFrame(out.reshape(-1, n), index=multi_index, columns=list(symbols))
+
+
+########################################################################
+# WEIGHTS
+
+def inverse_volatility_weights(vol, floor=VOLATILITY_METRIC_FLOOR):
+    """
+    Compute inverse volatility weights for every date.
+
+    Each weight is ``1 / max(vol, floor)``, normalized so that the
+    weights of a date sum to 1.  Symbols without a volatility get a
+    weight of 0.  Dates without any volatility are NaN.
+
+    Parameters
+    ----------
+    vol : pd.DataFrame
+        The annualized volatility, with one column per symbol, as
+        returned by `volatility_matrix()`.
+    floor : float, optional
+        Minimum vol used in the denominator
+        (default is :data:`VOLATILITY_METRIC_FLOOR`).
+
+    Returns
+    -------
+    pd.DataFrame
+        The weights, with one column per symbol.
+
+    Examples
+    --------
+    >>> weights = pf.inverse_volatility_weights(vol)
+    >>> portfolio.adjust_percents(row, weights.loc[date])
+    """
+    inv = 1 / np.maximum(vol, floor)
+    total = inv.sum(axis=1, min_count=1)
+    weights = inv.div(total, axis=0).fillna(0)
+    weights[total.isna()] = np.nan
+    return weights
+
+
+def risk_parity_weights(cov, budgets=None, max_iter=100, tol=1e-10):
+    """
+    Compute risk parity weights for every date.
+
+    The weights are chosen so that each symbol contributes its risk
+    budget to the portfolio variance; with equal budgets each symbol
+    contributes equally.  All dates are solved at once with cyclical
+    coordinate descent, which converges for any covariance matrix.
+    Dates whose covariance matrix has a NaN or a zero variance are NaN.
+
+    Parameters
+    ----------
+    cov : pd.DataFrame
+        The covariance matrices, as returned by `covariance_matrix()`.
+    budgets : dict of floats, optional
+        Dict of key value pair of symbol:budget.  The budgets are
+        normalized to sum to 1 (default is None, which implies equal
+        risk budgets).
+    max_iter : int, optional
+        The maximum number of sweeps over the symbols (default is 100).
+    tol : float, optional
+        The relative change in weights at which to stop
+        (default is 1e-10).
+
+    Returns
+    -------
+    pd.DataFrame
+        The weights, with one column per symbol.
+
+    Examples
+    --------
+    >>> cov = pf.covariance_matrix(ts, symbols, dates=rebalance_dates)
+    >>> weights = pf.risk_parity_weights(cov)
+    """
+    dates, symbols, s = _cov_array(cov)
+    n = len(symbols)
+    if budgets is None:
+        b = np.full(n, 1 / n)
+    else:
+        b = np.array([budgets[symbol] for symbol in symbols], dtype=float)
+        b = b / b.sum()
+
+    diag = np.diagonal(s, axis1=1, axis2=2)
+    valid = np.isfinite(s).all(axis=(1, 2)) & (diag > 0).all(axis=1)
+    s = s[valid]
+    diag = diag[valid]
+
+    # Solve y_i * (S y)_i = b_i one coordinate at a time.
+    y = 1 / np.sqrt(diag)
+    for _ in range(max_iter):
+        y_prev = y.copy()
+        for i in range(n):
+            c = np.einsum('dj,dj->d', s[:, i, :], y) - diag[:, i] * y[:, i]
+            y[:, i] = (-c + np.sqrt(c**2 + 4 * diag[:, i] * b[i])) / (2 * diag[:, i])
+        if len(y) == 0 or (np.abs(y - y_prev) / y).max() < tol:
+            break
+
+    weights = np.full((len(dates), n), np.nan)
+    weights[valid] = y / y.sum(axis=1, keepdims=True)
+    return pd.DataFrame(weights, index=dates, columns=symbols)
+
+
+def volatility_target_weights(weights, cov, target=0.10, max_leverage=1):
+    """
+    Scale weights so that the portfolio has a target volatility.
+
+    The weights of each date are multiplied by the leverage
+    ``min(target / vol, max_leverage)``, where vol is the annualized
+    volatility of the portfolio with the given weights.
+
+    Parameters
+    ----------
+    weights : pd.DataFrame
+        The weights, with one column per symbol, e.g. as returned by
+        `inverse_volatility_weights()`.
+    cov : pd.DataFrame
+        The annualized covariance matrices, as returned by
+        `covariance_matrix()`.  Only the dates of `cov` are returned.
+    target : float, optional
+        The target annualized volatility (decimal, default is 0.10).
+    max_leverage : float, optional
+        The maximum sum of the weights of a date (default is 1, which
+        implies no leverage).
+
+    Returns
+    -------
+    pd.DataFrame
+        The scaled weights, with one column per symbol.
+
+    Examples
+    --------
+    >>> weights = pf.volatility_target_weights(weights, cov, target=0.12)
+    """
+    dates, symbols, s = _cov_array(cov)
+    w = weights.loc[dates, symbols].to_numpy(dtype=float)
+    vol = np.sqrt(np.einsum('di,dij,dj->d', w, s, w))
+    with np.errstate(divide='ignore'):
+        leverage = np.minimum(target / vol, max_leverage)
+    return pd.DataFrame(w * leverage[:, None], index=dates, columns=symbols)
@@ -0,0 +1,530 @@
+"""
+Streaming indicators.
+
+Stateful versions of the pinkfish indicators for live signal
+generation.  Each indicator is primed once on the price history, then
+updated with one new bar at a time in O(1) time.  The state can be
+checkpointed to disk and restored, so that a daily signal job only
+needs to process the new bars.
+
+The values are identical to those of the pinkfish indicators; the
+rolling mean, variance, and exponential average follow the pandas
+algorithms step by step.
+
+Examples
+--------
+>>> indicators = {'regime': pf.CrossOverStream(1, 200),
+...               'sma70': pf.SMAStream(70)}
+>>> for ind in indicators.values():
+...     ind.run(ts)
+>>> pf.save_checkpoint(indicators, 'signals.ckpt')
+
+The next day, only the new bars are processed.
+
+>>> indicators = pf.load_checkpoint('signals.ckpt')
+>>> regime = indicators['regime'].run(ts).iloc[-1]
+"""
+
+from collections import deque
+import math
+import numbers
+import os
+import pickle
+
+import pandas as pd
+
+from pinkfish.indicator import _time_frame_factor
+
+
+########################################################################
+# CHECKPOINT
+
+def save_checkpoint(indicators, path):
+    """
+    Save the state of streaming indicators to a file.
+
+    Parameters
+    ----------
+    indicators : object
+        A streaming indicator, or a container of them, e.g. a dict.
+    path : str or Path
+        The checkpoint file.  It is replaced atomically.
+
+    Returns
+    -------
+    None
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(indicators, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Restore the streaming indicators saved with `save_checkpoint()`.
+
+    Parameters
+    ----------
+    path : str or Path
+        The checkpoint file.
+
+    Returns
+    -------
+    object
+        The streaming indicator, or container of them.
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+########################################################################
+# BASE
+
+class StreamingIndicator:
+    """
+    Base class of the streaming indicators.
+
+    Subclasses implement `_update(x)`, which adds the price `x` and
+    returns the new indicator value.
+    """
+
+    def __init__(self, price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is
+            'close').  Not used if the bars are prices.
+
+        Attributes
+        ----------
+        value : float
+            The indicator value after the last bar.
+        date : object
+            The date of the last bar, or None.
+        """
+        self.price = price
+        self.value = math.nan
+        self.date = None
+        self._undated = False
+
+    def update(self, bar, date=None):
+        """
+        Add a new bar and return the new indicator value.
+
+        Parameters
+        ----------
+        bar : float or pd.Series
+            The price, or a row of a timeseries, e.g. from
+            `ts.iloc[-1]`, whose name is the date.
+        date : object, optional
+            The date of the bar (default is None, which implies the
+            name of `bar` if it is a row).  Without a date, `run()`
+            can't tell which bars were already added, so it can't be
+            used after this bar.
+
+        Returns
+        -------
+        float
+            The indicator value.
+        """
+        if isinstance(bar, numbers.Real):
+            x = float(bar)
+        else:
+            x = float(bar[self.price])
+            if date is None:
+                date = getattr(bar, 'name', None)
+        self.date = date
+        self._undated = date is None
+        self.value = self._update(x)
+        return self.value
+
+    def run(self, ts):
+        """
+        Add the bars of `ts` that are after the last bar.
+
+        Use this to prime the indicator on the price history, and to
+        catch up on the bars that are new since the last checkpoint.
+
+        Parameters
+        ----------
+        ts : pd.DataFrame or pd.Series
+            A timeseries with a `price` column, or a series of prices.
+
+        Returns
+        -------
+        pd.Series
+            The indicator value for each bar that was added.
+
+        Raises
+        ------
+        ValueError
+            If the last bar was added by `update()` without a date.
+        """
+        if self._undated:
+            raise ValueError('the date of the last bar is unknown, '
+                             'pass the date to update()')
+        s = ts[self.price] if isinstance(ts, pd.DataFrame) else ts
+        if self.date is not None:
+            s = s[s.index > self.date]
+        values = [self._update(x) for x in s.to_numpy(dtype=float)]
+        if values:
+            self.value = values[-1]
+            self.date = s.index[-1]
+        return pd.Series(values, index=s.index, dtype=float)
+
+    def _update(self, x):
+        raise NotImplementedError
+
+
+########################################################################
+# SMA
+
+class SMAStream(StreamingIndicator):
+    """
+    Streaming simple moving average, see `pf.SMA()`.
+
+    A running sum with Kahan compensation, as in pandas.
+    """
+
+    def __init__(self, timeperiod=30, price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        timeperiod : int, optional
+            The timeperiod for the moving average (default is 30).
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        self.timeperiod = timeperiod
+        self._window = deque()
+        self._nobs = 0
+        self._sum = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._neg = 0
+        self._same = 0
+        self._prev = math.nan
+
+    def _add(self, x):
+        if x == x:
+            self._nobs += 1
+            y = x - self._comp_add
+            t = self._sum + y
+            self._comp_add = t - self._sum - y
+            self._sum = t
+            if x < 0:
+                self._neg += 1
+            if x == self._prev:
+                self._same += 1
+            else:
+                self._same = 1
+            self._prev = x
+
+    def _remove(self, x):
+        if x == x:
+            self._nobs -= 1
+            y = -x - self._comp_remove
+            t = self._sum + y
+            self._comp_remove = t - self._sum - y
+            self._sum = t
+            if x < 0:
+                self._neg -= 1
+
+    def _update(self, x):
+        self._window.append(x)
+        if len(self._window) > self.timeperiod:
+            self._remove(self._window.popleft())
+        self._add(x)
+        if len(self._window) < self.timeperiod or self._nobs < self.timeperiod:
+            return math.nan
+        if self._same >= self._nobs:
+            return self._prev
+        result = self._sum / self._nobs
+        if self._neg == 0 and result < 0:
+            result = 0.0
+        elif self._neg == self._nobs and result > 0:
+            result = 0.0
+        return result
+
+
+########################################################################
+# EMA
+
+class EMAStream(StreamingIndicator):
+    """
+    Streaming exponential moving average, see `pf.EMA()`.
+    """
+
+    def __init__(self, timeperiod=30, price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        timeperiod : int, optional
+            The timeperiod for the moving average (default is 30).
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        self.timeperiod = timeperiod
+        self._alpha = 2 / (timeperiod + 1)
+        self._weighted = math.nan
+        self._old_wt = 1.0
+        self._nobs = 0
+
+    def _update(self, x):
+        is_observation = x == x
+        self._nobs += is_observation
+        if self._weighted == self._weighted:
+            # As in pandas ewm(adjust=False); a NaN bar still decays
+            # the weight of the previous average.
+            self._old_wt *= 1 - self._alpha
+            if is_observation:
+                if self._weighted != x:
+                    self._weighted = ((self._old_wt * self._weighted + self._alpha * x)
+                                      / (self._old_wt + self._alpha))
+                self._old_wt = 1.0
+        elif is_observation:
+            self._weighted = x
+        return self._weighted if self._nobs >= self.timeperiod else math.nan
+
+
+########################################################################
+# PERIOD_HIGH / PERIOD_LOW
+
+class PeriodHighStream(StreamingIndicator):
+    """
+    Streaming period high, see `pf.PERIOD_HIGH()`.
+
+    A monotonic deque holds the candidates for the window extreme, so
+    each update is amortized O(1).
+    """
+
+    _sign = 1
+
+    def __init__(self, timeperiod=20, price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        timeperiod : int, optional
+            The number of days in the period (default is 20).
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        self.timeperiod = timeperiod
+        self._candidates = deque()
+        self._nan_bars = deque()
+        self._bar = -1
+
+    def _update(self, x):
+        self._bar += 1
+        start = self._bar - self.timeperiod + 1
+        while self._candidates and self._candidates[0][0] < start:
+            self._candidates.popleft()
+        while self._nan_bars and self._nan_bars[0] < start:
+            self._nan_bars.popleft()
+        if x != x:
+            self._nan_bars.append(self._bar)
+        else:
+            while self._candidates and self._sign*self._candidates[-1][1] <= self._sign*x:
+                self._candidates.pop()
+            self._candidates.append((self._bar, x))
+        if start < 0 or self._nan_bars:
+            return math.nan
+        return self._candidates[0][1]
+
+
+class PeriodLowStream(PeriodHighStream):
+    """
+    Streaming period low, see `pf.PERIOD_LOW()`.
+    """
+
+    _sign = -1
+
+
+########################################################################
+# CROSSOVER
+
+class CrossOverStream(StreamingIndicator):
+    """
+    Streaming regime indicator, see `pf.CROSSOVER()`.
+
+    The fast and slow moving averages are simple moving averages.
+    """
+
+    def __init__(self, timeperiod_fast=50, timeperiod_slow=200, band=0,
+                 price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        timeperiod_fast : int, optional
+            The timeperiod for the fast moving average (default is 50).
+        timeperiod_slow : int, optional
+            The timeperiod for the slow moving average (default is 200).
+        band : float, {0-100}, optional
+            Percent band around the slow moving average (default is 0).
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        if (timeperiod_fast < 1 or timeperiod_slow < 2
+            or timeperiod_fast >= timeperiod_slow):
+            raise ValueError('invalid timeperiods')
+        self.band = band
+        self._fast = None if timeperiod_fast == 1 else SMAStream(timeperiod_fast)
+        self._slow = SMAStream(timeperiod_slow)
+        self._r = 0
+
+    def _update(self, x):
+        fast = x if self._fast is None else self._fast._update(x)
+        slow = self._slow._update(x)
+        if slow != slow:
+            self._r = math.nan
+        elif fast > slow*(1+self.band/100):
+            self._r = self._r + 1 if self._r > 0 else 1
+        elif fast < slow*(1-self.band/100):
+            self._r = self._r - 1 if self._r < 0 else -1
+        return float(self._r)
+
+
+########################################################################
+# MOMENTUM
+
+class MomentumStream(StreamingIndicator):
+    """
+    Streaming momentum, see `pf.MOMENTUM()`.
+    """
+
+    def __init__(self, lookback=1, time_frame='monthly', price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        lookback : int, optional
+            The number of time frames to lookback (default is 1).
+        time_frame : str, optional {'monthly', 'daily', 'weekly', 'yearly'}
+            The unit or timeframe type of lookback (default is 'monthly').
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        if lookback < 1:
+            raise ValueError('lookback must be positive')
+        self.period = lookback * _time_frame_factor(time_frame)
+        self._window = deque(maxlen=self.period + 1)
+
+    def _update(self, x):
+        self._window.append(x)
+        if len(self._window) <= self.period:
+            return math.nan
+        return x / self._window[0] - 1
+
+
+########################################################################
+# VOLATILITY
+
+class VolatilityStream(StreamingIndicator):
+    """
+    Streaming volatility, see `pf.VOLATILITY()`.
+
+    The rolling variance of the daily returns is updated with
+    Welford's algorithm and Kahan compensation, as in pandas.
+    """
+
+    def __init__(self, lookback=20, time_frame='yearly', downside=False,
+                 upside=False, price='close'):
+        """
+        Initialize instance variables.
+
+        Parameters
+        ----------
+        lookback : int, optional
+            The number of days to lookback (default is 20).
+        time_frame : str, optional {'yearly', 'daily', 'weekly', 'monthly'}
+            The timeframe used for scaling (default is 'yearly').
+        downside : bool, optional
+            True to calculate the downside volatility (default is False).
+        upside : bool, optional
+            True to calculate the upside volatility (default is False).
+        price : str, optional {'close', 'open', 'high', 'low'}
+            The field of each bar to use for price (default is 'close').
+        """
+        super().__init__(price)
+        if lookback < 1:
+            raise ValueError('lookback must be positive')
+        self.lookback = lookback
+        self.factor = _time_frame_factor(time_frame)
+        self.downside = downside
+        self.upside = upside
+        self._prev_price = math.nan
+        self._window = deque()
+        self._nobs = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same = 0
+        self._prev = math.nan
+
+    def _add(self, r):
+        if r == r:
+            if r == self._prev:
+                self._same += 1
+            else:
+                self._same = 1
+            self._prev = r
+            self._nobs += 1
+            prev_mean = self._mean - self._comp_add
+            y = r - self._comp_add
+            t = y - self._mean
+            self._comp_add = t + self._mean - y
+            self._mean += t / self._nobs
+            self._ssqdm += (r - prev_mean) * (r - self._mean)
+
+    def _remove(self, r):
+        if r == r:
+            self._nobs -= 1
+            if self._nobs:
+                prev_mean = self._mean - self._comp_remove
+                y = r - self._comp_remove
+                t = y - self._mean
+                self._comp_remove = t + self._mean - y
+                self._mean -= t / self._nobs
+                self._ssqdm -= (r - prev_mean) * (r - self._mean)
+            else:
+                self._mean = self._ssqdm = 0.0
+
+    def _update(self, x):
+        r = x / self._prev_price - 1
+        self._prev_price = x
+        if self.downside and r > 0:
+            r = 0.0
+        elif self.upside and r < 0:
+            r = 0.0
+        self._window.append(r)
+        if len(self._window) > self.lookback:
+            self._remove(self._window.popleft())
+        self._add(r)
+        if self._nobs < self.lookback or self._nobs < 2:
+            return math.nan
+        if self._same >= self._nobs:
+            # The window is constant; drop the rounding errors.
+            self._mean = self._prev
+            self._ssqdm = var = 0.0
+        else:
+            var = max(self._ssqdm / (self._nobs - 1), 0)
+        return math.sqrt(var) * math.sqrt(self.factor)
@@ -2,8 +2,12 @@
 Trading agent.
 """
 
+import numpy as np
 import pandas as pd
 
+import pinkfish.profiling as profiling
+import pinkfish.utility as utility
+
 
 class Direction:
     """
@@ -19,6 +23,38 @@ class Margin:
     CASH, STANDARD, PATTERN_DAY_TRADER = [1, 2, 4]
 
 
+def _bars_in_trade(index, tlog):
+    """
+    Return the number of bars from entry to exit for every trade.
+
+    Both the entry and exit bars are counted.  `index` must be the
+    sorted index of the timeseries that was traded.
+    """
+    entry = index.searchsorted(tlog['entry_date'].to_numpy(), side='left')
+    exit = index.searchsorted(tlog['exit_date'].to_numpy(), side='right')
+    return np.asarray(exit - entry, dtype=np.int64)
+
+
+def _compact_tlog(tlog):
+    """
+    Convert the trade log to compact dtypes if they are selected.
+    """
+    if utility.COMPACT_DTYPES:
+        utility.to_compact_dtypes(tlog, category=['direction', 'symbol'],
+                                  int32=['qty', 'bars'])
+    return tlog
+
+
+def _compact_rlog(rlog):
+    """
+    Convert the raw trade log to compact dtypes if they are selected.
+    """
+    if utility.COMPACT_DTYPES:
+        utility.to_compact_dtypes(rlog, category=['entry_exit', 'direction', 'symbol'],
+                                  int32=['seq_num', 'shares'])
+    return rlog
+
+
 ########################################################################
 # TRADE LOG - each symbol has it's own trade log
 
@@ -113,6 +149,10 @@ class TradeLog:
         value : float
             The share value.
         """
+        counters = profiling._counters
+        if counters is not None:
+            counters['share_values'] += 1
+
         value = 0
         if self.direction == Direction.LONG:
             value += price*self.shares
@@ -237,6 +277,10 @@ class TradeLog:
         if shares == 0:
             return 0
 
+        counters = profiling._counters
+        if counters is not None:
+            counters['trade_log_mutations'] += 1
+
         # Record in raw trade log.
         t = (entry_date, TradeLog.seq_num, entry_price, shares, 'entry', direction, self.symbol)
         self._raw.append(t)
@@ -359,6 +403,10 @@ class TradeLog:
 
         shares_orig = shares
 
+        counters = profiling._counters
+        if counters is not None:
+            counters['trade_log_mutations'] += 1
+
         # Record in raw trade log.
         t = (exit_date, TradeLog.seq_num, exit_price, shares, 'exit', direction, self.symbol)
         self._raw.append(t)
@@ -651,20 +699,25 @@ class TradeLog:
         return tlog
 
 
-    def get_log(self, merge_trades=False):
+    @profiling.profiled('get_logs')
+    def get_log(self, merge_trades=False, ts=None):
         """
         Return the trade log.
 
         The trade log consists of the following columns:
         'entry_date', 'entry_price', 'exit_date', 'exit_price',
         'pl_points', 'pl_cash', 'qty', 'cumul_total',
-        'direction', 'symbol'.
+        'direction', 'symbol', and 'bars' if `ts` is given.
 
         Parameters
         ----------
         merge_trade : bool, optional
             True to merge trades that occur on the same date
             (default is False).
+        ts : pd.DataFrame, optional
+            The timeseries that was traded.  If given, the 'bars'
+            column is added with the number of bars in each trade,
+            counting both the entry and exit bars (default is None).
 
         Returns
         -------
@@ -679,8 +732,12 @@ class TradeLog:
         if merge_trades:
             tlog = self._merge_trades(tlog)
 
-        return tlog
+        if ts is not None:
+            tlog['bars'] = _bars_in_trade(ts.index, tlog)
 
+        return _compact_tlog(tlog)
+
+    @profiling.profiled('get_logs')
     def get_log_raw(self):
         """
         Return the raw trade log.
@@ -696,7 +753,7 @@ class TradeLog:
         """
         columns = ['date', 'seq_num', 'price', 'shares', 'entry_exit', 'direction', 'symbol']
         rlog = pd.DataFrame(self._raw, columns=columns)
-        return rlog
+        return _compact_rlog(rlog)
 
 ########################################################################
 # DAILY BALANCE
@@ -752,6 +809,10 @@ class DailyBal:
         if high is None:  high = close
         if low  is None:  low  = close
 
+        counters = profiling._counters
+        if counters is not None:
+            counters['bars'] += 1
+
         # calculate daily balance values:
         # date, high, low, close, shares, cash, leverage
         cash = TradeLog.cash
@@ -771,6 +832,7 @@ class DailyBal:
             t = (date, low_, high_, close_, shares, cash, leverage)
         self._l.append(t)
 
+    @profiling.profiled('get_logs')
     def get_log(self, tlog):
         """
         Return the daily balance log.
@@ -809,4 +871,6 @@ class DailyBal:
 
         dbal['state'] = dbal.apply(trade_state, axis=1)
         dbal.set_index('date', inplace=True)
+        if utility.COMPACT_DTYPES:
+            utility.to_compact_dtypes(dbal, category=['state'], int32=['shares'])
         return dbal
@@ -3,11 +3,13 @@ Utility functions.
 """
 
 from configparser import ConfigParser
+from contextlib import contextmanager
 from functools import wraps
 import importlib.util
 import inspect
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 
@@ -191,3 +193,119 @@ def no_empty_container(container_name, default_ret_value):
             return func(*args, **kwargs)
         return wrapper
     return decorator
+
+
+########################################################################
+# COMPACT DTYPES
+
+COMPACT_DTYPES = False
+"""
+bool : True to use compact dtypes in timeseries and logs.  See
+`set_compact_dtypes()`.
+"""
+
+COMPACT_FLOAT32 = False
+"""
+bool : True to also store indicator columns as float32.  See
+`set_compact_dtypes()`.
+"""
+
+
+def set_compact_dtypes(compact=True, float32=False):
+    """
+    Select compact dtypes for timeseries and logs.
+
+    With compact dtypes, `fetch_timeseries()` stores volume as int32,
+    `calendar()` stores the day and month columns as int8, and the
+    trade and daily balance logs store 'symbol', 'direction',
+    'entry_exit' and 'state' as categoricals and share counts as
+    int32.  This reduces memory use, which matters when many
+    timeseries or backtests are held at once, e.g. in an optimization.
+    Prices are always float64.
+
+    Parameters
+    ----------
+    compact : bool, optional
+        True to use compact dtypes (default is True).
+    float32 : bool, optional
+        True to also store the indicator columns of a timeseries,
+        i.e. every float column other than the prices, as float32 in
+        `finalize_timeseries()` (default is False).  Only enable this
+        if your strategy doesn't compare an indicator with a price for
+        equality, e.g. close == period_high, since the indicator is
+        rounded to float32.
+
+    Returns
+    -------
+    None
+    """
+    global COMPACT_DTYPES, COMPACT_FLOAT32
+    COMPACT_DTYPES = compact
+    COMPACT_FLOAT32 = compact and float32
+
+
+def get_compact_dtypes():
+    """
+    Returns whether compact dtypes and float32 indicators are used.
+    """
+    return COMPACT_DTYPES, COMPACT_FLOAT32
+
+
+@contextmanager
+def compact_dtypes(compact=True, float32=False):
+    """
+    Use compact dtypes within a context.
+
+    See `set_compact_dtypes()`.  The previous setting is restored on
+    exit.
+
+    Examples
+    --------
+    >>> with pf.compact_dtypes():
+    ...     s = strategy.Strategy(symbol, capital, start, end, options)
+    ...     s.run()
+    """
+    prev = get_compact_dtypes()
+    set_compact_dtypes(compact, float32)
+    try:
+        yield
+    finally:
+        set_compact_dtypes(*prev)
+
+
+def to_compact_dtypes(df, category=(), int32=(), float32=()):
+    """
+    Convert columns of `df` in place to compact dtypes.
+
+    Integer columns are only converted to int32 if all values fit.
+    Columns that aren't in `df` are ignored.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe.
+    category : list of str, optional
+        Columns to convert to categoricals.
+    int32 : list of str, optional
+        Integer columns to convert to int32.
+    float32 : list of str, optional
+        Float columns to convert to float32.
+
+    Returns
+    -------
+    pd.DataFrame
+        The dataframe.
+    """
+    info = np.iinfo(np.int32)
+    for column in category:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in int32:
+        if column in df.columns and df[column].dtype.kind in 'iu':
+            a = df[column].to_numpy()
+            if len(a) == 0 or (a.min() >= info.min and a.max() <= info.max):
+                df[column] = a.astype(np.int32)
+    for column in float32:
+        if column in df.columns and df[column].dtype.kind == 'f':
+            df[column] = df[column].astype(np.float32)
+    return df